@@ -11,20 +11,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import importlib
 import itertools
 import os
 import shutil
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 import click
 
 from lean.constants import DEFAULT_LEAN_CONFIG_FILE_NAME
-from lean.container import container
 from lean.models.errors import MoreInfoError
-from lean.models.logger import Option
 
 
 class LeanCommand(click.Command):
@@ -33,6 +32,7 @@ class LeanCommand(click.Command):
     def __init__(self,
                  requires_lean_config: bool = False,
                  requires_docker: bool = False,
+                 requires_database_files: bool = False,
                  allow_unknown_options: bool = False,
                  *args,
                  **kwargs):
@@ -40,12 +40,14 @@ class LeanCommand(click.Command):
 
         :param requires_lean_config: True if this command requires a Lean config, False if not
         :param requires_docker: True if this command uses Docker, False if not
+        :param requires_database_files: True if this command needs up-to-date database files in the data directory, False if not
         :param allow_unknown_options: True if unknown options are allowed, False if not
         :param args: the args that are passed on to the click.Command constructor
         :param kwargs: the kwargs that are passed on to the click.Command constructor
         """
         self._requires_lean_config = requires_lean_config
         self._requires_docker = requires_docker
+        self._requires_database_files = requires_database_files
         self._allow_unknown_options = allow_unknown_options
 
         super().__init__(*args, **kwargs)
@@ -59,6 +61,11 @@ class LeanCommand(click.Command):
         self.context_settings["allow_extra_args"] = allow_unknown_options
 
     def invoke(self, ctx: click.Context):
+        # The container is imported when it is needed, importing it at the top of this module would slow down
+        # the startup of every command, including trivial ones like `lean whoami --help`
+        from lean.container import container
+        from lean.models.logger import Option
+
         if self._requires_lean_config:
             lean_config_manager = container.lean_config_manager()
             try:
@@ -120,13 +127,23 @@ class LeanCommand(click.Command):
                     skip_next = True
 
         update_manager = container.update_manager()
-        update_manager.show_announcements()
 
-        result = super().invoke(ctx)
+        # The symbol properties and market hours databases are updated in the background so startup never blocks
+        # Files are replaced atomically, so LEAN can safely read them while the update is running
+        if self._requires_database_files and not update_manager.offline:
+            container.data_downloader().update_database_files_in_background()
+
+        # Announcements and CLI updates are checked in the background and their results are shown when we're done
+        update_manager.start_background_checks()
 
-        update_manager.warn_if_cli_outdated()
+        # The background work is also finished when the command fails, so its results are never silently dropped
+        try:
+            return super().invoke(ctx)
+        finally:
+            update_manager.show_background_check_results()
 
-        return result
+            if self._requires_database_files:
+                container.data_downloader().wait_for_database_files_update()
 
     def get_params(self, ctx: click.Context):
         params = super().get_params(ctx)
@@ -149,20 +166,102 @@ class LeanCommand(click.Command):
                                                     is_eager=True,
                                                     callback=self._parse_verbose_option))
 
+        # Add --offline option
+        params.insert(len(params) - 1, click.Option(["--offline"],
+                                                    help="Skip all update checks, announcements and database updates",
+                                                    is_flag=True,
+                                                    default=False,
+                                                    expose_value=False,
+                                                    is_eager=True,
+                                                    callback=self._parse_offline_option))
+
+        # Add --no-cache option
+        params.insert(len(params) - 1, click.Option(["--no-cache"],
+                                                    help="Don't use cached responses of the QuantConnect API",
+                                                    is_flag=True,
+                                                    default=False,
+                                                    expose_value=False,
+                                                    is_eager=True,
+                                                    callback=self._parse_no_cache_option))
+
         return params
 
     def _parse_config_option(self, ctx: click.Context, param: click.Parameter, value: Optional[Path]) -> None:
         """Parses the --config option."""
+        from lean.container import container
+
         if value is not None:
             lean_config_manager = container.lean_config_manager()
             lean_config_manager.set_default_lean_config_path(value)
 
     def _parse_verbose_option(self, ctx: click.Context, param: click.Parameter, value: Optional[bool]) -> None:
         """Parses the --verbose option."""
+        from lean.container import container
+
         if value:
             logger = container.logger()
             logger.debug_logging_enabled = True
 
+    def _parse_offline_option(self, ctx: click.Context, param: click.Parameter, value: Optional[bool]) -> None:
+        """Parses the --offline option."""
+        from lean.container import container
+
+        if value:
+            container.update_manager().offline = True
+
+    def _parse_no_cache_option(self, ctx: click.Context, param: click.Parameter, value: Optional[bool]) -> None:
+        """Parses the --no-cache option."""
+        from lean.container import container
+
+        if value:
+            container.response_cache().enabled = False
+            container.listing_cache().enabled = False
+
+
+class LazyGroup(click.Group):
+    """A click.Group which only imports the modules of its subcommands when they are needed."""
+
+    def __init__(self, lazy_commands: Optional[Dict[str, str]] = None, *args, **kwargs):
+        """Creates a new LazyGroup instance.
+
+        :param lazy_commands: the command name -> "module.attribute" import paths of the lazily loaded subcommands
+        :param args: the args that are passed on to the click.Group constructor
+        :param kwargs: the kwargs that are passed on to the click.Group constructor
+        """
+        super().__init__(*args, **kwargs)
+        self._lazy_commands = dict(lazy_commands or {})
+
+    def add_lazy_command(self, name: str, import_path: str) -> None:
+        """Registers a subcommand which is imported the first time it is needed.
+
+        :param name: the name of the subcommand
+        :param import_path: the "module.attribute" path of the click.Command implementing the subcommand
+        """
+        self._lazy_commands[name] = import_path
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted(set(super().list_commands(ctx)) | set(self._lazy_commands.keys()))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name not in self.commands and cmd_name in self._lazy_commands:
+            self.add_command(self._load_command(cmd_name), cmd_name)
+
+        return super().get_command(ctx, cmd_name)
+
+    def _load_command(self, cmd_name: str) -> click.Command:
+        """Imports a lazily registered subcommand.
+
+        :param cmd_name: the name of the subcommand to import
+        :return: the click.Command implementing the subcommand
+        """
+        module_name, attribute_name = self._lazy_commands[cmd_name].rsplit(".", 1)
+        command = getattr(importlib.import_module(module_name), attribute_name)
+
+        if not isinstance(command, click.Command):
+            raise RuntimeError(f"'{self._lazy_commands[cmd_name]}' is not a click command")
+
+        return command
+
 
 class PathParameter(click.ParamType):
     """A limited version of click.Path which uses pathlib.Path."""
@@ -189,6 +288,8 @@ class PathParameter(click.ParamType):
             self._path_type = "Path"
 
     def convert(self, value: str, param: click.Parameter, ctx: click.Context) -> Path:
+        from lean.container import container
+
         path = Path(value).expanduser().resolve()
 
         if not container.path_manager().is_path_valid(path):
@@ -11,52 +11,62 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from pathlib import Path
+from typing import Optional
+
 import click
 
 from lean import __version__
-from lean.commands.backtest import backtest
-from lean.commands.build import build
-from lean.commands.cloud import cloud
-from lean.commands.config import config
-from lean.commands.create_project import create_project
-from lean.commands.data import data
-from lean.commands.gui import gui
-from lean.commands.init import init
-from lean.commands.library import library
-from lean.commands.live import live
-from lean.commands.login import login
-from lean.commands.logout import logout
-from lean.commands.logs import logs
-from lean.commands.optimize import optimize
-from lean.commands.report import report
-from lean.commands.research import research
-from lean.commands.whoami import whoami
-
-
-@click.group()
+from lean.click import LazyGroup, PathParameter
+from lean.components.util.startup_profiler import startup_profiler
+from lean.container import container
+
+
+@click.group(cls=LazyGroup)
 @click.version_option(__version__)
-def lean() -> None:
+@click.option("--profile-startup",
+              is_flag=True,
+              default=False,
+              help="Show how long importing modules and creating components took when the command finishes")
+@click.option("--profile-startup-output",
+              type=PathParameter(exists=False, file_okay=True, dir_okay=False),
+              help="Save the --profile-startup profile to a JSON file (name it *.speedscope.json for speedscope)")
+@click.option("--trace-http",
+              is_flag=True,
+              default=False,
+              help="Show the latency and size of the HTTP requests per endpoint when the command finishes")
+@click.option("--trace-http-output",
+              type=PathParameter(exists=False, file_okay=True, dir_okay=False),
+              help="Append every traced HTTP request to a JSONL file (implies --trace-http)")
+def lean(profile_startup: bool,
+         profile_startup_output: Optional[Path],
+         trace_http: bool,
+         trace_http_output: Optional[Path]) -> None:
     """The Lean CLI by QuantConnect."""
-    # This method is intentionally empty
-    # It is used as the command group for all `lean <command>` commands
-    pass
-
-
-lean.add_command(config)
-lean.add_command(cloud)
-lean.add_command(data)
-lean.add_command(library)
-lean.add_command(gui)
-
-lean.add_command(login)
-lean.add_command(logout)
-lean.add_command(whoami)
-lean.add_command(init)
-lean.add_command(create_project)
-lean.add_command(backtest)
-lean.add_command(optimize)
-lean.add_command(research)
-lean.add_command(report)
-lean.add_command(live)
-lean.add_command(build)
-lean.add_command(logs)
+    # This method is used as the command group for all `lean <command>` commands
+    # The startup profiler itself is enabled in lean.main, before any of the CLI's modules are imported
+    if profile_startup_output is not None:
+        startup_profiler.output_file = profile_startup_output
+
+    # The summary of the traced requests is shown in lean.main when the command finishes
+    if trace_http or trace_http_output is not None:
+        container.http_tracer().enable(trace_http_output)
+
+
+lean.add_lazy_command("config", "lean.commands.config.config")
+lean.add_lazy_command("cloud", "lean.commands.cloud.cloud")
+lean.add_lazy_command("data", "lean.commands.data.data")
+lean.add_lazy_command("library", "lean.commands.library.library")
+lean.add_lazy_command("gui", "lean.commands.gui.gui")
+lean.add_lazy_command("login", "lean.commands.login.login")
+lean.add_lazy_command("logout", "lean.commands.logout.logout")
+lean.add_lazy_command("whoami", "lean.commands.whoami.whoami")
+lean.add_lazy_command("init", "lean.commands.init.init")
+lean.add_lazy_command("create-project", "lean.commands.create_project.create_project")
+lean.add_lazy_command("backtest", "lean.commands.backtest.backtest")
+lean.add_lazy_command("optimize", "lean.commands.optimize.optimize")
+lean.add_lazy_command("research", "lean.commands.research.research")
+lean.add_lazy_command("report", "lean.commands.report.report")
+lean.add_lazy_command("live", "lean.commands.live.live")
+lean.add_lazy_command("build", "lean.commands.build.build")
+lean.add_lazy_command("logs", "lean.commands.logs.logs")
@@ -11,20 +11,29 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import glob
 import json
 import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
 
 import click
+from docker.errors import APIError
+from rich import box
+from rich.table import Table
 
 from lean.click import LeanCommand, PathParameter
-from lean.constants import DEFAULT_ENGINE_IMAGE
+from lean.components.util.system_resources import parse_cpu_list, parse_memory_size
+from lean.constants import DEFAULT_ENGINE_IMAGE, BACKTEST_MEMORY_ESTIMATE, BACKTEST_SCHEDULER_MEMORY_RATIO
 from lean.container import container
 from lean.models.api import QCMinimalOrganization
+from lean.models.docker import DockerImage, DockerResources
 from lean.models.json_module_config import DebuggingMethod
-from lean.models.brokerages.local import all_data_providers, QuantConnectDataProvider
+from lean.models.brokerages.local import local_module_registry
 from lean.models.logger import Option
 
 
@@ -237,8 +246,217 @@ def _select_organization() -> QCMinimalOrganization:
     return logger.prompt_list("Select the organization to purchase and download data with", options)
 
 
-@click.command(cls=LeanCommand, requires_lean_config=True, requires_docker=True)
-@click.argument("project", type=PathParameter(exists=True, file_okay=True, dir_okay=True))
+# The statistics of each backtest shown in the summary after running multiple backtests
+_summary_statistics = ["Net Profit", "Sharpe Ratio", "Drawdown", "Total Trades"]
+
+
+class _PlannedBacktest:
+    """A backtest of which the configuration has been prepared, so it can be started at any time."""
+
+    def __init__(self,
+                 name: str,
+                 algorithm_file: Path,
+                 output: Path,
+                 lean_config: Dict[str, Any],
+                 engine_image: DockerImage,
+                 resources: DockerResources,
+                 requirements: str) -> None:
+        self.name = name
+        self.algorithm_file = algorithm_file
+        self.output = output
+        self.lean_config = lean_config
+        self.engine_image = engine_image
+        self.resources = resources
+        self.requirements = requirements
+
+        self.cpus = 1.0
+        if resources.cpus is not None:
+            self.cpus = resources.cpus
+        elif resources.cpuset_cpus is not None:
+            self.cpus = float(len(parse_cpu_list(resources.cpuset_cpus)))
+
+        self.memory = BACKTEST_MEMORY_ESTIMATE
+        if resources.memory is not None:
+            try:
+                self.memory = parse_memory_size(resources.memory)
+            except ValueError as error:
+                raise RuntimeError(str(error))
+
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+def _expand_projects(projects: Tuple[str, ...]) -> List[Path]:
+    """Turns the values of the PROJECTS argument into paths, expanding glob patterns.
+
+    Patterns are expanded by the CLI so they also work in shells which don't expand them, like cmd on Windows.
+
+    :param projects: the values of the PROJECTS argument
+    :return: the paths to the projects or algorithm files, without duplicates
+    """
+    paths = []
+    for project in projects:
+        if any(char in project for char in "*?["):
+            matches = sorted(glob.glob(os.path.expanduser(project)))
+            if len(matches) == 0:
+                raise RuntimeError(f"'{project}' does not match any projects")
+        else:
+            matches = [project]
+
+        for match in matches:
+            path = Path(match).expanduser().resolve()
+            if not path.exists():
+                raise RuntimeError(f"Path '{match}' does not exist")
+
+            if path not in paths:
+                paths.append(path)
+
+    return paths
+
+
+def _create_unique_directory(directory: Path) -> Path:
+    """Creates a directory which did not exist yet, adding a numbered suffix to its name if it is already taken.
+
+    Backtests of algorithm files in the same project are prepared within the same second,
+    so their timestamped output directories would otherwise be the same.
+
+    :param directory: the path to the directory to create
+    :return: the path to the created directory
+    """
+    candidate = directory
+    suffix = 1
+    while True:
+        try:
+            candidate.mkdir(parents=True)
+            return candidate
+        except FileExistsError:
+            suffix += 1
+            candidate = directory.parent / f"{directory.name}_{suffix}"
+
+
+def _run_backtests(planned_backtests: List[_PlannedBacktest], jobs: int, release: bool) -> None:
+    """Runs multiple backtests concurrently and logs a summary of their results.
+
+    Backtests are started in order, but only when both a job slot and enough CPUs and memory on the Docker host
+    are available for them. At least one backtest always runs, even if it needs more than the host has.
+
+    Backtests with the same Python requirements share a site-packages volume, which is filled by the first of them.
+    Concurrent pip installs into the same volume can corrupt it, so the others wait until the first one has finished.
+
+    :param planned_backtests: the backtests to run
+    :param jobs: the maximum amount of backtests to run at once
+    :param release: whether C# projects should be compiled in release configuration instead of debug
+    """
+    logger = container.logger()
+    lean_runner = container.lean_runner()
+    docker_manager = container.docker_manager()
+
+    host_cpus, host_memory = docker_manager.get_host_resources()
+    available_memory = host_memory * BACKTEST_SCHEDULER_MEMORY_RATIO
+
+    logger.info(f"Running {len(planned_backtests)} backtests with up to {jobs} at once "
+                f"on {host_cpus} CPUs and {host_memory / 1024 ** 3:,.1f} GB of memory")
+
+    def run_backtest(planned_backtest: _PlannedBacktest) -> None:
+        start_time = time()
+        try:
+            lean_runner.run_lean(planned_backtest.lean_config,
+                                 "backtesting",
+                                 planned_backtest.algorithm_file,
+                                 planned_backtest.output,
+                                 planned_backtest.engine_image,
+                                 None,
+                                 release,
+                                 False,
+                                 False,
+                                 planned_backtest.resources,
+                                 f"[{planned_backtest.name}] ")
+        except Exception as exception:
+            planned_backtest.error = str(exception)
+        finally:
+            planned_backtest.duration = time() - start_time
+
+    pending_backtests = list(planned_backtests)
+    running_backtests: Dict[Future, _PlannedBacktest] = {}
+    installed_requirements = {""}
+
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    try:
+        while len(pending_backtests) > 0 or len(running_backtests) > 0:
+            reserved_cpus = sum(b.cpus for b in running_backtests.values())
+            reserved_memory = sum(b.memory for b in running_backtests.values())
+
+            for planned_backtest in list(pending_backtests):
+                if len(running_backtests) >= jobs:
+                    break
+
+                fits = reserved_cpus + planned_backtest.cpus <= host_cpus \
+                       and reserved_memory + planned_backtest.memory <= available_memory
+                if not fits and len(running_backtests) > 0:
+                    continue
+
+                if planned_backtest.requirements not in installed_requirements \
+                        and any(b.requirements == planned_backtest.requirements for b in running_backtests.values()):
+                    continue
+
+                pending_backtests.remove(planned_backtest)
+                running_backtests[executor.submit(run_backtest, planned_backtest)] = planned_backtest
+
+                reserved_cpus += planned_backtest.cpus
+                reserved_memory += planned_backtest.memory
+
+            # A timeout keeps the main thread responsive to Ctrl+C on Windows
+            done, _ = wait(running_backtests.keys(), timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                installed_requirements.add(running_backtests.pop(future).requirements)
+    except KeyboardInterrupt:
+        # run_image() only stops containers on Ctrl+C when it runs on the main thread, so we stop them here
+        output_config_manager = container.output_config_manager()
+        for planned_backtest in running_backtests.values():
+            container_name = output_config_manager.get_output_config(planned_backtest.output).get("container", None)
+            docker_container = docker_manager.get_container_by_name(container_name) if container_name else None
+            if docker_container is not None:
+                try:
+                    docker_container.kill()
+                except APIError:
+                    pass
+
+        executor.shutdown(wait=False)
+        sys.exit(1)
+
+    executor.shutdown()
+
+    table = Table(box=box.SQUARE)
+    for column in ["Algorithm", "Result", "Duration"] + _summary_statistics:
+        table.add_column(column, overflow="fold")
+
+    for planned_backtest in planned_backtests:
+        statistics = {}
+
+        results_file = planned_backtest.output / f"{planned_backtest.lean_config['algorithm-id']}.json"
+        if results_file.is_file():
+            try:
+                statistics = json.loads(results_file.read_text(encoding="utf-8")).get("Statistics", None) or {}
+            except ValueError:
+                pass
+
+        table.add_row(planned_backtest.name,
+                      "Failed" if planned_backtest.error is not None else "Succeeded",
+                      f"{planned_backtest.duration:,.1f} s",
+                      *[statistics.get(statistic, "") for statistic in _summary_statistics])
+
+    logger.info(table)
+
+    failed_backtests = [b for b in planned_backtests if b.error is not None]
+    for planned_backtest in failed_backtests:
+        logger.error(f"[{planned_backtest.name}] {planned_backtest.error}")
+
+    if len(failed_backtests) > 0:
+        raise RuntimeError(f"{len(failed_backtests)} of {len(planned_backtests)} backtests failed")
+
+
+@click.command(cls=LeanCommand, requires_lean_config=True, requires_docker=True, requires_database_files=True)
+@click.argument("projects", nargs=-1, required=True, type=str)
 @click.option("--output",
               type=PathParameter(exists=False, file_okay=False, dir_okay=True),
               help="Directory to store results in (defaults to PROJECT/backtests/TIMESTAMP)")
@@ -250,7 +468,7 @@ def _select_organization() -> QCMinimalOrganization:
               type=click.Choice(["pycharm", "ptvsd", "vsdbg", "rider"], case_sensitive=False),
               help="Enable a certain debugging method (see --help for more information)")
 @click.option("--data-provider",
-              type=click.Choice([dp.get_name() for dp in all_data_providers], case_sensitive=False),
+              type=click.Choice(local_module_registry.get_names("data-provider"), case_sensitive=False),
               help="Update the Lean configuration file to retrieve data from the given provider")
 @click.option("--download-data",
               is_flag=True,
@@ -270,7 +488,29 @@ def _select_organization() -> QCMinimalOrganization:
               is_flag=True,
               default=False,
               help="Pull the LEAN engine image before running the backtest")
-def backtest(project: Path,
+@click.option("--warm/--no-warm",
+              default=None,
+              help="Run the backtest in a pre-initialized container that is kept for later backtests (defaults to whether warm-pool-size is set)")
+@click.option("--cpus",
+              type=float,
+              help="The amount of CPUs the engine container may use, like 2.5")
+@click.option("--memory",
+              type=str,
+              help="The memory limit of the engine container, like 4g")
+@click.option("--cpuset-cpus",
+              type=str,
+              help="The CPUs the engine container is pinned to, like 0-3,8")
+@click.option("--numa-node",
+              type=int,
+              help="The NUMA node whose memory (and CPUs if --cpuset-cpus is not given) the engine container is pinned to")
+@click.option("--shm-size",
+              type=str,
+              help="The size of /dev/shm in the engine container, like 1g")
+@click.option("--jobs", "-j",
+              type=click.IntRange(min=1),
+              default=1,
+              help="The maximum amount of backtests to run at once when backtesting multiple projects")
+def backtest(projects: Tuple[str, ...],
              output: Optional[Path],
              detach: bool,
              debug: Optional[str],
@@ -279,12 +519,26 @@ def backtest(project: Path,
              data_purchase_limit: Optional[int],
              release: bool,
              image: Optional[str],
-             update: bool) -> None:
-    """Backtest a project locally using Docker.
+             update: bool,
+             warm: Optional[bool],
+             cpus: Optional[float],
+             memory: Optional[str],
+             cpuset_cpus: Optional[str],
+             numa_node: Optional[int],
+             shm_size: Optional[str],
+             jobs: int) -> None:
+    """Backtest one or more projects locally using Docker.
+
+    \b
+    If a project is a directory, the algorithm in the main.py or Main.cs file inside it will be executed.
+    If a project is a file, the algorithm in the specified file will be executed.
+    Projects may also be glob patterns like "Strategies/*", which are expanded by the CLI.
 
     \b
-    If PROJECT is a directory, the algorithm in the main.py or Main.cs file inside it will be executed.
-    If PROJECT is a file, the algorithm in the specified file will be executed.
+    When multiple projects are given, all backtests are prepared before the first one starts.
+    Up to --jobs backtests run at once, as long as the Docker host has enough CPUs and memory for them.
+    Their output is prefixed with the path of the algorithm file and a summary of their results is shown at the end.
+    The --output, --detach, --debug and --warm options are only supported when backtesting a single project.
 
     \b
     Go to the following url to learn how to debug backtests locally using the Lean CLI:
@@ -293,65 +547,131 @@ def backtest(project: Path,
     By default the official LEAN engine image is used.
     You can override this using the --image option.
     Alternatively you can set the default engine image for all commands using `lean config set engine-image <image>`.
+
+    \b
+    With --warm the backtest runs in a container that has already installed the modules and Python requirements.
+    The container is kept running afterwards, so the next backtest with the same configuration starts faster.
+    Use `lean config set warm-pool-size <size>` to use warm containers by default and to keep more of them ready.
+
+    \b
+    The --cpus, --memory, --cpuset-cpus, --numa-node and --shm-size options limit the resources of the container.
+    They can also be set for a project in the "docker" object in its config.json, options take precedence.
+    The .NET garbage collector is configured to match the CPU and memory limits.
     """
+    project_paths = _expand_projects(projects)
+
+    if len(project_paths) > 1:
+        for name, value in [("--output", output), ("--detach", detach), ("--debug", debug), ("--warm", warm)]:
+            if value:
+                raise RuntimeError(f"{name} is not supported when backtesting multiple projects")
+
     project_manager = container.project_manager()
-    algorithm_file = project_manager.find_algorithm_file(Path(project))
     lean_config_manager = container.lean_config_manager()
-
-    if output is None:
-        output = algorithm_file.parent / "backtests" / datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    cli_config_manager = container.cli_config_manager()
+    project_config_manager = container.project_config_manager()
+    output_config_manager = container.output_config_manager()
+    lean_runner = container.lean_runner()
 
     debugging_method = None
     if debug == "pycharm":
         debugging_method = DebuggingMethod.PyCharm
-        _migrate_python_pycharm(algorithm_file.parent)
     elif debug == "ptvsd":
         debugging_method = DebuggingMethod.PTVSD
-        _migrate_python_vscode(algorithm_file.parent)
     elif debug == "vsdbg":
         debugging_method = DebuggingMethod.VSDBG
-        _migrate_csharp_vscode(algorithm_file.parent)
     elif debug == "rider":
         debugging_method = DebuggingMethod.Rider
-        _migrate_csharp_rider(algorithm_file.parent)
 
     if debugging_method is not None and detach:
         raise RuntimeError("Running a debugging session in a detached container is not supported")
 
-    if algorithm_file.name.endswith(".cs"):
-        _migrate_csharp_csproj(algorithm_file.parent)
-
-    lean_config = lean_config_manager.get_complete_lean_config("backtesting", algorithm_file, debugging_method)
-
     if download_data:
-        data_provider = QuantConnectDataProvider.get_name()
+        data_provider = "QuantConnect"
 
+    # The data provider is built for the first project only, so its credentials are asked for once
+    data_provider_module = None
     if data_provider is not None:
-        data_provider = next(dp for dp in all_data_providers if dp.get_name() == data_provider)
-        data_provider.build(lean_config, container.logger()).configure(lean_config, "backtesting")
-
-    lean_config_manager.configure_data_purchase_limit(lean_config, data_purchase_limit)
-
-    cli_config_manager = container.cli_config_manager()
-    project_config_manager = container.project_config_manager()
-
-    project_config = project_config_manager.get_project_config(algorithm_file.parent)
-    engine_image = cli_config_manager.get_engine_image(image or project_config.get("engine-image", None))
-
-    container.update_manager().pull_docker_image_if_necessary(engine_image, update)
-
-    if not output.exists():
-        output.mkdir(parents=True)
-
-    output_config_manager = container.output_config_manager()
-    lean_config["algorithm-id"] = str(output_config_manager.get_backtest_id(output))
+        data_provider_module = local_module_registry.get_module("data-provider", data_provider)
+
+    resource_overrides = DockerResources(cpus=cpus,
+                                         memory=memory,
+                                         cpuset_cpus=cpuset_cpus,
+                                         numa_node=numa_node,
+                                         shm_size=shm_size)
+
+    planned_backtests = []
+    for project_path in project_paths:
+        algorithm_file = project_manager.find_algorithm_file(project_path)
+
+        if debugging_method == DebuggingMethod.PyCharm:
+            _migrate_python_pycharm(algorithm_file.parent)
+        elif debugging_method == DebuggingMethod.PTVSD:
+            _migrate_python_vscode(algorithm_file.parent)
+        elif debugging_method == DebuggingMethod.VSDBG:
+            _migrate_csharp_vscode(algorithm_file.parent)
+        elif debugging_method == DebuggingMethod.Rider:
+            _migrate_csharp_rider(algorithm_file.parent)
+
+        if algorithm_file.name.endswith(".cs"):
+            _migrate_csharp_csproj(algorithm_file.parent)
+
+        lean_config = lean_config_manager.get_complete_lean_config("backtesting", algorithm_file, debugging_method)
+
+        if data_provider_module is not None:
+            if len(planned_backtests) == 0:
+                data_provider_module = data_provider_module.build(lean_config, container.logger())
+            data_provider_module.configure(lean_config, "backtesting")
+
+        lean_config_manager.configure_data_purchase_limit(lean_config, data_purchase_limit)
+
+        project_config = project_config_manager.get_project_config(algorithm_file.parent)
+        engine_image = cli_config_manager.get_engine_image(image or project_config.get("engine-image", None))
+
+        requirements = ""
+        if algorithm_file.name.endswith(".py"):
+            requirements = lean_runner.get_python_requirements(algorithm_file.parent)
+
+        project_output = output
+        if project_output is None:
+            project_output = _create_unique_directory(
+                algorithm_file.parent / "backtests" / datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
+
+        if not project_output.exists():
+            project_output.mkdir(parents=True)
+
+        lean_config["algorithm-id"] = str(output_config_manager.get_backtest_id(project_output))
+
+        # Algorithm files in the same project would share the project's name, so their path is used instead
+        try:
+            name = algorithm_file.relative_to(lean_config_manager.get_cli_root_directory()).as_posix()
+        except ValueError:
+            name = str(algorithm_file)
+
+        planned_backtests.append(_PlannedBacktest(name,
+                                                  algorithm_file,
+                                                  project_output,
+                                                  lean_config,
+                                                  engine_image,
+                                                  lean_runner.get_resources(algorithm_file.parent,
+                                                                            resource_overrides),
+                                                  requirements))
+
+    update_manager = container.update_manager()
+    for engine_image in {str(b.engine_image): b.engine_image for b in planned_backtests}.values():
+        update_manager.pull_docker_image_if_necessary(engine_image, update)
+
+    if len(planned_backtests) > 1:
+        _run_backtests(planned_backtests, jobs, release)
+        return
 
-    lean_runner = container.lean_runner()
-    lean_runner.run_lean(lean_config,
+    planned_backtest = planned_backtests[0]
+    lean_runner.run_lean(planned_backtest.lean_config,
                          "backtesting",
-                         algorithm_file,
-                         output,
-                         engine_image,
+                         planned_backtest.algorithm_file,
+                         planned_backtest.output,
+                         planned_backtest.engine_image,
                          debugging_method,
                          release,
-                         detach)
+                         detach,
+                         container.warm_container_pool().is_enabled(warm),
+                         resource_overrides)
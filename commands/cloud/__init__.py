@@ -13,15 +13,10 @@
 
 import click
 
-from lean.commands.cloud.backtest import backtest
-from lean.commands.cloud.live import live
-from lean.commands.cloud.optimize import optimize
-from lean.commands.cloud.pull import pull
-from lean.commands.cloud.push import push
-from lean.commands.cloud.status import status
+from lean.click import LazyGroup
 
 
-@click.group()
+@click.group(cls=LazyGroup)
 def cloud() -> None:
     """Interact with the QuantConnect cloud."""
     # This method is intentionally empty
@@ -29,9 +24,9 @@ def cloud() -> None:
     pass
 
 
-cloud.add_command(pull)
-cloud.add_command(push)
-cloud.add_command(backtest)
-cloud.add_command(optimize)
-cloud.add_command(live)
-cloud.add_command(status)
+cloud.add_lazy_command("pull", "lean.commands.cloud.pull.pull")
+cloud.add_lazy_command("push", "lean.commands.cloud.push.push")
+cloud.add_lazy_command("backtest", "lean.commands.cloud.backtest.backtest")
+cloud.add_lazy_command("optimize", "lean.commands.cloud.optimize.optimize")
+cloud.add_lazy_command("live", "lean.commands.cloud.live.live")
+cloud.add_lazy_command("status", "lean.commands.cloud.status.status")
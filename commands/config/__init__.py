@@ -13,13 +13,10 @@
 
 import click
 
-from lean.commands.config.get import get
-from lean.commands.config.list import list
-from lean.commands.config.set import set
-from lean.commands.config.unset import unset
+from lean.click import LazyGroup
 
 
-@click.group()
+@click.group(cls=LazyGroup)
 def config() -> None:
     """Configure Lean CLI options."""
     # This method is intentionally empty
@@ -27,7 +24,7 @@ def config() -> None:
     pass
 
 
-config.add_command(get)
-config.add_command(set)
-config.add_command(unset)
-config.add_command(list)
+config.add_lazy_command("get", "lean.commands.config.get.get")
+config.add_lazy_command("set", "lean.commands.config.set.set")
+config.add_lazy_command("unset", "lean.commands.config.unset.unset")
+config.add_lazy_command("list", "lean.commands.config.list.list")
@@ -12,8 +12,6 @@
 # limitations under the License.
 
 import click
-from rich import box
-from rich.table import Table
 
 from lean.click import LeanCommand
 from lean.container import container
@@ -22,6 +20,10 @@ from lean.container import container
 @click.command(cls=LeanCommand)
 def list() -> None:
     """List the configurable options and their current values."""
+    # rich is imported here so it isn't imported when only the help of this command is requested
+    from rich import box
+    from rich.table import Table
+
     table = Table(box=box.SQUARE)
     table.add_column("Key", overflow="fold")
     table.add_column("Value", overflow="fold")
@@ -13,11 +13,10 @@
 
 import click
 
-from lean.commands.data.download import download
-from lean.commands.data.generate import generate
+from lean.click import LazyGroup
 
 
-@click.group()
+@click.group(cls=LazyGroup)
 def data() -> None:
     """Download or generate data for local use."""
     # This method is intentionally empty
@@ -25,5 +24,6 @@ def data() -> None:
     pass
 
 
-data.add_command(download)
-data.add_command(generate)
+data.add_lazy_command("download", "lean.commands.data.download.download")
+data.add_lazy_command("generate", "lean.commands.data.generate.generate")
+data.add_lazy_command("verify", "lean.commands.data.verify.verify")
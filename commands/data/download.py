@@ -17,19 +17,23 @@ import re
 from time import sleep
 import webbrowser
 from collections import OrderedDict
-from typing import Iterable, List, Optional
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
 
 import click
 from rich import box
 from rich.table import Table
 
-from lean.click import LeanCommand, ensure_options
+from lean.click import LeanCommand, PathParameter, ensure_options
 from lean.container import container
 from lean.models.api import QCDataInformation, QCDataVendor, QCFullOrganization, QCDatasetDelivery
-from lean.models.data import Dataset, DataFile, Product
+from lean.models.data import Dataset, DataFile, DownloadPlan, DownloadPlanProduct, Product
 from lean.models.logger import Option
 
 _data_information: Optional[QCDataInformation] = None
+
+# The data files that have been mapped to their vendor, keyed by the path of the file
+_mapped_data_files: Dict[str, DataFile] = {}
 _presigned_terms="""
 Data Terms of Use has been signed previously.
 Find full agreement at: {link}
@@ -93,68 +97,92 @@ def _map_data_files_to_vendors(organization: QCFullOrganization, data_files: Ite
     return mapped_files
 
 
-def _get_data_files(organization: QCFullOrganization, products: List[Product]) -> List[DataFile]:
-    """Returns the unique data files of a list of products mapped to their vendor.
+def _get_product_details(product: Product) -> List[str]:
+    """Returns the human-readable details of the options of a product.
 
-    :param organization: the organization to use the price information of
-    :param products: the list of products to get the data files from
-    :return: the list of unique data files containing the file and vendor for each file for each product
+    :param product: the product to get the details of
+    :return: a line for every configured option of the product
     """
-    unique_data_files = sorted(list(set(itertools.chain(*[product.get_data_files() for product in products]))))
-    return _map_data_files_to_vendors(organization, unique_data_files)
+    details = []
+    for option_id, result in product.option_results.items():
+        option = next(o for o in product.dataset.options if o.id == option_id)
+        if result is not None:
+            label = option.label
 
+            if isinstance(result.value, list):
+                if len(result.value) > 1:
+                    label = label.replace("(s)", "s")
+                else:
+                    label = label.replace("(s)", "")
 
-def _display_products(organization: QCFullOrganization, products: List[Product]) -> None:
-    """Previews a list of products in pretty tables.
+            details.append(f"{label}: {result.label}")
 
-    :param organization: the organization the user selected
-    :param products: the products to display
+    if len(details) == 0:
+        details.append("-")
+
+    return details
+
+
+def _create_download_plan(organization: QCFullOrganization, products: List[Product]) -> DownloadPlan:
+    """Creates the plan to purchase and download a list of products.
+
+    Every product is expanded into data files and every file is mapped to its vendor only once,
+    so creating a plan again after adding a product only processes the new product.
+
+    :param organization: the organization to use the price information of
+    :param products: the list of products to plan
+    :return: the plan containing the unique data files mapped to their vendors and the prices of the products
     """
-    logger = container.logger()
-    table = Table(box=box.SQUARE)
+    data_files_per_product = [product.get_data_files() for product in products]
+    unique_data_files = sorted(set(itertools.chain(*data_files_per_product)))
 
-    for column in ["Dataset", "Vendor", "Details", "File count", "Price"]:
-        table.add_column(column, overflow="fold")
+    unmapped_data_files = [file for file in unique_data_files if file not in _mapped_data_files]
+    for data_file in _map_data_files_to_vendors(organization, unmapped_data_files):
+        _mapped_data_files[data_file.file] = data_file
+
+    plan_products = []
+    for product, data_files in zip(products, data_files_per_product):
+        plan_products.append(DownloadPlanProduct(
+            dataset=product.dataset.name,
+            vendor=product.dataset.vendor,
+            details=_get_product_details(product),
+            file_count=len(data_files),
+            price=sum(_mapped_data_files[file].vendor.price for file in data_files)
+        ))
 
-    summed_price = 0
+    mapped_data_files = [_mapped_data_files[file] for file in unique_data_files]
 
-    for product in products:
-        details = []
-        for option_id, result in product.option_results.items():
-            option = next(o for o in product.dataset.options if o.id == option_id)
-            if result is not None:
-                label = option.label
+    return DownloadPlan(organization_id=organization.id,
+                        products=plan_products,
+                        data_files=mapped_data_files,
+                        total_price=sum(data_file.vendor.price for data_file in mapped_data_files))
 
-                if isinstance(result.value, list):
-                    if len(result.value) > 1:
-                        label = label.replace("(s)", "s")
-                    else:
-                        label = label.replace("(s)", "")
 
-                details.append(f"{label}: {result.label}")
+def _display_plan(organization: QCFullOrganization, plan: DownloadPlan) -> None:
+    """Previews the products of a download plan in pretty tables.
 
-        if len(details) == 0:
-            details.append("-")
+    :param organization: the organization the user selected
+    :param plan: the plan to display
+    """
+    logger = container.logger()
+    table = Table(box=box.SQUARE)
 
-        mapped_files = _map_data_files_to_vendors(organization, product.get_data_files())
-        price = sum(data_file.vendor.price for data_file in mapped_files)
-        summed_price += price
+    for column in ["Dataset", "Vendor", "Details", "File count", "Price"]:
+        table.add_column(column, overflow="fold")
 
-        table.add_row(product.dataset.name,
-                      product.dataset.vendor,
-                      "\n".join(details),
-                      f"{len(mapped_files):,.0f}",
-                      f"{price:,.0f} QCC")
+    for product in plan.products:
+        table.add_row(product.dataset,
+                      product.vendor,
+                      "\n".join(product.details),
+                      f"{product.file_count:,.0f}",
+                      f"{product.price:,.0f} QCC")
 
     logger.info(table)
 
-    all_data_files = _get_data_files(organization, products)
-    total_price = sum(data_file.vendor.price for data_file in all_data_files)
-
-    if total_price != summed_price:
+    if plan.total_price != plan.get_summed_price():
         logger.warn("The total price is less than the sum of all separate prices because there is overlapping data")
 
-    logger.info(f"Total price: {total_price:,.0f} QCC")
+    logger.info(f"Total price: {plan.total_price:,.0f} QCC")
     logger.info(f"Organization balance: {organization.credit.balance:,.0f} QCC")
 
 
@@ -220,7 +248,7 @@ def _select_products_interactive(organization: QCFullOrganization, datasets: Lis
         products.append(Product(dataset=dataset, option_results=option_results))
 
         logger.info("Selected data:")
-        _display_products(organization, products)
+        _display_plan(organization, _create_download_plan(organization, products))
 
         if not click.confirm("Do you want to download more data?"):
             break
@@ -228,18 +256,15 @@ def _select_products_interactive(organization: QCFullOrganization, datasets: Lis
     return products
 
 
-def _confirm_organization_balance(organization: QCFullOrganization, products: List[Product]) -> None:
+def _confirm_organization_balance(organization: QCFullOrganization, plan: DownloadPlan) -> None:
     """Checks whether the selected organization has enough QCC to download all selected data.
 
     Raises an error if the organization does not have enough QCC.
 
     :param organization: the organization that the user selected
-    :param products: the list of products selected by the user
+    :param plan: the plan of the data selected by the user
     """
-    all_data_files = _get_data_files(organization, products)
-    total_price = sum(data_file.vendor.price for data_file in all_data_files)
-
-    if total_price > organization.credit.balance:
+    if plan.total_price > organization.credit.balance:
         raise RuntimeError("\n".join([
             "The total price exceeds your organization's QCC balance",
             "You can purchase QCC by clicking \"Purchase Credit\" on your organization's home page:",
@@ -280,16 +305,15 @@ def _verify_accept_agreement(organization: QCFullOrganization, open_browser: boo
         )
 
 
-def _confirm_payment(organization: QCFullOrganization, products: List[Product]) -> None:
+def _confirm_payment(organization: QCFullOrganization, plan: DownloadPlan) -> None:
     """Processes payment for the selected products.
 
     An abort error is raised if the user decides to cancel.
 
     :param organization: the organization that will be charged
-    :param products: the list of products selected by the user
+    :param plan: the plan of the data selected by the user
     """
-    all_data_files = _get_data_files(organization, products)
-    total_price = sum(data_file.vendor.price for data_file in all_data_files)
+    total_price = plan.total_price
 
     organization_qcc = organization.credit.balance
 
@@ -374,12 +398,7 @@ def _select_products_non_interactive(organization: QCFullOrganization,
 
         raise RuntimeError("\n\n".join(blocks))
 
-    products = [Product(dataset=dataset, option_results=option_results)]
-
-    container.logger().info("Data that will be purchased and downloaded:")
-    _display_products(organization, products)
-
-    return products
+    return [Product(dataset=dataset, option_results=option_results)]
 
 
 def _get_available_datasets(organization: QCFullOrganization) -> List[Dataset]:
@@ -418,11 +437,28 @@ def _get_available_datasets(organization: QCFullOrganization) -> List[Dataset]:
 @click.option("--dataset", type=str, help="The name of the dataset to download non-interactively")
 @click.option("--organization", type=str, help="The name or id of the organization to purchase and download data with")
 @click.option("--overwrite", is_flag=True, default=False, help="Overwrite existing local data")
+@click.option("--no-archive",
+              is_flag=True,
+              default=False,
+              help="Don't keep a copy of bulk archives in the data directory after extracting them")
+@click.option("--max-bandwidth",
+              type=click.FloatRange(min=0, min_open=True),
+              help="The maximum download speed in MB/s (unlimited if not set)")
+@click.option("--plan",
+              type=PathParameter(exists=False, file_okay=True, dir_okay=False),
+              help="Save the files and prices of the selected data to a JSON file instead of downloading it")
+@click.option("--from-plan",
+              type=PathParameter(exists=True, file_okay=True, dir_okay=False),
+              help="Purchase and download the data in a JSON file created with --plan")
 @click.pass_context
 def download(ctx: click.Context,
              dataset: Optional[str],
              organization: Optional[str],
              overwrite: bool,
+             no_archive: bool,
+             max_bandwidth: Optional[float],
+             plan: Optional[Path],
+             from_plan: Optional[Path],
              **kwargs) -> None:
     """Purchase and download data from QuantConnect Datasets.
 
@@ -434,27 +470,57 @@ def download(ctx: click.Context,
     In this mode the CLI does not prompt for input or confirmation but only halts when the agreement must be accepted.
     In non-interactive mode all options specific to the selected dataset as well as --organization are required.
 
+    With --plan the selected data is planned and saved to a file instead of downloaded.
+    A saved plan can be purchased and downloaded non-interactively later with --from-plan,
+    without listing and pricing the data again.
+
     \b
     See the following url for the data that can be purchased and downloaded with this command:
     https://www.quantconnect.com/datasets
     """
-    is_interactive = dataset is None and organization is None
+    logger = container.logger()
+    is_interactive = dataset is None and organization is None and from_plan is None
+
+    if from_plan is not None:
+        if dataset is not None or organization is not None:
+            raise RuntimeError("--from-plan cannot be combined with --dataset or --organization")
 
-    if not is_interactive:
+        download_plan = DownloadPlan.load(from_plan)
+        selected_organization = container.api_client().organizations.get(download_plan.organization_id)
+
+        logger.info("Data that will be purchased and downloaded:")
+        _display_plan(selected_organization, download_plan)
+    elif not is_interactive:
         ensure_options(["dataset", "organization"])
         selected_organization = _get_organization_by_name_or_id(organization)
         datasets = _get_available_datasets(selected_organization)
         products = _select_products_non_interactive(selected_organization, datasets, ctx)
+        download_plan = _create_download_plan(selected_organization, products)
+
+        logger.info("Data that will be purchased and downloaded:")
+        _display_plan(selected_organization, download_plan)
     else:
         selected_organization = _select_organization()
         datasets = _get_available_datasets(selected_organization)
         products = _select_products_interactive(selected_organization, datasets)
 
-    _confirm_organization_balance(selected_organization, products)
+        # The products have been planned while they were selected, so this doesn't expand or price them again
+        download_plan = _create_download_plan(selected_organization, products)
+
+    if plan is not None:
+        download_plan.save(plan)
+        logger.info(f"Saved the download plan to '{plan}'")
+        logger.info(f"Run `lean data download --from-plan \"{plan}\"` to purchase and download it")
+        return
+
+    _confirm_organization_balance(selected_organization, download_plan)
     _verify_accept_agreement(selected_organization, is_interactive)
 
     if is_interactive:
-        _confirm_payment(selected_organization, products)
+        _confirm_payment(selected_organization, download_plan)
 
-    all_data_files = _get_data_files(selected_organization, products)
-    container.data_downloader().download_files(all_data_files, overwrite, selected_organization.id)
+    container.data_downloader().download_files(download_plan.data_files,
+                                               overwrite,
+                                               selected_organization.id,
+                                               keep_archives=not no_archive,
+                                               max_bandwidth=max_bandwidth * 1000 * 1000 if max_bandwidth else None)
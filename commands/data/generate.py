@@ -21,7 +21,7 @@ from lean.constants import DEFAULT_ENGINE_IMAGE
 from lean.container import container
 
 
-@click.command(cls=LeanCommand, requires_lean_config=True, requires_docker=True)
+@click.command(cls=LeanCommand, requires_lean_config=True, requires_docker=True, requires_database_files=True)
 @click.option("--start",
               type=DateParameter(),
               required=True,
@@ -0,0 +1,104 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional
+
+import click
+from rich import box
+from rich.table import Table
+
+from lean.click import LeanCommand
+from lean.components.util.data_manifest import DataManifest, verify_file
+from lean.components.util.system_resources import get_available_cpus
+from lean.constants import DATA_MANIFEST_FILE_NAME
+from lean.container import container
+
+
+@click.command(cls=LeanCommand, requires_lean_config=True)
+@click.option("--remove-invalid",
+              is_flag=True,
+              default=False,
+              help="Remove invalid files and their manifest entries so the next download fetches them again")
+@click.option("--jobs",
+              type=click.IntRange(min=1),
+              help="The number of processes to verify files with (defaults to the number of available CPUs)")
+def verify(remove_invalid: bool, jobs: Optional[int]) -> None:
+    """Verify the files downloaded to the data directory.
+
+    Every file downloaded with `lean data download` is recorded in a manifest in the data directory.
+    This command checks that these files still exist and still have the size and checksum they were downloaded with.
+    The CRCs of the members of zip files are checked too.
+    """
+    logger = container.logger()
+    data_dir = container.lean_config_manager().get_data_directory()
+
+    # Opening the manifest creates it, which verifying shouldn't do
+    manifest_file = data_dir / DATA_MANIFEST_FILE_NAME
+    if not manifest_file.is_file():
+        logger.info(f"There are no downloaded files recorded in {data_dir}")
+        return
+
+    manifest = DataManifest(manifest_file)
+    entries = manifest.get_all()
+
+    if len(entries) == 0:
+        logger.info(f"There are no downloaded files recorded in {data_dir}")
+        manifest.close()
+        return
+
+    progress = logger.progress(suffix="{task.percentage:0.0f}% ({task.completed:,.0f}/{task.total:,.0f})")
+    progress_task = progress.add_task("", total=len(entries))
+
+    invalid_files = []
+    try:
+        # Hashing and CRC checking is CPU-bound, so the files are verified by multiple processes
+        with ProcessPoolExecutor(max_workers=jobs or max(1, int(get_available_cpus()))) as executor:
+            problems = executor.map(partial(verify_file, data_dir), entries, chunksize=16)
+
+            for entry, problem in zip(entries, problems):
+                if problem is not None:
+                    invalid_files.append((entry, problem))
+                progress.update(progress_task, advance=1)
+    finally:
+        progress.stop()
+
+    if len(invalid_files) == 0:
+        logger.info(f"Successfully verified {len(entries):,.0f} files")
+        manifest.close()
+        return
+
+    table = Table(box=box.SQUARE)
+    table.add_column("File", overflow="fold")
+    table.add_column("Vendor", overflow="fold")
+    table.add_column("Problem", overflow="fold")
+
+    for entry, problem in invalid_files:
+        table.add_row(entry.path, entry.vendor or "", problem)
+
+    logger.info(table)
+
+    if remove_invalid:
+        for entry, _ in invalid_files:
+            file = data_dir / entry.path
+            if file.is_file():
+                file.unlink()
+            manifest.remove(entry.path)
+
+        logger.info(f"Removed {len(invalid_files):,.0f} invalid files, download them again to restore them")
+
+    manifest.close()
+
+    raise RuntimeError(f"{len(invalid_files):,.0f} of {len(entries):,.0f} files are invalid")
@@ -13,13 +13,10 @@
 
 import click
 
-from lean.commands.gui.logs import logs
-from lean.commands.gui.restart import restart
-from lean.commands.gui.start import start
-from lean.commands.gui.stop import stop
+from lean.click import LazyGroup
 
 
-@click.group()
+@click.group(cls=LazyGroup)
 def gui() -> None:
     """Work with the local GUI."""
     # This method is intentionally empty
@@ -27,7 +24,7 @@ def gui() -> None:
     pass
 
 
-gui.add_command(start)
-gui.add_command(restart)
-gui.add_command(stop)
-gui.add_command(logs)
+gui.add_lazy_command("start", "lean.commands.gui.start.start")
+gui.add_lazy_command("restart", "lean.commands.gui.restart.restart")
+gui.add_lazy_command("stop", "lean.commands.gui.stop.stop")
+gui.add_lazy_command("logs", "lean.commands.gui.logs.logs")
@@ -13,11 +13,10 @@
 
 import click
 
-from lean.commands.library.add import add
-from lean.commands.library.remove import remove
+from lean.click import LazyGroup
 
 
-@click.group()
+@click.group(cls=LazyGroup)
 def library() -> None:
     """Manage custom libraries in a project."""
     # This method is intentionally empty
@@ -25,5 +24,5 @@ def library() -> None:
     pass
 
 
-library.add_command(add)
-library.add_command(remove)
+library.add_lazy_command("add", "lean.commands.library.add.add")
+library.add_lazy_command("remove", "lean.commands.library.remove.remove")
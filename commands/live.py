@@ -239,7 +239,7 @@ for module in all_local_brokerages + all_local_data_feeds:
         setattr(config, '_default_property_name', default_property_name)
         run_options[config._name] = config
 
-@click.command(cls=LeanCommand, requires_lean_config=True, requires_docker=True)
+@click.command(cls=LeanCommand, requires_lean_config=True, requires_docker=True, requires_database_files=True)
 @click.argument("project", type=PathParameter(exists=True, file_okay=True, dir_okay=True))
 @click.option("--environment",
               type=str,
@@ -21,3 +21,4 @@ from lean.container import container
 def logout() -> None:
     """Log out and remove stored credentials."""
     container.credentials_storage().clear()
+    container.response_cache().clear()
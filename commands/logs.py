@@ -11,13 +11,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import re
+from collections import deque
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, List
+from time import sleep
+from typing import Callable, Iterator, List, Optional
 
 import click
+from dateutil.parser import isoparse
 
 from lean.click import LeanCommand, PathParameter
-from lean.constants import PROJECT_CONFIG_FILE_NAME
+from lean.components.util.log_store import LogStoreReader
+from lean.constants import CONTAINER_LOG_DIRECTORY_NAME, PROJECT_CONFIG_FILE_NAME, WARM_CONTAINER_LABEL
 from lean.container import container
 
 
@@ -37,6 +43,94 @@ def _get_project_directories() -> List[Path]:
     return project_directories
 
 
+def _get_session_log_file(session_directory: Path) -> Optional[Path]:
+    """Returns the file whose modification time tells when a session last logged something.
+
+    :param session_directory: the output directory of a backtest, live session or optimization
+    :return: the index of the captured log, the log.txt file written by LEAN, or None if the session has no logs
+    """
+    for log_file in [session_directory / CONTAINER_LOG_DIRECTORY_NAME / "index", session_directory / "log.txt"]:
+        if log_file.is_file():
+            return log_file
+
+    return None
+
+
+def _parse_since(since: str) -> datetime:
+    """Parses the value of the --since option.
+
+    :param since: a duration like 30s, 10m, 2h or 1d, or a timestamp like 2021-10-17 12:00:00
+    :return: the time lines must be logged after
+    """
+    duration_match = re.match(r"^(\d+)([smhd])$", since)
+    if duration_match is not None:
+        unit = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}[duration_match.group(2)]
+        return datetime.now() - timedelta(**{unit: int(duration_match.group(1))})
+
+    try:
+        return isoparse(since)
+    except ValueError:
+        raise RuntimeError(f"'{since}' is not a duration like 10m or a timestamp like 2021-10-17 12:00:00")
+
+
+def _is_session_finished(session_directory: Path) -> bool:
+    """Returns whether a backtest, live session or optimization has finished.
+
+    :param session_directory: the output directory of the session
+    :return: True if the captured log is complete or, if the output was not captured, the session's container stopped
+    """
+    log_directory = session_directory / CONTAINER_LOG_DIRECTORY_NAME
+    if LogStoreReader.exists(log_directory):
+        return LogStoreReader(log_directory).is_complete()
+
+    container_name = container.output_config_manager().get_output_config(session_directory).get("container", None)
+    if container_name is None:
+        return True
+
+    session_container = container.docker_manager().get_container_by_name(container_name)
+    return session_container is None or session_container.status != "running"
+
+
+def _read_log_file(log_file: Path,
+                   tail: Optional[int],
+                   follow: bool,
+                   is_finished: Callable[[], bool]) -> Iterator[bytes]:
+    """Streams the lines of a plain log file, like the log.txt files written by LEAN.
+
+    :param log_file: the path to the log file
+    :param tail: the amount of lines at the end of the file to start at, or None to start at the first line
+    :param follow: True to keep waiting for new lines until the session has finished, False to stop at the current end
+    :param is_finished: the function returning whether the session writing the log file has finished
+    :return: an iterator yielding the lines, including their trailing newlines
+    """
+    with log_file.open("rb") as file:
+        if tail is not None:
+            # Only the last lines are kept in memory while reading through the file
+            yield from deque(iter(file.readline, b""), maxlen=tail)
+        else:
+            yield from iter(file.readline, b"")
+
+        if not follow:
+            return
+
+        partial_line = b""
+        while True:
+            line = file.readline()
+            if line.endswith(b"\n"):
+                yield partial_line + line
+                partial_line = b""
+                continue
+
+            partial_line += line
+
+            # The session may have written its last lines between reaching the end and checking whether it finished
+            if is_finished():
+                yield from (partial_line + file.read()).splitlines(keepends=True)
+                return
+
+            sleep(0.25)
+
+
 @click.command(cls=LeanCommand, requires_lean_config=True)
 @click.option("--backtest", is_flag=True, default=False, help="Display the most recent backtest logs (default)")
 @click.option("--live", is_flag=True, default=False, help="Display the most recent live logs")
@@ -44,51 +138,129 @@ def _get_project_directories() -> List[Path]:
 @click.option("--project",
               type=PathParameter(exists=True, file_okay=False, dir_okay=True),
               help="The project to get the most recent logs from")
-def logs(backtest: bool, live: bool, optimization: bool, project: Optional[Path]) -> None:
-    """Display the most recent backtest/live/optimization logs."""
+@click.option("--console",
+              is_flag=True,
+              default=False,
+              help="Display the full output of the engine captured by the CLI instead of the log.txt file written by LEAN")
+@click.option("--containers",
+              is_flag=True,
+              default=False,
+              help="Display the logs of all running Lean CLI containers instead, prefixed by the container name")
+@click.option("--follow", "-f",
+              is_flag=True,
+              default=False,
+              help="Keep displaying new lines until the session has finished")
+@click.option("--since",
+              type=str,
+              help="Only display captured lines logged after a duration ago (like 10m) or a timestamp (like 2021-10-17 12:00:00)")
+@click.option("--grep", type=str, help="Only display lines matching the given regular expression")
+@click.option("--tail", type=int, help="Only display the given amount of lines at the end of the logs")
+def logs(backtest: bool,
+         live: bool,
+         optimization: bool,
+         project: Optional[Path],
+         console: bool,
+         containers: bool,
+         follow: bool,
+         since: Optional[str],
+         grep: Optional[str],
+         tail: Optional[int]) -> None:
+    """Display the most recent backtest/live/optimization logs.
+
+    \b
+    By default the log.txt file written by LEAN is displayed.
+    The CLI also captures the full output of the engine of every local backtest, live session and optimization,
+    which is displayed with --console, with --since, or when LEAN didn't write a log.txt file.
+    Captured logs are stored in compressed segments with an index, so --since and --tail don't read all of them.
+
+    \b
+    With --containers the logs of all running Lean CLI containers are displayed as one stream.
+    """
     if [backtest, live, optimization].count(True) > 1:
         raise RuntimeError("--backtest, --live and --optimization are mutually exclusive")
 
-    if not backtest and not live and not optimization:
-        backtest = True
-
-    if backtest:
-        mode = "backtest"
-        mode_directory = "backtests"
-    elif live:
-        mode = "live"
-        mode_directory = "live"
-    elif optimization:
-        mode = "optimization"
-        mode_directory = "optimizations"
-
-    if project is None:
-        project_directories = _get_project_directories()
+    if tail is not None and tail < 0:
+        raise RuntimeError("--tail must be a positive number")
+
+    since_time = _parse_since(since) if since is not None else None
+    grep_pattern = re.compile(grep.encode("utf-8")) if grep is not None else None
+
+    logger = container.logger()
+
+    if containers:
+        docker_manager = container.docker_manager()
+        container_names = sorted(name for name in docker_manager.get_running_containers()
+                                 if name.startswith("lean_cli_") and not name.startswith(WARM_CONTAINER_LABEL))
+        if len(container_names) == 0:
+            raise RuntimeError("There are no running Lean CLI containers")
+
+        lines = (f"[{name}] ".encode("utf-8") + line
+                 for name, line in docker_manager.stream_logs(container_names, follow, since_time, tail))
     else:
-        project_directories = [project]
+        if not backtest and not live and not optimization:
+            backtest = True
 
-    most_recent_file = None
-    most_recent_timestamp = None
+        if backtest:
+            mode = "backtest"
+            mode_directory = "backtests"
+        elif live:
+            mode = "live"
+            mode_directory = "live"
+        elif optimization:
+            mode = "optimization"
+            mode_directory = "optimizations"
 
-    for project_directory in project_directories:
-        target_directory = project_directory / mode_directory
-        if not target_directory.is_dir():
-            continue
+        if project is None:
+            project_directories = _get_project_directories()
+        else:
+            project_directories = [project]
 
-        for session_directory in target_directory.iterdir():
-            if not session_directory.is_dir():
-                continue
+        most_recent_directory = None
+        most_recent_timestamp = None
 
-            log_file = session_directory / "log.txt"
-            if not log_file.is_file():
+        for project_directory in project_directories:
+            target_directory = project_directory / mode_directory
+            if not target_directory.is_dir():
                 continue
 
-            log_file_timestamp = log_file.stat().st_mtime_ns
-            if most_recent_file is None or log_file_timestamp > most_recent_timestamp:
-                most_recent_file = log_file
-                most_recent_timestamp = log_file_timestamp
+            for session_directory in target_directory.iterdir():
+                if not session_directory.is_dir():
+                    continue
+
+                log_file = _get_session_log_file(session_directory)
+                if log_file is None:
+                    continue
+
+                log_file_timestamp = log_file.stat().st_mtime_ns
+                if most_recent_directory is None or log_file_timestamp > most_recent_timestamp:
+                    most_recent_directory = session_directory
+                    most_recent_timestamp = log_file_timestamp
+
+        if most_recent_directory is None:
+            raise RuntimeError(f"No {mode} log file exists")
+
+        log_directory = most_recent_directory / CONTAINER_LOG_DIRECTORY_NAME
+        log_file = most_recent_directory / "log.txt"
+
+        # Finding lines by time requires the index of the captured logs
+        if console or since_time is not None or not log_file.is_file():
+            if not LogStoreReader.exists(log_directory):
+                raise RuntimeError(f"--console and --since require captured logs, which '{most_recent_directory}' does not have")
+
+            lines = LogStoreReader(log_directory).read_lines(since_time.timestamp() if since_time is not None else None,
+                                                             tail,
+                                                             follow)
+        else:
+            lines = _read_log_file(log_file, tail, follow, lambda: _is_session_finished(most_recent_directory))
+
+    for line in lines:
+        if grep_pattern is not None and grep_pattern.search(line) is None:
+            continue
+
+        logger.write_raw(line)
 
-    if most_recent_file is None:
-        raise RuntimeError(f"No {mode} log file exists")
+        # New lines are displayed immediately while following, otherwise stdout buffers them
+        if follow:
+            logger.flush_raw()
 
-    print(most_recent_file.read_text(encoding="utf-8").strip())
+    logger.flush_raw()
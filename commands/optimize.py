@@ -22,14 +22,15 @@ import json5
 from docker.types import Mount
 
 from lean.click import LeanCommand, PathParameter, ensure_options
-from lean.constants import DEFAULT_ENGINE_IMAGE
+from lean.constants import CONTAINER_LOG_DIRECTORY_NAME, DEFAULT_ENGINE_IMAGE
 from lean.container import container
 from lean.models.api import QCParameter, QCBacktest
+from lean.models.docker import DockerResources
 from lean.models.errors import MoreInfoError
 from lean.models.optimizer import OptimizationTarget
 
 
-@click.command(cls=LeanCommand, requires_lean_config=True, requires_docker=True)
+@click.command(cls=LeanCommand, requires_lean_config=True, requires_docker=True, requires_database_files=True)
 @click.argument("project", type=PathParameter(exists=True, file_okay=True, dir_okay=True))
 @click.option("--output",
               type=PathParameter(exists=False, file_okay=False, dir_okay=True),
@@ -69,6 +70,21 @@ from lean.models.optimizer import OptimizationTarget
               is_flag=True,
               default=False,
               help="Pull the LEAN engine image before running the optimizer")
+@click.option("--cpus",
+              type=float,
+              help="The amount of CPUs the optimizer container may use, like 2.5")
+@click.option("--memory",
+              type=str,
+              help="The memory limit of the optimizer container, like 4g")
+@click.option("--cpuset-cpus",
+              type=str,
+              help="The CPUs the optimizer container is pinned to, like 0-3,8")
+@click.option("--numa-node",
+              type=int,
+              help="The NUMA node whose memory (and CPUs if --cpuset-cpus is not given) the optimizer container is pinned to")
+@click.option("--shm-size",
+              type=str,
+              help="The size of /dev/shm in the optimizer container, like 1g")
 def optimize(project: Path,
              output: Optional[Path],
              detach: bool,
@@ -80,7 +96,12 @@ def optimize(project: Path,
              constraint: List[str],
              release: bool,
              image: Optional[str],
-             update: bool) -> None:
+             update: bool,
+             cpus: Optional[float],
+             memory: Optional[str],
+             cpuset_cpus: Optional[str],
+             numa_node: Optional[int],
+             shm_size: Optional[str]) -> None:
     """Optimize a project's parameters locally using Docker.
 
     \b
@@ -112,6 +133,11 @@ def optimize(project: Path,
     By default the official LEAN engine image is used.
     You can override this using the --image option.
     Alternatively you can set the default engine image for all commands using `lean config set engine-image <image>`.
+
+    \b
+    The --cpus, --memory, --cpuset-cpus, --numa-node and --shm-size options limit the resources of the container.
+    They can also be set for a project in the "docker" object in its config.json, options take precedence.
+    The .NET garbage collector is configured to match the CPU and memory limits.
     """
     project_manager = container.project_manager()
     algorithm_file = project_manager.find_algorithm_file(project)
@@ -194,7 +220,18 @@ def optimize(project: Path,
     lean_config["messaging-handler"] = "QuantConnect.Messaging.Messaging"
 
     lean_runner = container.lean_runner()
-    run_options = lean_runner.get_basic_docker_config(lean_config, algorithm_file, output, None, release, detach)
+    resources = DockerResources(cpus=cpus,
+                                memory=memory,
+                                cpuset_cpus=cpuset_cpus,
+                                numa_node=numa_node,
+                                shm_size=shm_size)
+    run_options = lean_runner.get_basic_docker_config(lean_config,
+                                                      algorithm_file,
+                                                      output,
+                                                      None,
+                                                      release,
+                                                      detach,
+                                                      resources)
 
     run_options["working_dir"] = "/Lean/Optimizer.Launcher/bin/Debug"
     run_options["commands"].append("dotnet QuantConnect.Optimizer.Launcher.dll")
@@ -205,6 +242,9 @@ def optimize(project: Path,
               read_only=True)
     )
 
+    # Store the full output of the optimizer, the output printed to a terminal is rate-limited
+    run_options["log_directory"] = output / CONTAINER_LOG_DIRECTORY_NAME
+
     container.update_manager().pull_docker_image_if_necessary(engine_image, update)
 
     project_manager.copy_code(algorithm_file.parent, output / "code")
@@ -22,8 +22,7 @@ from docker.types import Mount
 from lean.click import LeanCommand, PathParameter
 from lean.constants import DEFAULT_RESEARCH_IMAGE, GUI_PRODUCT_INSTALL_ID
 from lean.container import container
-from lean.models.brokerages.local import all_data_providers
-from lean.models.brokerages.local import QuantConnectDataProvider
+from lean.models.brokerages.local import local_module_registry
 
 
 def _check_docker_output(chunk: str, port: int) -> None:
@@ -36,16 +35,16 @@ def _check_docker_output(chunk: str, port: int) -> None:
         webbrowser.open(f"http://localhost:{port}/")
 
 
-@click.command(cls=LeanCommand, requires_lean_config=True, requires_docker=True)
+@click.command(cls=LeanCommand, requires_lean_config=True, requires_docker=True, requires_database_files=True)
 @click.argument("project", type=PathParameter(exists=True, file_okay=False, dir_okay=True))
 @click.option("--port", type=int, default=8888, help="The port to run Jupyter Lab on (defaults to 8888)")
 @click.option("--data-provider",
-              type=click.Choice([dp.get_name() for dp in all_data_providers], case_sensitive=False),
+              type=click.Choice(local_module_registry.get_names("data-provider"), case_sensitive=False),
               help="Update the Lean configuration file to retrieve data from the given provider")
 @click.option("--download-data",
               is_flag=True,
               default=False,
-              help=f"Update the Lean configuration file to download data from the QuantConnect API, alias for --data-provider {QuantConnectDataProvider.get_name()}")
+              help="Update the Lean configuration file to download data from the QuantConnect API, alias for --data-provider QuantConnect")
 @click.option("--data-purchase-limit",
               type=int,
               help="The maximum amount of QCC to spend on downloading data during the research session when using QuantConnect as data provider")
@@ -85,10 +84,10 @@ def research(project: Path,
     lean_config["composer-dll-directory"] = "/Lean/Launcher/bin/Debug"
 
     if download_data:
-        data_provider = QuantConnectDataProvider.get_name()
+        data_provider = "QuantConnect"
 
     if data_provider is not None:
-        data_provider = next(dp for dp in all_data_providers if dp.get_name() == data_provider)
+        data_provider = local_module_registry.get_module("data-provider", data_provider)
         data_provider.build(lean_config, container.logger()).configure(lean_config, "backtesting")
 
     lean_config_manager.configure_data_purchase_limit(lean_config, data_purchase_limit)
@@ -25,6 +25,7 @@ from lean.components.api.backtest_client import BacktestClient
 from lean.components.api.compile_client import CompileClient
 from lean.components.api.data_client import DataClient
 from lean.components.api.file_client import FileClient
+from lean.components.api.listing_cache import ListingCache
 from lean.components.api.live_client import LiveClient
 from lean.components.api.market_client import MarketClient
 from lean.components.api.module_client import ModuleClient
@@ -32,6 +33,8 @@ from lean.components.api.node_client import NodeClient
 from lean.components.api.optimization_client import OptimizationClient
 from lean.components.api.organization_client import OrganizationClient
 from lean.components.api.project_client import ProjectClient
+from lean.components.api.response_cache import ResponseCache
+from lean.components.api.retry_policy import RetryPolicy
 from lean.components.api.service_client import ServiceClient
 from lean.components.api.user_client import UserClient
 from lean.components.util.http_client import HTTPClient
@@ -43,16 +46,28 @@ from lean.models.errors import AuthenticationError, RequestFailedError
 class APIClient:
     """The APIClient class manages communication with the QuantConnect API."""
 
-    def __init__(self, logger: Logger, http_client: HTTPClient, user_id: str, api_token: str) -> None:
+    def __init__(self,
+                 logger: Logger,
+                 http_client: HTTPClient,
+                 retry_policy: RetryPolicy,
+                 response_cache: ResponseCache,
+                 listing_cache: ListingCache,
+                 user_id: str,
+                 api_token: str) -> None:
         """Creates a new APIClient instance.
 
         :param logger: the logger to use to print debug messages to
         :param http_client: the HTTP client to make HTTP requests with
+        :param retry_policy: the RetryPolicy instance deciding when failed requests are retried
+        :param response_cache: the ResponseCache instance caching the responses of read-only endpoints
+        :param listing_cache: the ListingCache instance caching the listings of remote data files
         :param user_id: the QuantConnect user id to use when sending authenticated requests
         :param api_token: the QuantConnect API token to use when sending authenticated requests
         """
         self._logger = logger
         self._http_client = http_client
+        self._retry_policy = retry_policy
+        self._response_cache = response_cache
         self._user_id = user_id
         self._api_token = api_token
 
@@ -60,7 +75,7 @@ class APIClient:
         self.accounts = AccountClient(self)
         self.backtests = BacktestClient(self)
         self.compiles = CompileClient(self)
-        self.data = DataClient(self, http_client)
+        self.data = DataClient(self, http_client, listing_cache)
         self.files = FileClient(self)
         self.live = LiveClient(self)
         self.market = MarketClient(self)
@@ -108,39 +123,72 @@ class APIClient:
             self._logger.debug(traceback.format_exc().strip())
             return False
 
-    def _request(self, method: str, endpoint: str, options: Dict[str, Any] = {}, retry_http_5xx: bool = True) -> Any:
+    def _request(self, method: str, endpoint: str, options: Dict[str, Any] = {}) -> Any:
         """Makes an authenticated request to the given endpoint.
 
+        Failed requests are retried according to the retry policy.
+        Responses of read-only endpoints are served from and stored in the response cache.
+
         :param method: the HTTP method to use for the request
         :param endpoint: the API endpoint to send the request to
         :param options: additional options to pass on to requests.request()
-        :param retry_http_5xx: True if the request should be retried on an HTTP 5xx response, False if not
         :return: the parsed response of the request
         """
-        full_url = urljoin(API_BASE_URL, endpoint)
+        cached_data = self._response_cache.get(self._user_id, endpoint, options)
+        if cached_data is not None:
+            self._logger.debug(f"Using cached response of {endpoint}")
+            return cached_data
 
-        # Create the hash which is used to authenticate the user to the API
-        timestamp = str(int(time()))
-        password = sha256(f"{self._api_token}:{timestamp}".encode("utf-8")).hexdigest()
+        # The request may change the data of cached endpoints even if it fails, so we invalidate before sending it
+        self._response_cache.invalidate(endpoint)
 
-        headers = {
-            "Timestamp": timestamp
-        }
+        full_url = urljoin(API_BASE_URL, endpoint)
 
         version = lean.__version__
         if lean.__version__ == 'dev':
             version = 99999999
-        headers["User-Agent"] = f"Lean CLI {version}"
 
-        response = self._http_client.request(method,
-                                             full_url,
-                                             headers=headers,
-                                             auth=(self._user_id, password),
-                                             raise_for_status=False,
-                                             **options)
-
-        if 500 <= response.status_code < 600 and retry_http_5xx:
-            return self._request(method, endpoint, options, False)
+        attempt = 0
+        while True:
+            attempt += 1
+            self._retry_policy.acquire()
+
+            # Create the hash which is used to authenticate the user to the API
+            # This is done for every attempt because the timestamp is part of the hash
+            timestamp = str(int(time()))
+            password = sha256(f"{self._api_token}:{timestamp}".encode("utf-8")).hexdigest()
+
+            headers = {
+                "Timestamp": timestamp,
+                "User-Agent": f"Lean CLI {version}"
+            }
+
+            try:
+                response = self._http_client.request(method,
+                                                     full_url,
+                                                     headers=headers,
+                                                     auth=(self._user_id, password),
+                                                     raise_for_status=False,
+                                                     retry_count=attempt - 1,
+                                                     **options)
+            except requests.exceptions.RequestException as exception:
+                delay = self._retry_policy.get_retry_delay(endpoint, attempt, exception=exception)
+                if delay is None:
+                    raise
+
+                self._retry_policy.wait(endpoint, attempt, delay, type(exception).__name__, False)
+                continue
+
+            delay = self._retry_policy.get_retry_delay(endpoint, attempt, response=response)
+            if delay is None:
+                break
+
+            # Rate limits and overloaded servers affect all requests, so all threads back off together
+            self._retry_policy.wait(endpoint,
+                                    attempt,
+                                    delay,
+                                    f"HTTP {response.status_code}",
+                                    response.status_code in [429, 503])
 
         if response.status_code == 500:
             raise AuthenticationError()
@@ -148,7 +196,10 @@ class APIClient:
         if response.status_code < 200 or response.status_code >= 300:
             raise RequestFailedError(response)
 
-        return self._parse_response(response)
+        data = self._parse_response(response)
+        self._response_cache.set(self._user_id, endpoint, options, data)
+
+        return data
 
     def _parse_response(self, response: requests.Response) -> Any:
         """Parses the data in a response.
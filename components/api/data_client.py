@@ -12,35 +12,203 @@
 # limitations under the License.
 
 import os
-from shutil import move
-from tempfile import NamedTemporaryFile
+from pathlib import Path
+from time import sleep
 from lean.components.api.api_client import *
+from joblib import delayed, Parallel
+from lean.components.api.listing_cache import FileListing, ListingCache
+from lean.components.util.concurrency_budget import ConcurrencyBudget
+from lean.components.util.download_journal import DownloadJournal
+from lean.constants import DOWNLOAD_MAX_ATTEMPTS, PARTIAL_DOWNLOAD_SUFFIX, MULTI_RANGE_DOWNLOAD_THRESHOLD, \
+    MULTI_RANGE_DOWNLOAD_PARTS, MULTI_RANGE_DOWNLOAD_MIN_PART_SIZE
 from lean.models.api import QCDataInformation
-from typing import List, Callable
+from lean.models.errors import RequestFailedError
+from typing import Callable, Optional
+
+
+# The status code object storage responds with when a presigned link has expired
+# Expired links are never resolved again, because resolving a link purchases the file again
+_expired_link_status_code = 403
 
 
 class DataClient:
     """The DataClient class contains methods to interact with data/* API endpoints."""
 
-    _list_files_cache: Dict[str, List[str]] = {}
-
-    def __init__(self, api_client: 'APIClient', http_client: 'HTTPClient') -> None:
+    def __init__(self, api_client: 'APIClient', http_client: 'HTTPClient', listing_cache: ListingCache) -> None:
         """Creates a new DataClient instance.
 
         :param api_client: the APIClient instance to use when making requests
         :param http_client: the HTTPClient instance to use when downloading files
+        :param listing_cache: the ListingCache instance to cache the listings of remote files in
         """
         self._api = api_client
         self._http_client = http_client
+        self._listing_cache = listing_cache
 
-    def download_file(self, relative_file_path: str, organization_id: str,
-                      local_filename: str, progress_callback: Callable[[float], None]) -> None:
+    def download_file(self,
+                      relative_file_path: str,
+                      organization_id: str,
+                      local_filename: str,
+                      progress_callback: Callable[[float], None],
+                      journal: Optional[DownloadJournal] = None,
+                      budget: Optional[ConcurrencyBudget] = None,
+                      link: Optional[str] = None) -> None:
         """Downloads the content of a downloadable data file.
 
+        The content is written to a sibling partial file which is atomically renamed when the download is complete.
+        Interrupted transfers are resumed with HTTP Range requests, also across invocations when a journal is given.
+        Files larger than MULTI_RANGE_DOWNLOAD_THRESHOLD are fetched as multiple concurrent byte ranges
+        if the given budget has free slots.
+
+        A link resolved ahead of time with get_link() may be given, it must be used before it expires.
+
         :param relative_file_path: the relative path of the data file
         :param organization_id: the id of the organization that should be billed
         :param local_filename: the final local path where the data file will be stored
         :param progress_callback: the download progress callback
+        :param journal: the journal to record the state of the download in, used to resume interrupted downloads
+        :param budget: the concurrency budget of which free slots may be used to fetch ranges of large files,
+                       which is also told about errors and limits the bandwidth of the transfer
+        :param link: the presigned url of the file, resolved from the API if not given
+        """
+        if link is None:
+            link = self.get_link(relative_file_path, organization_id)
+
+        local_path = Path(local_filename)
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = local_path.parent / f"{local_path.name}{PARTIAL_DOWNLOAD_SUFFIX}"
+
+        # Partial content can only be resumed if we know which version of the remote file it belongs to
+        validator = journal.get_validator(relative_file_path) if journal is not None else None
+
+        reported_progress = 0.0
+        attempt = 0
+
+        while True:
+            attempt += 1
+
+            offset = partial_path.stat().st_size if validator is not None and partial_path.is_file() else 0
+            headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset > 0 else {}
+
+            try:
+                with self._http_client.get(link, stream=True, headers=headers, raise_for_status=False) as r:
+                    if r.status_code == _expired_link_status_code:
+                        raise self._expired_link_error(r, relative_file_path)
+
+                    # The partial file is invalid if the server can't serve the rest of it
+                    if r.status_code == 416:
+                        if partial_path.is_file():
+                            partial_path.unlink()
+                        validator = None
+                        continue
+
+                    r.raise_for_status()
+
+                    # If the remote file changed since the partial content was written, the server sends all of it
+                    if r.status_code != 206:
+                        offset = 0
+
+                    total_size = self._get_total_size(r, offset)
+
+                    parts = self._claim_range_parts(r, offset, total_size, budget)
+                    if parts > 1:
+                        # A partial file written in ranges has gaps, so it can't be resumed from its size
+                        if journal is not None:
+                            journal.start(relative_file_path, None)
+
+                        # Progress reported by an earlier attempt counts towards the progress of the ranges
+                        remaining_progress = 1 - reported_progress
+                        ranges_progress_callback = lambda advance: progress_callback(advance * remaining_progress)
+
+                        # The response of the initial request is used for the first range instead of closed
+                        try:
+                            current_size = self._download_ranges(link,
+                                                                 r,
+                                                                 partial_path,
+                                                                 total_size,
+                                                                 parts,
+                                                                 ranges_progress_callback,
+                                                                 budget)
+                        finally:
+                            budget.release(parts - 1)
+
+                        reported_progress = 1.0
+                        break
+
+                    validator = r.headers.get("ETag", None)
+                    if journal is not None:
+                        journal.start(relative_file_path, validator)
+
+                    with partial_path.open("ab" if offset > 0 else "wb") as f:
+                        current_size = offset
+                        for chunk in r.iter_content(chunk_size=1024 * 1024):
+                            current_size += f.write(chunk)
+
+                            if budget is not None:
+                                budget.throttle(len(chunk))
+
+                            # progressive progress update if we can
+                            # If the download restarted from the beginning, progress is reported again
+                            # once the restarted download gets past what was reported before
+                            if total_size != 0 and current_size / total_size > reported_progress:
+                                progress_callback((current_size / total_size) - reported_progress)
+                                reported_progress = current_size / total_size
+                break
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout):
+                if budget is not None:
+                    budget.record_error()
+
+                if attempt >= DOWNLOAD_MAX_ATTEMPTS:
+                    raise
+
+                sleep(min(2 ** (attempt - 1), 30))
+
+        if total_size != 0 and current_size != total_size:
+            raise RuntimeError(f"Downloaded {current_size:,} bytes of {relative_file_path} but expected {total_size:,}")
+
+        # update the progress at the end for the part we couldn't report progressively
+        progress_callback(1 - reported_progress)
+
+        os.replace(partial_path, local_path)
+
+        if journal is not None:
+            journal.complete(relative_file_path)
+
+    def open_file_stream(self,
+                         relative_file_path: str,
+                         organization_id: str,
+                         link: Optional[str] = None) -> requests.Response:
+        """Opens a streaming response containing the content of a downloadable data file.
+
+        The caller is responsible for closing the response.
+
+        :param relative_file_path: the relative path of the data file
+        :param organization_id: the id of the organization that should be billed
+        :param link: the presigned url of the file resolved ahead of time, resolved from the API if not given
+        :return: the streaming response, of which the content has not been read yet
+        """
+        if link is None:
+            link = self.get_link(relative_file_path, organization_id)
+
+        response = self._http_client.get(link, stream=True, raise_for_status=False)
+        if response.status_code == _expired_link_status_code:
+            response.close()
+            raise self._expired_link_error(response, relative_file_path)
+
+        response.raise_for_status()
+        return response
+
+    def get_link(self, relative_file_path: str, organization_id: str) -> str:
+        """Returns the presigned link a downloadable data file can be downloaded from.
+
+        Resolving the link is what purchases the file, so only files that are going to be downloaded should be resolved.
+        The link expires after a while, so it should be resolved shortly before the file is downloaded.
+
+        :param relative_file_path: the relative path of the data file
+        :param organization_id: the id of the organization that should be billed
+        :return: the presigned url of the file
         """
         data = self._api.post("data/read", {
             "format": "link",
@@ -48,33 +216,165 @@ class DataClient:
             "organizationId": organization_id
         })
 
-        # we stream the data into a temporary file and later move it to it's final location
-        with self._http_client.get(data["link"], stream=True) as r:
-            r.raise_for_status()
-            total_size = 0
-            try:
-                total_size = int(r.headers['Content-length'])
-            except:
-                pass
-            current_size = 0
-            with NamedTemporaryFile(delete=False) as f:
-                temp_file_name = f.name
-                for chunk in r.iter_content(chunk_size=1024 * 1024):
-                    if total_size != 0:
-                        previous = current_size / total_size
-
-                    current_size += f.write(chunk)
-
-                    if total_size != 0:
-                        # progressive progress update if we can
-                        progress_callback((current_size / total_size) - previous)
-            if total_size == 0:
-                # if total size not available update progress at the end
-                progress_callback(1)
-
-            directory = os.path.dirname(local_filename)
-            os.makedirs(directory, exist_ok=True)
-            move(temp_file_name, local_filename)
+        return data["link"]
+
+    def _claim_range_parts(self,
+                           response: requests.Response,
+                           offset: int,
+                           total_size: int,
+                           budget: Optional[ConcurrencyBudget]) -> int:
+        """Returns the amount of concurrent ranges a file should be fetched in, claiming the required budget slots.
+
+        The slot of the current transfer is already claimed, so a file fetched in N ranges claims N - 1 extra slots.
+
+        :param response: the response of the initial request for the file
+        :param offset: the position in the file the response content starts at
+        :param total_size: the total size of the file in bytes
+        :param budget: the concurrency budget to claim slots from
+        :return: the amount of ranges to fetch the file in, 1 if the file should be streamed in one request
+        """
+        if budget is None or offset > 0 or total_size < MULTI_RANGE_DOWNLOAD_THRESHOLD:
+            return 1
+
+        if response.headers.get("Accept-Ranges", "none") != "bytes":
+            return 1
+
+        wanted_parts = min(MULTI_RANGE_DOWNLOAD_PARTS, total_size // MULTI_RANGE_DOWNLOAD_MIN_PART_SIZE)
+        return budget.try_acquire(wanted_parts - 1) + 1
+
+    def _download_ranges(self,
+                         link: str,
+                         response: requests.Response,
+                         partial_path: Path,
+                         total_size: int,
+                         parts: int,
+                         progress_callback: Callable[[float], None],
+                         budget: ConcurrencyBudget) -> int:
+        """Downloads a file as multiple concurrent byte ranges into a preallocated file.
+
+        :param link: the url of the file
+        :param response: the response of the initial request for the file, which is used for the first range
+        :param partial_path: the path to the file to write to
+        :param total_size: the total size of the file in bytes
+        :param parts: the amount of ranges to split the file in
+        :param progress_callback: the download progress callback
+        :param budget: the concurrency budget the ranges were claimed from
+        :return: the amount of bytes written in all ranges together
+        """
+        with partial_path.open("wb") as f:
+            f.truncate(total_size)
+
+        part_size = -(-total_size // parts)
+        ranges = [(start, min(start + part_size, total_size) - 1) for start in range(0, total_size, part_size)]
+
+        try:
+            parallel = Parallel(n_jobs=len(ranges), backend="threading")
+            written = parallel(delayed(self._download_range)(link,
+                                                             response if start == 0 else None,
+                                                             partial_path,
+                                                             start,
+                                                             end,
+                                                             total_size,
+                                                             progress_callback,
+                                                             budget) for start, end in ranges)
+        except:
+            partial_path.unlink()
+            raise
+
+        return sum(written)
+
+    def _download_range(self,
+                        link: str,
+                        response: Optional[requests.Response],
+                        partial_path: Path,
+                        start: int,
+                        end: int,
+                        total_size: int,
+                        progress_callback: Callable[[float], None],
+                        budget: ConcurrencyBudget) -> int:
+        """Downloads a single byte range of a file into its position in a preallocated file.
+
+        :param link: the url of the file
+        :param response: an open response of which the content starts at the start of the range,
+                         which is read until the end of the range before new requests are made
+        :param partial_path: the path to the preallocated file to write to
+        :param start: the position of the first byte of the range
+        :param end: the position of the last byte of the range
+        :param total_size: the total size of the file in bytes
+        :param progress_callback: the download progress callback
+        :param budget: the concurrency budget the range was claimed from
+        :return: the amount of bytes written in the range
+        """
+        position = start
+        attempt = 0
+
+        with partial_path.open("r+b") as f:
+            while position <= end:
+                attempt += 1
+
+                try:
+                    if response is not None:
+                        r, response = response, None
+                    else:
+                        r = self._http_client.get(link, stream=True, headers={"Range": f"bytes={position}-{end}"})
+                        if r.status_code != 206:
+                            r.close()
+                            raise RuntimeError(f"Expected a partial response for bytes {position}-{end} of {link}")
+
+                    with r:
+                        f.seek(position)
+                        for chunk in r.iter_content(chunk_size=1024 * 1024):
+                            chunk = chunk[:end + 1 - position]
+                            position += f.write(chunk)
+                            progress_callback(len(chunk) / total_size)
+                            budget.throttle(len(chunk))
+
+                            # The initial response contains the rest of the file, which the other ranges fetch
+                            if position > end:
+                                break
+                except (requests.exceptions.ConnectionError,
+                        requests.exceptions.ChunkedEncodingError,
+                        requests.exceptions.Timeout):
+                    budget.record_error()
+
+                    if attempt >= DOWNLOAD_MAX_ATTEMPTS:
+                        raise
+
+                    sleep(min(2 ** (attempt - 1), 30))
+                    continue
+
+                # The response may end before the range is complete, in which case we request the rest
+                if position <= end and attempt >= DOWNLOAD_MAX_ATTEMPTS:
+                    raise RuntimeError(f"Downloaded bytes {start}-{position - 1} of {link} but expected {start}-{end}")
+
+        return position - start
+
+    def _get_total_size(self, response: requests.Response, offset: int) -> int:
+        """Returns the total size of a file that is being downloaded.
+
+        :param response: the response containing (a range of) the file
+        :param offset: the position in the file the response content starts at
+        :return: the total size of the file in bytes, or 0 if it is unknown
+        """
+        content_range = response.headers.get("Content-Range", "")
+        if "/" in content_range and not content_range.endswith("/*"):
+            return int(content_range.split("/")[-1])
+
+        try:
+            return offset + int(response.headers["Content-Length"])
+        except (KeyError, ValueError):
+            return 0
+
+    def _expired_link_error(self, response: requests.Response, relative_file_path: str) -> RequestFailedError:
+        """Returns the error raised when the presigned link of a file expired before it was used.
+
+        :param response: the response of object storage to the expired link
+        :param relative_file_path: the relative path of the data file
+        :return: the error describing that the file has to be downloaded again
+        """
+        return RequestFailedError(response,
+                                  f"The link of {relative_file_path} expired before it was downloaded, "
+                                  f"download the file again to get it")
 
     def download_public_file(self, data_endpoint: str) -> bytes:
         """Downloads the content of a downloadable public file.
@@ -84,25 +384,26 @@ class DataClient:
         """
         return self._http_client.get(data_endpoint).content
 
-    def list_files(self, prefix: str) -> List[str]:
+    def list_files(self, prefix: str) -> FileListing:
         """Lists all remote files with a given prefix.
 
+        Listings are cached on disk, so listing the same prefix again within its time-to-live sends no request.
+
         :param prefix: the prefix of the files to return
-        :return: the list of files with the given prefix
+        :return: the sorted listing of the files with the given prefix
         """
-        if prefix in DataClient._list_files_cache:
-            return DataClient._list_files_cache[prefix]
+        listing = self._listing_cache.get(prefix)
+        if listing is not None:
+            return listing
 
         data = self._api.post("data/list", {
             "filePath": prefix
         })
 
         first_part = prefix.split("/")[0]
-        files = sorted(f"{first_part}/{obj}" for obj in data["objects"])
-
-        DataClient._list_files_cache[prefix] = files
+        files = [f"{first_part}/{obj}" for obj in data["objects"]]
 
-        return files
+        return self._listing_cache.set(prefix, files)
 
     def get_info(self, organization_id: str) -> QCDataInformation:
         """Returns the available data vendors, their prices and a link to the data agreement.
@@ -0,0 +1,318 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from time import time
+from typing import Iterable, Iterator, List, Optional, Pattern, Sequence, Set
+
+from lean.constants import LISTING_CACHE_MAX_PATHS
+
+# Path fragments of listings that gain new files every day, mapped to the amount of seconds their listings stay valid
+# Listings matching none of these fragments stay valid for _default_ttl seconds
+_listing_ttls = {
+    "/tick/": 60 * 60,
+    "/second/": 60 * 60,
+    "/minute/": 60 * 60,
+    "/map_files/": 60 * 60,
+    "/factor_files/": 60 * 60,
+    "/universes/": 60 * 60
+}
+_default_ttl = 12 * 60 * 60
+
+
+class FileListing(Sequence[str]):
+    """A FileListing is an immutable, sorted list of the remote files with a given prefix.
+
+    Instead of a Python string per file, the parts of the paths after the prefix are stored in a single string
+    with an array of their offsets, which takes a fraction of the memory for listings of hundreds of thousands of files.
+    """
+
+    def __init__(self, prefix: str, files: List[str], expires_at: float) -> None:
+        """Creates a new FileListing instance.
+
+        :param prefix: the prefix all files share
+        :param files: the paths of the files, which must all start with the prefix
+        :param expires_at: the unix timestamp after which the listing is outdated
+        """
+        self.prefix = prefix
+        self.expires_at = expires_at
+
+        suffixes = sorted(file[len(prefix):] for file in files if file.startswith(prefix))
+
+        self._suffixes = "".join(suffixes)
+        self._offsets = array("L", [0])
+        for suffix in suffixes:
+            self._offsets.append(self._offsets[-1] + len(suffix))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("FileListing index out of range")
+
+        return self.prefix + self._suffixes[self._offsets[index]:self._offsets[index + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __contains__(self, file: str) -> bool:
+        if not isinstance(file, str) or not file.startswith(self.prefix):
+            return False
+
+        # Planning a download looks up every possible file, so the binary search compares the suffixes directly
+        # instead of creating the full path of every file it visits through __getitem__
+        suffix = file[len(self.prefix):]
+        suffixes = self._suffixes
+        offsets = self._offsets
+
+        low = 0
+        high = len(offsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if suffixes[offsets[middle]:offsets[middle + 1]] < suffix:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low < len(offsets) - 1 and suffixes[offsets[low]:offsets[low + 1]] == suffix
+
+    def filter_listed(self, files: Iterable[str]) -> Set[str]:
+        """Returns the files which are in the listing.
+
+        Sorting the files and walking them alongside the sorted listing is a lot cheaper
+        than a binary search for every file when there are many files to look up.
+
+        :param files: the paths of the files to look up
+        :return: the paths of the given files which are in the listing
+        """
+        suffixes = sorted(file[len(self.prefix):] for file in files if file.startswith(self.prefix))
+
+        listed_suffixes = self._suffixes
+        offsets = self._offsets
+        count = len(offsets) - 1
+
+        listed_files = set()
+        index = 0
+        for suffix in suffixes:
+            while index < count and listed_suffixes[offsets[index]:offsets[index + 1]] < suffix:
+                index += 1
+
+            if index == count:
+                break
+
+            if listed_suffixes[offsets[index]:offsets[index + 1]] == suffix:
+                listed_files.add(self.prefix + suffix)
+
+        return listed_files
+
+    def find_last(self, regex: Pattern) -> Optional[str]:
+        """Returns the last file in sorted order which matches a regular expression.
+
+        :param regex: the regular expression to match files against
+        :return: the last matching file, or None if no file matches
+        """
+        for index in range(len(self) - 1, -1, -1):
+            file = self[index]
+            if regex.match(file) is not None:
+                return file
+
+        return None
+
+    def is_expired(self) -> bool:
+        """Returns whether the listing is outdated.
+
+        :return: True if the remote files may have changed since the listing was made, False if not
+        """
+        return time() > self.expires_at
+
+
+class ListingCache:
+    """The ListingCache class caches the listings of remote data files on disk and in memory.
+
+    Every listing is stored compressed in its own file, so reading a listing never reads the listings of other prefixes.
+    Recently used listings are kept in memory until the total amount of cached paths exceeds LISTING_CACHE_MAX_PATHS.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """Creates a new ListingCache instance.
+
+        :param directory: the directory to store the cached listings in
+        """
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._listings: OrderedDict = OrderedDict()
+        self._cached_paths = 0
+        self._removed_expired_files = False
+
+        # When disabled, cached listings are never returned but new listings are still stored
+        self.enabled = True
+
+    def get(self, prefix: str) -> Optional[FileListing]:
+        """Returns the cached listing of a prefix.
+
+        :param prefix: the prefix to get the listing of
+        :return: the cached listing, or None if the prefix is not cached or its listing is outdated
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            listing = self._listings.get(prefix, None)
+            if listing is not None:
+                self._listings.move_to_end(prefix)
+
+        if listing is None:
+            listing = self._read_listing(prefix)
+            if listing is not None:
+                self._remember(listing)
+
+        if listing is None or listing.is_expired():
+            return None
+
+        return listing
+
+    def set(self, prefix: str, files: List[str]) -> FileListing:
+        """Caches the listing of a prefix.
+
+        :param prefix: the prefix the files were listed with
+        :param files: the paths of the remote files with the given prefix
+        :return: the cached listing
+        """
+        listing = FileListing(prefix, files, time() + self._get_ttl(prefix))
+        self._remember(listing)
+
+        # Expired listings are only replaced when their prefix is listed again, so the others are removed once
+        with self._lock:
+            remove_expired_files = not self._removed_expired_files
+            self._removed_expired_files = True
+
+        if remove_expired_files:
+            self._remove_expired_files()
+
+        self._write_listing(listing)
+        return listing
+
+    def clear(self) -> None:
+        """Removes all cached listings."""
+        with self._lock:
+            self._listings.clear()
+            self._cached_paths = 0
+
+            if self._directory.is_dir():
+                for file in self._directory.iterdir():
+                    file.unlink()
+
+    def _remember(self, listing: FileListing) -> None:
+        """Keeps a listing in memory, evicting the least recently used listings if there are too many cached paths.
+
+        :param listing: the listing to keep in memory
+        """
+        with self._lock:
+            previous_listing = self._listings.pop(listing.prefix, None)
+            if previous_listing is not None:
+                self._cached_paths -= len(previous_listing)
+
+            self._listings[listing.prefix] = listing
+            self._cached_paths += len(listing)
+
+            while self._cached_paths > LISTING_CACHE_MAX_PATHS and len(self._listings) > 1:
+                _, evicted_listing = self._listings.popitem(last=False)
+                self._cached_paths -= len(evicted_listing)
+
+    def _remove_expired_files(self) -> None:
+        """Removes the cached listings which have certainly expired, and temporary files left by killed invocations.
+
+        Listings are written once and never updated, so their modification time is the time they were cached.
+        """
+        if not self._directory.is_dir():
+            return
+
+        max_ttl = max([_default_ttl, *_listing_ttls.values()])
+
+        now = time()
+        for file in self._directory.iterdir():
+            try:
+                if now - file.stat().st_mtime > max_ttl:
+                    file.unlink()
+            except OSError:
+                # Another invocation may be removing the same file
+                continue
+
+    def _read_listing(self, prefix: str) -> Optional[FileListing]:
+        """Reads the cached listing of a prefix from disk.
+
+        :param prefix: the prefix to read the listing of
+        :return: the cached listing, or None if it is not cached or the cache file can't be read
+        """
+        file = self._get_file(prefix)
+        if not file.is_file():
+            return None
+
+        try:
+            lines = gzip.decompress(file.read_bytes()).decode("utf-8").split("\n")
+            header = json.loads(lines[0])
+        except (OSError, EOFError, ValueError):
+            return None
+
+        # Different prefixes could share a file name if their hashes collide
+        if header["prefix"] != prefix:
+            return None
+
+        return FileListing(prefix, [prefix + suffix for suffix in lines[1:] if suffix != ""], header["expires-at"])
+
+    def _write_listing(self, listing: FileListing) -> None:
+        """Writes a listing to disk.
+
+        :param listing: the listing to write
+        """
+        header = json.dumps({"prefix": listing.prefix, "expires-at": listing.expires_at})
+        content = "\n".join([header] + [file[len(listing.prefix):] for file in listing])
+
+        file = self._get_file(listing.prefix)
+        file.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a sibling file first so concurrent invocations never read a partially written listing
+        temp_file = file.parent / f"{file.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        temp_file.write_bytes(gzip.compress(content.encode("utf-8"), compresslevel=6))
+        os.replace(temp_file, file)
+
+    def _get_file(self, prefix: str) -> Path:
+        """Returns the path to the file the listing of a prefix is stored in.
+
+        :param prefix: the prefix of the listing
+        :return: the path to the cache file of the listing
+        """
+        return self._directory / f"{hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:32]}.gz"
+
+    def _get_ttl(self, prefix: str) -> int:
+        """Returns the amount of seconds the listing of a prefix stays valid.
+
+        :param prefix: the prefix of the listing
+        :return: the time-to-live of the listing
+        """
+        return next((ttl for fragment, ttl in _listing_ttls.items() if fragment in prefix), _default_ttl)
@@ -0,0 +1,204 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from time import time
+from typing import Any, Dict, List, Optional, Set
+
+from lean.constants import API_BASE_URL
+
+# The endpoints whose responses are cached, mapped to the amount of seconds their responses stay valid
+_cached_endpoints: Dict[str, int] = {
+    "projects/read": 60,
+    "organizations/read": 10 * 60,
+    "nodes/read": 30,
+    "data/prices": 60 * 60,
+    "market/data/list": 60 * 60
+}
+
+# The cached endpoints, mapped to the prefixes of the write endpoints that change their responses
+# data/read purchases the requested file, which changes the credit balance of the organization
+_invalidating_endpoints: Dict[str, List[str]] = {
+    "projects/read": ["projects/create", "projects/update", "projects/delete", "projects/library/",
+                      "files/create", "files/update", "files/delete"],
+    "organizations/read": ["data/read", "nodes/create", "nodes/update", "nodes/delete", "nodes/stop",
+                           "live/create", "live/update", "backtests/create", "optimizations/create"],
+    "nodes/read": ["nodes/create", "nodes/update", "nodes/delete", "nodes/stop", "live/create", "live/update",
+                   "backtests/create", "optimizations/create", "optimizations/abort"],
+    "data/prices": [],
+    "market/data/list": []
+}
+
+
+class ResponseCache:
+    """The ResponseCache class caches the responses of read-only API endpoints that change slowly.
+
+    Responses are keyed by user, endpoint and request options, and each endpoint has its own time-to-live.
+    Requests to endpoints that change the data of a cached endpoint remove the cached responses of that endpoint.
+
+    Every response is stored in its own file in a directory per endpoint. Files are replaced atomically,
+    so concurrent invocations of the CLI never see partially written responses, and unreadable files are ignored.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """Creates a new ResponseCache instance.
+
+        :param directory: the directory to store the cached responses in
+        """
+        self._directory = directory
+        self._lock = threading.Lock()
+
+        # The cached endpoints which are known to have no cached responses, which makes repeated invalidations free
+        self._empty_endpoints: Set[str] = set()
+
+        # When disabled, cached responses are never returned but new responses are still stored
+        self.enabled = True
+
+    def get(self, user_id: str, endpoint: str, options: Dict[str, Any]) -> Optional[Any]:
+        """Returns the cached response of a request.
+
+        :param user_id: the id of the user sending the request
+        :param endpoint: the API endpoint the request is sent to
+        :param options: the options of the request, containing its parameters or body
+        :return: the cached parsed response, or None if no valid response is cached
+        """
+        endpoint = endpoint.strip("/")
+        if not self.enabled or endpoint not in _cached_endpoints:
+            return None
+
+        file = self._get_file(user_id, endpoint, options)
+
+        try:
+            entry = json.loads(file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(entry, dict) or "time" not in entry or "data" not in entry:
+            return None
+
+        if time() - entry["time"] > _cached_endpoints[endpoint]:
+            self._remove_file(file)
+            return None
+
+        return entry["data"]
+
+    def set(self, user_id: str, endpoint: str, options: Dict[str, Any], data: Any) -> None:
+        """Caches the response of a request if the endpoint it was sent to is cacheable.
+
+        :param user_id: the id of the user who sent the request
+        :param endpoint: the API endpoint the request was sent to
+        :param options: the options of the request, containing its parameters or body
+        :param data: the parsed response of the request
+        """
+        endpoint = endpoint.strip("/")
+        if endpoint not in _cached_endpoints:
+            return
+
+        file = self._get_file(user_id, endpoint, options)
+
+        try:
+            self._remove_expired_files(endpoint)
+
+            file.parent.mkdir(parents=True, exist_ok=True)
+
+            # Write to a sibling file first so concurrent invocations never read a partially written response
+            temp_file = file.parent / f"{file.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+            temp_file.write_text(json.dumps({"time": time(), "data": data}), encoding="utf-8")
+            os.replace(temp_file, file)
+        except OSError:
+            # A response which can't be cached is requested again next time
+            return
+
+        with self._lock:
+            self._empty_endpoints.discard(endpoint)
+
+    def invalidate(self, endpoint: str) -> None:
+        """Removes the cached responses that a request to the given endpoint may change.
+
+        :param endpoint: the API endpoint a request is sent to
+        """
+        endpoint = endpoint.strip("/")
+        invalidated_endpoints = [cached_endpoint for cached_endpoint, prefixes in _invalidating_endpoints.items()
+                                 if any(endpoint.startswith(prefix) for prefix in prefixes)]
+
+        for invalidated_endpoint in invalidated_endpoints:
+            with self._lock:
+                if invalidated_endpoint in self._empty_endpoints:
+                    continue
+
+            shutil.rmtree(self._get_endpoint_directory(invalidated_endpoint), ignore_errors=True)
+
+            with self._lock:
+                self._empty_endpoints.add(invalidated_endpoint)
+
+    def clear(self) -> None:
+        """Removes all cached responses."""
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+        with self._lock:
+            self._empty_endpoints = set(_cached_endpoints.keys())
+
+    def _remove_expired_files(self, endpoint: str) -> None:
+        """Removes the cached responses of an endpoint which are no longer valid.
+
+        Responses are written once and never updated, so their modification time is the time they were cached.
+
+        :param endpoint: the cached endpoint to remove the expired responses of
+        """
+        directory = self._get_endpoint_directory(endpoint)
+        if not directory.is_dir():
+            return
+
+        now = time()
+        for file in directory.iterdir():
+            try:
+                if now - file.stat().st_mtime > _cached_endpoints[endpoint]:
+                    self._remove_file(file)
+            except OSError:
+                continue
+
+    def _remove_file(self, file: Path) -> None:
+        """Removes a cached response, ignoring responses which have already been removed.
+
+        :param file: the file containing the cached response
+        """
+        try:
+            file.unlink()
+        except OSError:
+            pass
+
+    def _get_endpoint_directory(self, endpoint: str) -> Path:
+        """Returns the directory the responses of an endpoint are cached in.
+
+        :param endpoint: the cached endpoint
+        :return: the path to the directory containing the cached responses of the endpoint
+        """
+        return self._directory / endpoint.replace("/", "-")
+
+    def _get_file(self, user_id: str, endpoint: str, options: Dict[str, Any]) -> Path:
+        """Returns the path to the file a response is cached in.
+
+        :param user_id: the id of the user sending the request
+        :param endpoint: the API endpoint the request is sent to
+        :param options: the options of the request, containing its parameters or body
+        :return: the path to the file uniquely identified by the request
+        """
+        request = json.dumps([API_BASE_URL, user_id, endpoint, options], sort_keys=True, default=str)
+        key = hashlib.sha256(request.encode("utf-8")).hexdigest()
+        return self._get_endpoint_directory(endpoint) / f"{key}.json"
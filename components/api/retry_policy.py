@@ -0,0 +1,203 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from time import monotonic, sleep
+from typing import Optional
+
+import requests
+
+from lean.components.util.logger import Logger
+from lean.constants import (API_MAX_ATTEMPTS, API_RATE_LIMIT, API_RATE_LIMIT_BURST, API_RETRY_BACKOFF_BASE,
+                            API_RETRY_BACKOFF_MAX)
+
+# The endpoints which are not idempotent even though their names don't end with /create
+# data/read purchases the requested file, so repeating it may charge for the same file twice
+_non_idempotent_endpoints = ["live/update/liquidate", "data/read"]
+
+
+class RetryPolicy:
+    """The RetryPolicy class decides when and after how long failed API requests are retried.
+
+    It also contains a token bucket rate limiter which is shared by all threads sending API requests.
+    When the API indicates it is overloaded, the rate limiter is paused so all callers back off together.
+    """
+
+    def __init__(self,
+                 logger: Logger,
+                 max_attempts: int = API_MAX_ATTEMPTS,
+                 backoff_base: float = API_RETRY_BACKOFF_BASE,
+                 backoff_max: float = API_RETRY_BACKOFF_MAX,
+                 rate_limit: float = API_RATE_LIMIT,
+                 rate_limit_burst: int = API_RATE_LIMIT_BURST) -> None:
+        """Creates a new RetryPolicy instance.
+
+        :param logger: the logger to log retries with
+        :param max_attempts: the maximum amount of times a request is sent
+        :param backoff_base: the maximum delay in seconds before the first retry, which doubles every retry
+        :param backoff_max: the maximum delay in seconds before any retry
+        :param rate_limit: the amount of requests per second which can be sent on average
+        :param rate_limit_burst: the amount of requests which can be sent at once after being idle
+        """
+        self._logger = logger
+        self._max_attempts = max_attempts
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._rate_limit = rate_limit
+        self._rate_limit_burst = rate_limit_burst
+
+        self._lock = threading.Lock()
+        self._tokens = float(rate_limit_burst)
+        self._last_refill = monotonic()
+        self._paused_until = 0.0
+
+        self.retry_count = 0
+        self.wait_time = 0.0
+
+    def is_idempotent(self, endpoint: str) -> bool:
+        """Returns whether sending a request to an endpoint multiple times has the same effect as sending it once.
+
+        Most endpoints only read or overwrite state, but creating objects (projects, backtests, nodes, etc.),
+        liquidating a live algorithm or purchasing data must not be repeated when we don't know whether
+        the first request arrived.
+
+        :param endpoint: the API endpoint
+        :return: True if requests to the endpoint can safely be repeated, False if not
+        """
+        endpoint = endpoint.strip("/")
+        return not endpoint.endswith("/create") and endpoint not in _non_idempotent_endpoints
+
+    def acquire(self) -> None:
+        """Blocks until the rate limiter allows another request to be sent."""
+        while True:
+            with self._lock:
+                now = monotonic()
+
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    self._tokens = min(float(self._rate_limit_burst),
+                                       self._tokens + (now - self._last_refill) * self._rate_limit)
+                    self._last_refill = now
+
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+
+                    delay = (1 - self._tokens) / self._rate_limit
+
+                self.wait_time += delay
+
+            sleep(delay)
+
+    def get_retry_delay(self,
+                        endpoint: str,
+                        attempt: int,
+                        response: Optional[requests.Response] = None,
+                        exception: Optional[requests.exceptions.RequestException] = None) -> Optional[float]:
+        """Returns how long to wait before retrying a failed request.
+
+        :param endpoint: the API endpoint the request was sent to
+        :param attempt: the amount of times the request has been sent so far
+        :param response: the response of the request, if one was received
+        :param exception: the error raised while sending the request, if no response was received
+        :return: the amount of seconds to wait before retrying, or None if the request should not be retried
+        """
+        if attempt >= self._max_attempts:
+            return None
+
+        if exception is not None:
+            # A request that couldn't connect never reached the API, so it can always be retried
+            if isinstance(exception, requests.exceptions.ConnectTimeout):
+                return self._get_backoff(attempt)
+
+            # Other errors may happen after the API received the request
+            if self.is_idempotent(endpoint) and isinstance(exception, (requests.exceptions.ConnectionError,
+                                                                       requests.exceptions.Timeout)):
+                return self._get_backoff(attempt)
+
+            return None
+
+        if response is None:
+            return None
+
+        # A rate limited request was not processed, so it can always be retried
+        if response.status_code == 429:
+            return self._get_retry_after(response) or self._get_backoff(attempt)
+
+        if not self.is_idempotent(endpoint):
+            return None
+
+        # The API responds with HTTP 500 when the credentials are invalid, so we only retry it once
+        if response.status_code == 500:
+            return self._get_backoff(attempt) if attempt == 1 else None
+
+        if response.status_code in [502, 503, 504]:
+            return self._get_retry_after(response) or self._get_backoff(attempt)
+
+        return None
+
+    def wait(self, endpoint: str, attempt: int, delay: float, reason: str, back_off_together: bool) -> None:
+        """Waits before retrying a request.
+
+        :param endpoint: the API endpoint the request is sent to
+        :param attempt: the amount of times the request has been sent so far
+        :param delay: the amount of seconds to wait
+        :param reason: the reason the request is retried, used in the debug message
+        :param back_off_together: True if all requests should wait, False if only the current request should wait
+        """
+        with self._lock:
+            self.retry_count += 1
+            self.wait_time += delay
+
+            if back_off_together:
+                self._paused_until = max(self._paused_until, monotonic() + delay)
+
+            self._logger.debug(f"Retrying {endpoint} in {delay:.2f}s (attempt {attempt + 1}/{self._max_attempts}) "
+                               f"because of {reason}, {self.retry_count} retries and "
+                               f"{self.wait_time:.2f}s of waiting so far")
+
+        sleep(delay)
+
+    def _get_backoff(self, attempt: int) -> float:
+        """Returns an exponential backoff delay with jitter.
+
+        :param attempt: the amount of times the request has been sent so far
+        :return: a random delay between half and all of the exponential backoff delay for the given attempt
+        """
+        delay = min(self._backoff_max, self._backoff_base * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _get_retry_after(self, response: requests.Response) -> Optional[float]:
+        """Parses the Retry-After header of a response.
+
+        :param response: the response to parse the header of
+        :return: the amount of seconds to wait according to the header, or None if it is missing or invalid
+        """
+        value = response.headers.get("Retry-After", None)
+        if value is None:
+            return None
+
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(value) - datetime.now(tz=timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+
+        return min(self._backoff_max, max(0.0, delay))
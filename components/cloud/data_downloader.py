@@ -11,84 +11,379 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import multiprocessing
+import os
+import shutil
 import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
+from queue import Empty, Full, Queue
 from datetime import *
-from typing import Any, List, Callable
+from time import time
+from typing import Any, BinaryIO, List, Callable, Optional, Set
 
-from joblib import delayed, Parallel
+import requests
+import urllib3
 
 from lean.components.api.api_client import APIClient
+from lean.components.config.cli_config_manager import CLIConfigManager
 from lean.components.config.lean_config_manager import LeanConfigManager
+from lean.components.config.storage import Storage
+from lean.components.util.concurrency_budget import ConcurrencyBudget
+from lean.components.util.data_manifest import DataManifest, verify_zip_file
+from lean.components.util.download_journal import DownloadJournal
+from lean.components.util.http_client import HTTPClient
 from lean.components.util.logger import Logger
+from lean.components.util.system_resources import get_available_cpus, get_available_memory
+from lean.constants import UPDATE_CHECK_INTERVAL_DATABASE_FILES, DATABASE_FILES_UPDATE_TIMEOUT, \
+    DOWNLOAD_JOURNAL_FILE_NAME, PARTIAL_DOWNLOAD_SUFFIX, DATA_MANIFEST_FILE_NAME, DEFAULT_DOWNLOAD_CONCURRENCY, \
+    DOWNLOAD_MAX_CONCURRENCY, DOWNLOAD_CONCURRENCY_PER_CPU, DOWNLOAD_MEMORY_PER_TRANSFER, DATA_LINK_RESOLVERS, \
+    DATA_LINK_LOOKAHEAD_PER_TRANSFER
 from lean.models.errors import MoreInfoError, RequestFailedError
 
+# The database files LEAN needs in the data directory, mapped to the url they are kept up-to-date from
+_database_files = {
+    "symbol-properties/symbol-properties-database.csv":
+        "https://raw.githubusercontent.com/QuantConnect/Lean/master/Data/symbol-properties/symbol-properties-database.csv",
+    "market-hours/market-hours-database.json":
+        "https://raw.githubusercontent.com/QuantConnect/Lean/master/Data/market-hours/market-hours-database.json"
+}
+
 
 def _store_local_file(file_content: bytes, file_path: Path):
     file_path.parent.mkdir(parents=True, exist_ok=True)
-    with file_path.open("wb+") as f:
+
+    # Write to a sibling file first so LEAN never reads a partially written file
+    # Its name is unique per thread, so concurrent CLI processes updating the same file don't share a temporary file
+    temp_path = file_path.parent / f"{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with temp_path.open("wb+") as f:
         f.write(file_content)
+    os.replace(temp_path, file_path)
+
+
+class _BulkStream:
+    """A read-only file-like object which reports the progress of reading a stream and optionally copies it."""
+
+    def __init__(self,
+                 source: BinaryIO,
+                 total_size: int,
+                 progress_callback: Callable[[float], None],
+                 copy: Optional[BinaryIO],
+                 throttle: Callable[[int], None]) -> None:
+        self._source = source
+        self._total_size = total_size
+        self._progress_callback = progress_callback
+        self._copy = copy
+        self._throttle = throttle
+        self.reported_progress = 0.0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._source.read(size)
+        self._throttle(len(data))
+
+        if self._copy is not None:
+            self._copy.write(data)
+
+        if self._total_size != 0 and len(data) > 0:
+            self._progress_callback(len(data) / self._total_size)
+            self.reported_progress += len(data) / self._total_size
+
+        return data
+
+
+class _PendingDownload:
+    """A data file that needs to be downloaded, of which the link has been resolved."""
+
+    def __init__(self, relative_file: str, vendor: str, is_bulk: bool, link: str) -> None:
+        self.relative_file = relative_file
+        self.vendor = vendor
+        self.is_bulk = is_bulk
+        self.link = link
+
+
+class _DownloadPipeline:
+    """The state shared by the resolver and transfer threads of a single invocation of download_files()."""
+
+    def __init__(self,
+                 data_directory: Path,
+                 organization_id: str,
+                 overwrite: bool,
+                 keep_archives: bool,
+                 journal: DownloadJournal,
+                 manifest: DataManifest,
+                 progress_callback: Callable[[float], None],
+                 lookahead: int) -> None:
+        self.data_directory = data_directory
+        self.organization_id = organization_id
+        self.overwrite = overwrite
+        self.keep_archives = keep_archives
+        self.journal = journal
+        self.manifest = manifest
+        self.progress_callback = progress_callback
+
+        self.files_to_resolve: Queue = Queue()
+        self.pending_downloads: Queue = Queue(maxsize=lookahead)
+        self.resolving_done = threading.Event()
+        self.stop = threading.Event()
 
 
 class DataDownloader:
     """The DataDownloader is responsible for downloading data from QuantConnect Datasets."""
 
-    def __init__(self, logger: Logger, api_client: APIClient, lean_config_manager: LeanConfigManager):
+    def __init__(self,
+                 logger: Logger,
+                 api_client: APIClient,
+                 lean_config_manager: LeanConfigManager,
+                 cli_config_manager: CLIConfigManager,
+                 http_client: HTTPClient,
+                 database_files_storage: Storage,
+                 download_budget: ConcurrencyBudget):
         """Creates a new CloudBacktestRunner instance.
 
         :param logger: the logger to use to log messages with
         :param api_client: the APIClient instance to use when communicating with the QuantConnect API
         :param lean_config_manager: the LeanConfigManager instance to retrieve the data directory from
+        :param cli_config_manager: the CLIConfigManager instance to retrieve the download concurrency from
+        :param http_client: the HTTPClient instance to use when updating the database files
+        :param database_files_storage: the Storage instance to store the validators of the database files in
+        :param download_budget: the ConcurrencyBudget limiting the amount of concurrent data transfers
         """
         self._logger = logger
         self._api_client = api_client
         self._lean_config_manager = lean_config_manager
+        self._cli_config_manager = cli_config_manager
+        self._http_client = http_client
+        self._database_files_storage = database_files_storage
+        self._download_budget = download_budget
+        self._database_files_thread: Optional[threading.Thread] = None
+        self._database_files_deadline = 0.0
 
-    def update_database_files(self):
-        """Will update lean data folder database files if required
+    def update_database_files(self) -> None:
+        """Updates the symbol properties and market hours databases in the data directory if they are outdated.
 
+        Each file is checked once every UPDATE_CHECK_INTERVAL_DATABASE_FILES hours using a conditional GET request,
+        so a file which has not changed since the last check only costs a single 304 response.
         """
+        data_dir = self._get_data_directory()
+        if data_dir is not None:
+            self._update_database_files(data_dir)
+
+    def update_database_files_in_background(self) -> None:
+        """Starts updating the database files on a background thread and returns immediately.
+
+        Use wait_for_database_files_update() to give the update a chance to finish before the CLI exits.
+        """
+        if self._database_files_thread is not None:
+            return
+
+        # The data directory is resolved on the current thread because resolving it may update the cache storage
+        data_dir = self._get_data_directory()
+        if data_dir is None:
+            return
+
+        self._database_files_deadline = time() + DATABASE_FILES_UPDATE_TIMEOUT
+        self._database_files_thread = threading.Thread(target=self._update_database_files, args=[data_dir])
+        self._database_files_thread.daemon = True
+        self._database_files_thread.start()
+
+    def wait_for_database_files_update(self) -> None:
+        """Waits for a background database files update to finish.
+
+        The update is abandoned once DATABASE_FILES_UPDATE_TIMEOUT seconds have passed since it was started.
+        Because files are replaced atomically, abandoning an update never leaves a partially written file behind.
+        """
+        if self._database_files_thread is None:
+            return
+
+        self._database_files_thread.join(max(0.0, self._database_files_deadline - time()))
+
+    def get_max_concurrency(self) -> int:
+        """Returns the maximum amount of concurrent transfers the CPU and memory limits of the current process allow.
+
+        The limits of the cgroup of the process are taken into account, so this is also accurate inside containers.
+        The configured download concurrency is always allowed, even if it exceeds the limits.
+
+        :return: the maximum amount of concurrent transfers
+        """
+        max_concurrency = min(DOWNLOAD_MAX_CONCURRENCY, int(get_available_cpus() * DOWNLOAD_CONCURRENCY_PER_CPU))
+
+        available_memory = get_available_memory()
+        if available_memory is not None:
+            max_concurrency = min(max_concurrency, available_memory // DOWNLOAD_MEMORY_PER_TRANSFER)
+
+        return max(1, max_concurrency, self._get_initial_concurrency())
+
+    def _get_initial_concurrency(self) -> int:
+        """Returns the amount of concurrent transfers a download starts with.
+
+        :return: the configured download concurrency, or DEFAULT_DOWNLOAD_CONCURRENCY if it is not set or invalid
+        """
+        option = self._cli_config_manager.download_concurrency
+
+        value = option.get_value()
+        if value is None:
+            return DEFAULT_DOWNLOAD_CONCURRENCY
+
         try:
-            now = datetime.now()
-            config = self._lean_config_manager.get_lean_config()
-            last_update = config["file-database-last-update"] if "file-database-last-update" in config else ''
-            if not last_update or now - datetime.strptime(last_update, '%m/%d/%Y') > timedelta(days=1):
-                data_dir = self._lean_config_manager.get_data_directory()
-
-                _store_local_file(self._api_client.data.download_public_file(
-                    "https://raw.githubusercontent.com/QuantConnect/Lean/master/Data/symbol-properties/symbol-properties-database.csv"),
-                    data_dir / "symbol-properties" / "symbol-properties-database.csv")
-                _store_local_file(self._api_client.data.download_public_file(
-                    "https://raw.githubusercontent.com/QuantConnect/Lean/master/Data/market-hours/market-hours-database.json"),
-                    data_dir / "market-hours" / "market-hours-database.json")
-
-                self._lean_config_manager.set_properties({"file-database-last-update": now.strftime('%m/%d/%Y')})
+            return max(1, int(value))
+        except ValueError:
+            self._logger.debug(f"Ignoring invalid value '{value}' of the '{option.key}' option")
+            return DEFAULT_DOWNLOAD_CONCURRENCY
+
+    def _get_data_directory(self) -> Optional[Path]:
+        """Returns the data directory the database files should be stored in.
+
+        :return: the path to the data directory, or None if there is no Lean config to read it from
+        """
+        try:
+            return self._lean_config_manager.get_data_directory()
         except MoreInfoError as e:
-            if "not found" in str(e):
-                pass
-            else:
+            if "not found" not in str(e):
                 self._logger.error(str(e))
         except Exception as e:
             self._logger.error(str(e))
 
-    def download_files(self, data_files: List[Any], overwrite: bool, organization_id: str) -> None:
+        return None
+
+    def _update_database_files(self, data_dir: Path) -> None:
+        """Updates all database files in a data directory.
+
+        :param data_dir: the data directory containing the database files
+        """
+        for relative_path, url in _database_files.items():
+            try:
+                self._update_database_file(url, data_dir / relative_path)
+            except requests.exceptions.RequestException as e:
+                # The user may be offline, the next check happens after the regular interval
+                self._logger.debug(f"Could not update {relative_path}: {e}")
+            except Exception as e:
+                self._logger.error(str(e))
+
+    def _update_database_file(self, url: str, local_path: Path) -> None:
+        """Updates a single database file using a conditional GET request.
+
+        :param url: the url to download the file from
+        :param local_path: the path to the local copy of the file
+        """
+        storage_key = str(local_path)
+        validators = self._database_files_storage.get(storage_key, {})
+
+        if local_path.is_file() and "last-check" in validators:
+            last_check = datetime.fromtimestamp(validators["last-check"], tz=timezone.utc)
+            if datetime.now(tz=timezone.utc) - last_check < timedelta(hours=UPDATE_CHECK_INTERVAL_DATABASE_FILES):
+                return
+
+        # Save the time of this check before making the request so offline hosts don't retry on every command
+        validators["last-check"] = datetime.now(tz=timezone.utc).timestamp()
+        self._database_files_storage.set(storage_key, validators)
+
+        headers = {}
+        if local_path.is_file():
+            if "etag" in validators:
+                headers["If-None-Match"] = validators["etag"]
+            if "last-modified" in validators:
+                headers["If-Modified-Since"] = validators["last-modified"]
+
+        response = self._http_client.get(url,
+                                         headers=headers,
+                                         timeout=(3.05, DATABASE_FILES_UPDATE_TIMEOUT),
+                                         raise_for_status=False)
+
+        if response.status_code == 304:
+            return
+
+        response.raise_for_status()
+        _store_local_file(response.content, local_path)
+
+        for header, key in [("ETag", "etag"), ("Last-Modified", "last-modified")]:
+            if header in response.headers:
+                validators[key] = response.headers[header]
+            else:
+                validators.pop(key, None)
+
+        self._database_files_storage.set(storage_key, validators)
+
+    def download_files(self,
+                       data_files: List[Any],
+                       overwrite: bool,
+                       organization_id: str,
+                       keep_archives: bool = True,
+                       max_bandwidth: Optional[float] = None) -> None:
         """Downloads files from QuantConnect Datasets to the local data directory.
 
+        Downloading is a two-stage pipeline. Resolver threads decide which files need to be downloaded
+        and resolve their presigned links ahead of time into a bounded queue, transfer threads download them.
+        This keeps the latency of the API off the critical path of the transfers.
+
+        The state of every file is recorded in a journal in the data directory.
+        If a download is interrupted, the next download of the same files skips the files that were completed
+        and resumes the files that were in-flight.
+
+        Every downloaded file is recorded in the data manifest, which `lean data verify` checks files against.
+
+        Files that are likely to be small are downloaded first, so progress is steady.
+        The amount of concurrent transfers adapts to the observed throughput and errors.
+
         :param data_files: the list of data files to download
         :param overwrite: whether existing files may be overwritten
         :param organization_id: the id of the organization that should be billed
+        :param keep_archives: whether bulk archives should be kept in the data directory after they are extracted
+        :param max_bandwidth: the maximum amount of bytes per second all transfers may receive together
         """
+        data_dir = self._lean_config_manager.get_data_directory()
+
+        journal = DownloadJournal(data_dir / DOWNLOAD_JOURNAL_FILE_NAME, [data_file.file for data_file in data_files])
+        manifest = DataManifest(data_dir / DATA_MANIFEST_FILE_NAME)
+        if journal.has_entries():
+            self._logger.info("Resuming the previous download, completed files are not downloaded again")
+
         progress = self._logger.progress(suffix="{task.percentage:0.0f}% ({task.completed:,.0f}/{task.total:,.0f})")
         progress_task = progress.add_task("", total=len(data_files))
 
+        self._download_budget.configure(self.get_max_concurrency(), self._get_initial_concurrency(), max_bandwidth)
+
+        # Every file holds a slot of the budget while it's downloading, large files may use the free slots
+        # There is a transfer thread for every slot the budget may grow to, the budget limits how many of them transfer
+        transfer_threads = self._download_budget.get_size()
+
+        # Links are resolved a few files ahead of every transfer thread, so they don't expire while they wait
+        lookahead = transfer_threads * DATA_LINK_LOOKAHEAD_PER_TRANSFER
+        resolver_threads = min(DATA_LINK_RESOLVERS, lookahead)
+
+        pipeline = _DownloadPipeline(data_dir,
+                                     organization_id,
+                                     overwrite,
+                                     keep_archives,
+                                     journal,
+                                     manifest,
+                                     lambda advance: progress.update(progress_task, advance=advance),
+                                     lookahead)
+
+        # Resolvers pick up files in order, sorting is stable so files of the same size rank keep their order
+        for data_file in sorted(data_files, key=lambda data_file: self._get_size_rank(data_file.file)):
+            pipeline.files_to_resolve.put(data_file)
+
         try:
-            parallel = Parallel(n_jobs=max(1, multiprocessing.cpu_count() - 1), backend="threading")
+            with ThreadPoolExecutor(max_workers=resolver_threads + transfer_threads) as executor:
+                resolvers = [executor.submit(self._resolve_links, pipeline) for _ in range(resolver_threads)]
+                transfers = [executor.submit(self._transfer_files, pipeline) for _ in range(transfer_threads)]
+
+                # If a thread fails, the other threads stop after the file they are working on
+                for future in resolvers + transfers:
+                    future.add_done_callback(lambda f: pipeline.stop.set() if f.exception() is not None else None)
+
+                try:
+                    wait(resolvers)
+                    pipeline.resolving_done.set()
+                    wait(transfers)
+                finally:
+                    pipeline.stop.set()
 
-            data_dir = self._lean_config_manager.get_data_directory()
-            parallel(delayed(self._download_file)(data_file.file, overwrite, data_dir, organization_id,
-                                                  lambda advance: progress.update(progress_task, advance=advance))
-                     for data_file in data_files)
+                for future in resolvers + transfers:
+                    future.result()
+
+            # All files have been processed, so there is nothing left to resume
+            journal.clear()
 
             # update our config after we download all files, and not in parallel!
             for datafile in data_files:
@@ -106,47 +401,297 @@ class DataDownloader:
         except KeyboardInterrupt as e:
             progress.stop()
             raise e
+        finally:
+            manifest.close()
 
-    def _process_bulk(self, file: Path, destination: Path):
-        tar = tarfile.open(file)
-        tar.errorlevel = 0
-        tar.extractall(destination)
-        tar.close()
+    def _resolve_links(self, pipeline: '_DownloadPipeline') -> None:
+        """Resolves the links of the files that need to be downloaded until there are no files left to resolve.
 
-    def _download_file(self,
-                       relative_file: str,
-                       overwrite: bool,
-                       data_directory: Path,
-                       organization_id: str,
-                       progress_callback: Callable[[float], None]) -> None:
-        """Downloads a single file from QuantConnect Datasets to the local data directory.
+        :param pipeline: the pipeline to take files from and put resolved links in
+        """
+        while not pipeline.stop.is_set():
+            try:
+                data_file = pipeline.files_to_resolve.get_nowait()
+            except Empty:
+                return
+
+            pending_download = self._resolve_link(data_file.file, data_file.vendor.vendorName, pipeline)
+            if pending_download is None:
+                continue
 
-        If this method downloads a map or factor files zip file,
-        it also updates the Lean config file to ensure LEAN uses those files instead of the csv files.
+            # The queue is bounded, so resolvers wait for the transfers instead of resolving links that may expire
+            while not pipeline.stop.is_set():
+                try:
+                    pipeline.pending_downloads.put(pending_download, timeout=0.1)
+                    break
+                except Full:
+                    pass
+
+    def _resolve_link(self,
+                      relative_file: str,
+                      vendor: str,
+                      pipeline: '_DownloadPipeline') -> Optional['_PendingDownload']:
+        """Checks whether a file needs to be downloaded and resolves its link if it does.
 
         :param relative_file: the relative path to the file in the data directory
-        :param overwrite: whether existing files may be overwritten
-        :param data_directory: the path to the local data directory
+        :param vendor: the name of the vendor the file is bought from
+        :param pipeline: the pipeline the file is downloaded in
+        :return: the file with its resolved link, or None if the file doesn't need to be downloaded
+        """
+        local_path = pipeline.data_directory / relative_file
+
+        # Bulk files are extracted while they are downloading, with a regular download if the stream is interrupted
+        is_bulk = "setup/" in relative_file and relative_file.endswith(".tar")
+
+        # The file was downloaded by a previous, interrupted invocation of this download
+        # Bulk archives may not have been kept, but their contents have been extracted
+        # With --overwrite every file is downloaded again, also the ones the interrupted invocation completed
+        if not pipeline.overwrite \
+                and (local_path.exists() or is_bulk) \
+                and pipeline.journal.is_completed(relative_file):
+            pipeline.progress_callback(1)
+            return None
+
+        if local_path.exists() and not pipeline.overwrite:
+            entry = pipeline.manifest.get(relative_file)
+
+            # Files recorded in the manifest were downloaded completely by the CLI, unless their size changed since
+            # Files with a different size are incomplete or corrupted, so they are downloaded again
+            # Files which aren't in the manifest are never bought again without --overwrite
+            # Zip files of which the CRCs match their content are recorded, so later downloads skip them silently
+            if entry is None:
+                problem = verify_zip_file(local_path) if local_path.suffix == ".zip" else None
+                if problem is None and local_path.suffix == ".zip":
+                    pipeline.manifest.add(pipeline.data_directory, relative_file, None)
+
+                lines = [f"{local_path} already exists, use --overwrite to overwrite it"]
+                if problem is not None:
+                    lines.append(f"The existing file may be corrupted: {problem}")
+                lines.append("You have not been charged for this file")
+
+                self._logger.warn("\n".join(lines))
+                pipeline.progress_callback(1)
+                return None
+            elif entry.size == local_path.stat().st_size:
+                self._logger.debug(f"Skipping {relative_file}, it has been downloaded before")
+                pipeline.progress_callback(1)
+                return None
+
+        try:
+            link = self._api_client.data.get_link(relative_file, pipeline.organization_id)
+        except RequestFailedError as error:
+            self._logger.warn(f"{local_path}: {error}\nYou have not been charged for this file")
+            pipeline.progress_callback(1)
+            return None
+
+        pipeline.journal.resolve(relative_file)
+
+        return _PendingDownload(relative_file, vendor, is_bulk, link)
+
+    def _transfer_files(self, pipeline: '_DownloadPipeline') -> None:
+        """Downloads files of which the links have been resolved until all files have been resolved and downloaded.
+
+        :param pipeline: the pipeline to take resolved links from
+        """
+        while not pipeline.stop.is_set():
+            try:
+                pending_download = pipeline.pending_downloads.get(timeout=0.1)
+            except Empty:
+                if pipeline.resolving_done.is_set() and pipeline.pending_downloads.empty():
+                    return
+                continue
+
+            self._download_file(pending_download, pipeline)
+
+    def _get_size_rank(self, relative_file: str) -> int:
+        """Estimates the relative size of a data file from its path, the actual size is unknown until it's downloaded.
+
+        :param relative_file: the relative path to the file in the data directory
+        :return: 0 for files containing a single day of data, 1 for other data files and 2 for bulk archives
+        """
+        if relative_file.endswith(".tar"):
+            return 2
+
+        if any(f"/{resolution}/" in relative_file for resolution in ["tick", "second", "minute"]):
+            return 0
+
+        return 1
+
+    def _process_bulk(self, file: Path, destination: Path) -> None:
+        """Extracts a bulk archive which has been downloaded completely.
+
+        :param file: the path to the archive
+        :param destination: the directory to extract the archive in
+        """
+        with file.open("rb") as f:
+            self._extract_bulk(f, destination)
+
+    def _download_bulk(self,
+                       relative_file: str,
+                       organization_id: str,
+                       link: Optional[str],
+                       local_path: Path,
+                       data_directory: Path,
+                       progress_callback: Callable[[float], None],
+                       keep_archive: bool) -> float:
+        """Downloads a bulk archive and extracts its members while they arrive.
+
+        :param relative_file: the relative path to the archive in the data directory
         :param organization_id: the id of the organization that should be billed
-        :param callback: the lambda that is called just before the method returns
+        :param link: the presigned url of the archive resolved ahead of time, or None to resolve it now
+        :param local_path: the path to store a copy of the archive at
+        :param data_directory: the path to the local data directory to extract the archive in
+        :param progress_callback: the download progress callback
+        :param keep_archive: whether a copy of the archive should be stored at local_path
+        :return: the progress that has been reported, which is less than 1 if the stream was interrupted
         """
-        local_path = data_directory / relative_file
+        partial_path = local_path.parent / f"{local_path.name}{PARTIAL_DOWNLOAD_SUFFIX}"
+        if keep_archive:
+            local_path.parent.mkdir(parents=True, exist_ok=True)
 
-        if local_path.exists() and not overwrite:
-            self._logger.warn("\n".join([
-                f"{local_path} already exists, use --overwrite to overwrite it",
-                "You have not been charged for this file"
-            ]))
-            progress_callback(1)
+        with self._api_client.data.open_file_stream(relative_file, organization_id, link) as response:
+            response.raw.decode_content = True
+            total_size = int(response.headers.get("Content-Length", 0))
+
+            copy = partial_path.open("wb") if keep_archive else None
+            stream = _BulkStream(response.raw, total_size, progress_callback, copy, self._download_budget.throttle)
+
+            try:
+                self._extract_bulk(stream, data_directory)
+
+                # The tar end-of-archive marker may be followed by padding, which belongs in the copy too
+                if copy is not None:
+                    while len(stream.read(1024 * 1024)) > 0:
+                        pass
+            except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, tarfile.ReadError) as error:
+                self._download_budget.record_error()
+                self._logger.debug(f"Streaming {relative_file} was interrupted, downloading it instead: {error}")
+                return stream.reported_progress
+            finally:
+                if copy is not None:
+                    copy.close()
+
+        if keep_archive:
+            os.replace(partial_path, local_path)
+        elif partial_path.is_file():
+            partial_path.unlink()
+
+        progress_callback(1 - stream.reported_progress)
+        return 1.0
+
+    def _extract_bulk(self, source: BinaryIO, destination: Path) -> None:
+        """Extracts a tar archive from a stream, reading the stream only once from start to end.
+
+        Members with paths outside the destination and members that aren't regular files or directories are skipped.
+        Every member is written to a sibling partial file first, so LEAN never reads a partially extracted file.
+
+        :param source: the stream containing the archive
+        :param destination: the directory to extract the archive in
+        """
+        destination = destination.resolve()
+        created_directories: Set[Path] = set()
+
+        with tarfile.open(fileobj=source, mode="r|*") as tar:
+            for member in tar:
+                target = (destination / member.name).resolve()
+
+                # Archives created from a directory contain the directory itself as "./"
+                if target == destination and member.isdir():
+                    continue
+
+                if destination not in target.parents:
+                    self._logger.warn(f"Skipping {member.name}, its path is outside of {destination}")
+                    continue
+
+                if member.isdir():
+                    self._create_directory(target, created_directories)
+                    continue
+
+                if not member.isfile():
+                    self._logger.debug(f"Skipping {member.name}, it is not a regular file")
+                    continue
+
+                self._create_directory(target.parent, created_directories)
+
+                partial_path = target.parent / f"{target.name}{PARTIAL_DOWNLOAD_SUFFIX}"
+                with partial_path.open("wb") as file:
+                    shutil.copyfileobj(tar.extractfile(member), file, 1024 * 1024)
+                os.replace(partial_path, target)
+
+    def _create_directory(self, directory: Path, created_directories: Set[Path]) -> None:
+        """Creates a directory if it hasn't been created before during the current extraction.
+
+        :param directory: the directory to create
+        :param created_directories: the directories created during the current extraction
+        """
+        if directory in created_directories:
             return
 
+        directory.mkdir(parents=True, exist_ok=True)
+
+        # Creating a directory also creates its parents, so they don't have to be created again either
+        created_directories.add(directory)
+        created_directories.update(directory.parents)
+
+    def _download_file(self, pending_download: '_PendingDownload', pipeline: '_DownloadPipeline') -> None:
+        """Downloads a single file from QuantConnect Datasets to the local data directory.
+
+        :param pending_download: the file to download and its resolved link
+        :param pipeline: the pipeline the file is downloaded in
+        """
+        relative_file = pending_download.relative_file
+        data_directory = pipeline.data_directory
+        local_path = data_directory / relative_file
+        progress_callback = pipeline.progress_callback
+        keep_archive = pipeline.keep_archives
+
+        # Links are never resolved again, because resolving a link purchases the file again
+        link = pending_download.link
+
+        self._download_budget.acquire()
         try:
-            self._api_client.data.download_file(relative_file, organization_id, local_path, progress_callback)
+            if pending_download.is_bulk:
+                pipeline.journal.start(relative_file, None)
+
+                reported_progress = self._download_bulk(relative_file,
+                                                        pipeline.organization_id,
+                                                        link,
+                                                        local_path,
+                                                        data_directory,
+                                                        progress_callback,
+                                                        keep_archive)
+                if reported_progress >= 1:
+                    pipeline.journal.complete(relative_file)
+                    if keep_archive:
+                        self._download_budget.record_transfer(local_path.stat().st_size)
+                        pipeline.manifest.add(data_directory, relative_file, pending_download.vendor)
+                    return
+
+                # The regular download continues with the same link, which is still valid shortly after its first use
+                bulk_progress_callback = progress_callback
+                progress_callback = lambda advance: bulk_progress_callback(advance * (1 - reported_progress))
+
+            self._api_client.data.download_file(relative_file,
+                                                pipeline.organization_id,
+                                                local_path,
+                                                progress_callback,
+                                                pipeline.journal,
+                                                self._download_budget,
+                                                link)
+
+            self._download_budget.record_transfer(local_path.stat().st_size)
         except RequestFailedError as error:
-            self._logger.warn(f"{local_path}: {error}\nYou have not been charged for this file")
+            self._logger.warn(f"{local_path}: {error}")
             progress_callback(1)
             return
+        finally:
+            self._download_budget.release()
 
-        # Special case: bulk files need unpacked
-        if "setup/" in relative_file and relative_file.endswith(".tar"):
+        if pending_download.is_bulk:
             self._process_bulk(local_path, data_directory)
+
+            if not keep_archive:
+                local_path.unlink()
+                return
+
+        pipeline.manifest.add(data_directory, relative_file, pending_download.vendor)
@@ -14,7 +14,8 @@
 from typing import Optional
 
 from lean.components.config.storage import Storage
-from lean.constants import DEFAULT_ENGINE_IMAGE, DEFAULT_RESEARCH_IMAGE
+from lean.constants import DEFAULT_ENGINE_IMAGE, DEFAULT_RESEARCH_IMAGE, DEFAULT_HTTP_POOL_SIZE, \
+    DEFAULT_HTTP_KEEP_ALIVE, DEFAULT_DOWNLOAD_CONCURRENCY, DEFAULT_WARM_POOL_SIZE
 from lean.models.docker import DockerImage
 from lean.models.errors import MoreInfoError
 from lean.models.options import ChoiceOption, Option
@@ -55,12 +56,42 @@ class CLIConfigManager:
                                      False,
                                      general_storage)
 
+        self.http_pool_size = Option("http-pool-size",
+                                     f"The maximum amount of connections kept open per host ({DEFAULT_HTTP_POOL_SIZE} if not set).",
+                                     False,
+                                     general_storage)
+
+        self.http_keep_alive = Option("http-keep-alive",
+                                      f"The amount of seconds idle connections are kept open, 0 disables keep-alive ({DEFAULT_HTTP_KEEP_ALIVE} if not set).",
+                                      False,
+                                      general_storage)
+
+        self.http_proxy = Option("http-proxy",
+                                 "The proxy url all HTTP requests are sent through (environment proxy settings if not set).",
+                                 False,
+                                 general_storage)
+
+        self.download_concurrency = Option("download-concurrency",
+                                           f"The amount of concurrent transfers data downloads start with, which adapts to the throughput while downloading ({DEFAULT_DOWNLOAD_CONCURRENCY} if not set).",
+                                           False,
+                                           general_storage)
+
+        self.warm_pool_size = Option("warm-pool-size",
+                                     f"The amount of idle engine containers kept ready per configuration, setting it makes local backtests use warm containers by default ({DEFAULT_WARM_POOL_SIZE} if not set).",
+                                     False,
+                                     general_storage)
+
         self.all_options = [
             self.user_id,
             self.api_token,
             self.default_language,
             self.engine_image,
-            self.research_image
+            self.research_image,
+            self.http_pool_size,
+            self.http_keep_alive,
+            self.http_proxy,
+            self.download_concurrency,
+            self.warm_pool_size
         ]
 
     def get_option_by_key(self, key: str) -> Option:
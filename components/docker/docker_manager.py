@@ -21,20 +21,24 @@ import subprocess
 import sys
 import threading
 import types
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, Set
+from queue import Empty, Queue
+from time import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 import docker
 from dateutil.parser import isoparse
-from docker.errors import APIError
+from docker.errors import APIError, NotFound
 from docker.models.containers import Container
 from docker.types import Mount
 
+from lean.components.util.log_stream import LineSplitter, LogStreamPrinter
 from lean.components.util.logger import Logger
 from lean.components.util.platform_manager import PlatformManager
 from lean.components.util.temp_manager import TempManager
 from lean.constants import SITE_PACKAGES_VOLUME_LIMIT, \
-    DOCKER_NETWORK
+    DOCKER_NETWORK, DOCKER_INVENTORY_CACHE_TTL
 from lean.models.docker import DockerImage
 from lean.models.errors import MoreInfoError
 
@@ -53,6 +57,16 @@ class DockerManager:
         self._temp_manager = temp_manager
         self._platform_manager = platform_manager
 
+        self._docker_client: Optional[docker.DockerClient] = None
+        self._docker_client_lock = threading.Lock()
+
+        # Makes sure containers started on multiple threads don't create the same network or volume twice
+        self._create_lock = threading.Lock()
+
+        # The (object type, name) -> (exists, time of check) cache of images, networks and volumes
+        # It is shared by everything that runs in this process and updated when the CLI creates or removes objects
+        self._inventory: Dict[Tuple[str, str], Tuple[bool, float]] = {}
+
     def pull_image(self, image: DockerImage) -> None:
         """Pulls a Docker image.
 
@@ -71,6 +85,8 @@ class DockerManager:
         else:
             self._get_docker_client().images.pull(image.name, image.tag)
 
+        self._update_inventory("image", str(image), True)
+
     def run_image(self, image: DockerImage, **kwargs) -> bool:
         """Runs a Docker image. If the image is not available locally it will be pulled first.
 
@@ -79,6 +95,13 @@ class DockerManager:
         If kwargs contains an "on_output" property, it is removed before passing it on to docker.containers.run
         and the given lambda is ran whenever the Docker container prints anything.
 
+        If kwargs contains a "log_directory" property, it is removed before passing it on to docker.containers.run
+        and the full output of the Docker container is captured in a log store in the given directory.
+        The output printed to a terminal is rate-limited, so this log store is the only place to find all of it.
+
+        If kwargs contains a "log_prefix" property, it is removed before passing it on to docker.containers.run
+        and every printed line is prefixed with it, which tells apart the output of containers running concurrently.
+
         If kwargs contains a "commands" property, it is removed before passing it on to docker.containers.run
         and the Docker container is configured to run the given commands.
         This property causes the "entrypoint" property to be overwritten if it exists.
@@ -93,7 +116,9 @@ class DockerManager:
         if not self.image_installed(image):
             self.pull_image(image)
 
-        on_output = kwargs.pop("on_output", lambda chunk: None)
+        on_output = kwargs.pop("on_output", None)
+        log_directory = kwargs.pop("log_directory", None)
+        log_prefix = kwargs.pop("log_prefix", None)
         commands = kwargs.pop("commands", None)
 
         if commands is not None:
@@ -197,12 +222,17 @@ class DockerManager:
             kill_thread.daemon = True
             kill_thread.start()
 
-        signal.signal(signal.SIGINT, signal_handler)
+        # Signal handlers can only be installed on the main thread
+        # Callers which run containers on other threads are responsible for stopping them on Ctrl+C
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, signal_handler)
+
+        printer = LogStreamPrinter(self._logger, is_tty, log_directory, log_prefix)
 
         # container.logs() is blocking, we run it on a separate thread so the SIGINT handler works properly
         # If we run this code on the current thread, SIGINT won't be triggered on Windows when Ctrl+C is triggered
         def print_logs() -> None:
-            chunk_buffer = bytes()
+            line_splitter = LineSplitter()
             is_first_time = True
 
             try:
@@ -217,25 +247,21 @@ class DockerManager:
                     else:
                         tail = 0
 
-                    # Capture all logs and print it to stdout line by line
+                    # Capture all logs and print them to stdout, a block of complete lines at a time
                     for chunk in container.logs(stream=True, follow=True, tail=tail):
-                        chunk_buffer += chunk
-
-                        if not chunk_buffer.endswith(b"\n"):
+                        block = line_splitter.feed(chunk)
+                        if block is None:
                             continue
 
-                        chunk = chunk_buffer.decode("utf-8")
-                        chunk_buffer = bytes()
-
                         if on_output is not None:
-                            on_output(chunk)
+                            on_output(block.decode("utf-8", errors="replace"))
 
-                        self._logger.info(chunk.rstrip())
+                        printer.write(block)
 
                         if not is_tty:
                             continue
 
-                        if "Press any key to exit..." in chunk or "QuantConnect.Report.Main(): Completed." in chunk:
+                        if b"Press any key to exit..." in block or b"QuantConnect.Report.Main(): Completed." in block:
                             socket = docker_client.api.attach_socket(container.id, params={"stdin": 1, "stream": 1})
 
                             if hasattr(socket, "_sock"):
@@ -247,13 +273,21 @@ class DockerManager:
             except:
                 # This will crash when the container exits, ignore the exception
                 pass
+            finally:
+                block = line_splitter.flush()
+                if block is not None:
+                    printer.write(block + b"\n")
 
         logs_thread = threading.Thread(target=print_logs)
         logs_thread.daemon = True
         logs_thread.start()
 
+        # Output is flushed periodically instead of after every line, which keeps up with high-throughput logs
         while logs_thread.is_alive():
             logs_thread.join(0.1)
+            printer.flush()
+
+        printer.close()
 
         if killed:
             try:
@@ -287,14 +321,25 @@ class DockerManager:
             raise RuntimeError(
                 f"Something went wrong while building '{dockerfile}', see the logs above for more information")
 
+        self._update_inventory("image", str(target), True)
+
     def image_installed(self, image: DockerImage) -> bool:
         """Returns whether a certain image is installed.
 
         :param image: the image to check availability for
         :return: True if the image is available locally, False if not
         """
-        docker_client = self._get_docker_client()
-        return any(str(image) in x.tags for x in docker_client.images.list())
+        cached_result = self._get_inventory("image", str(image))
+        if cached_result is not None:
+            return cached_result
+
+        try:
+            installed = str(image) in self._get_docker_client().images.get(str(image)).tags
+        except NotFound:
+            installed = False
+
+        self._update_inventory("image", str(image), installed)
+        return installed
 
     def get_local_digest(self, image: DockerImage) -> Optional[str]:
         """Returns the digest of a locally installed image.
@@ -310,6 +355,14 @@ class DockerManager:
 
         return repo_digests[0].split("@")[1]
 
+    def get_local_id(self, image: DockerImage) -> str:
+        """Returns the id of a locally installed image, which changes whenever the image is pulled or rebuilt.
+
+        :param image: the local image to get the id of
+        :return: the id of the local image
+        """
+        return self._get_docker_client().images.get(str(image)).id
+
     def get_remote_digest(self, image: DockerImage) -> str:
         """Returns the digest of a remote image.
 
@@ -324,18 +377,34 @@ class DockerManager:
 
         :param name: the name of then network to create
         """
-        docker_client = self._get_docker_client()
-        if not any(n.name == name for n in docker_client.networks.list()):
-            docker_client.networks.create(name, driver="bridge")
+        with self._create_lock:
+            if self._get_inventory("network", name):
+                return
+
+            docker_client = self._get_docker_client()
+            try:
+                docker_client.networks.get(name)
+            except NotFound:
+                docker_client.networks.create(name, driver="bridge")
+
+            self._update_inventory("network", name, True)
 
     def create_volume(self, name: str) -> None:
         """Creates a new volume, or does nothing if a volume with the given name already exists.
 
         :param name: the name of the volume to create
         """
-        docker_client = self._get_docker_client()
-        if not any(v.name == name for v in docker_client.volumes.list()):
-            docker_client.volumes.create(name)
+        with self._create_lock:
+            if self._get_inventory("volume", name):
+                return
+
+            docker_client = self._get_docker_client()
+            try:
+                docker_client.volumes.get(name)
+            except NotFound:
+                docker_client.volumes.create(name)
+
+            self._update_inventory("volume", name, True)
 
     def create_site_packages_volume(self, requirements_file: Path) -> str:
         """Returns the name of the volume to mount to the user's site-packages directory.
@@ -346,21 +415,50 @@ class DockerManager:
         :param requirements_file: the path to the requirements file that will be pip installed in the container
         :return: the name of the Docker volume to use
         """
-        requirements_hash = hashlib.md5(requirements_file.read_text(encoding="utf-8").encode("utf-8")).hexdigest()
-        volume_name = f"lean_cli_python_{requirements_hash}"
+        with self._create_lock:
+            requirements_hash = hashlib.md5(requirements_file.read_text(encoding="utf-8").encode("utf-8")).hexdigest()
+            volume_name = f"lean_cli_python_{requirements_hash}"
 
-        docker_client = self._get_docker_client()
-        existing_volumes = [v for v in docker_client.volumes.list() if v.name.startswith("lean_cli_python_")]
+            if self._get_inventory("volume", volume_name):
+                return volume_name
+
+            docker_client = self._get_docker_client()
+            existing_volumes = [v for v in docker_client.volumes.list(filters={"name": "lean_cli_python_"})
+                                if v.name.startswith("lean_cli_python_")]
+
+            if any(v.name == volume_name for v in existing_volumes):
+                self._update_inventory("volume", volume_name, True)
+                return volume_name
+
+            # Volumes which are mounted by a running backtest or a warm container can't be removed, they are skipped
+            volumes_to_remove = (len(existing_volumes) - SITE_PACKAGES_VOLUME_LIMIT) + 1
+            for volume in sorted(existing_volumes, key=lambda v: isoparse(v.attrs["CreatedAt"])):
+                if volumes_to_remove <= 0:
+                    break
+
+                try:
+                    volume.remove()
+                except APIError as error:
+                    self._logger.debug(f"Keeping site-packages volume {volume.name}, it can't be removed: {error}")
+                    continue
+
+                self._update_inventory("volume", volume.name, False)
+                volumes_to_remove -= 1
+
+            docker_client.volumes.create(volume_name)
+            self._update_inventory("volume", volume_name, True)
 
-        if any(v.name == volume_name for v in existing_volumes):
             return volume_name
 
-        volumes_by_age = sorted(existing_volumes, key=lambda v: isoparse(v.attrs["CreatedAt"]))
-        for i in range((len(volumes_by_age) - SITE_PACKAGES_VOLUME_LIMIT) + 1):
-            volumes_by_age[i].remove()
+    def get_host_resources(self) -> Tuple[int, int]:
+        """Returns the resources of the machine Docker runs containers on.
 
-        docker_client.volumes.create(volume_name)
-        return volume_name
+        On macOS and Windows this is the virtual machine of Docker Desktop rather than the machine running the CLI.
+
+        :return: the amount of CPUs and the amount of bytes of memory available to containers
+        """
+        info = self._get_docker_client().info()
+        return info["NCPU"], info["MemTotal"]
 
     def get_running_containers(self) -> Set[str]:
         """Returns the names of all running containers.
@@ -376,11 +474,110 @@ class DockerManager:
         :param container_name: the name of the container to find
         :return: the container with the given name, or None if it does not exist
         """
-        for container in self._get_docker_client().containers.list(all=True):
-            if container.name.lstrip("/") == container_name:
-                return container
+        try:
+            container = self._get_docker_client().containers.get(container_name)
+        except NotFound:
+            return None
+
+        # Containers can also be found by id prefix, so we make sure we found the container with the given name
+        if container.name.lstrip("/") != container_name:
+            return None
+
+        return container
+
+    def get_containers_by_label(self, label: str, value: Optional[str] = None) -> List[Container]:
+        """Finds all running containers with a given label.
+
+        :param label: the label the containers must have
+        :param value: the value the label must have, or None if any value is accepted
+        :return: the running containers with the given label
+        """
+        label_filter = label if value is None else f"{label}={value}"
+        containers = self._get_docker_client().containers.list(filters={"label": label_filter})
+        return [c for c in containers if c.status == "running"]
+
+    def run_in_container(self, container: Container, command: List[str], **kwargs) -> bool:
+        """Runs a command in a running container and waits for it to exit.
+
+        The output of the command is printed like the output of containers started with run_image().
+        If kwargs contains an "on_output" property, the given lambda is ran whenever the command prints anything.
+        If kwargs contains a "log_directory" property, the full output of the command is captured in that directory.
+        If kwargs contains a "log_prefix" property, every printed line is prefixed with it.
+        If the user presses Ctrl+C while the command is running, the container is removed and the CLI exits.
+
+        :param container: the running container to run the command in
+        :param command: the command to run
+        :param kwargs: the kwargs to forward to the exec_create call of the low-level Docker API
+        :return: True if the command exited successfully, False if not
+        """
+        on_output = kwargs.pop("on_output", None)
+        log_directory = kwargs.pop("log_directory", None)
+        log_prefix = kwargs.pop("log_prefix", None)
 
-        return None
+        docker_client = self._get_docker_client()
+        exec_id = docker_client.api.exec_create(container.id, command, **kwargs)["Id"]
+
+        killed = False
+
+        def kill_container() -> None:
+            nonlocal killed
+            killed = True
+            try:
+                container.remove(force=True)
+            except APIError:
+                pass
+            finally:
+                self._temp_manager.delete_temporary_directories()
+                sys.exit(1)
+
+        # Remove the container on Ctrl+C, the command may have left it in an unknown state
+        def signal_handler(sig: signal.Signals, frame: types.FrameType) -> None:
+            # If we run this code on the current thread, a second Ctrl+C won't be detected on Windows
+            kill_thread = threading.Thread(target=kill_container)
+            kill_thread.daemon = True
+            kill_thread.start()
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, signal_handler)
+
+        printer = LogStreamPrinter(self._logger, sys.stdout.isatty(), log_directory, log_prefix)
+
+        # exec_start() is blocking, we run it on a separate thread so the SIGINT handler works properly
+        def print_output() -> None:
+            line_splitter = LineSplitter()
+
+            try:
+                for chunk in docker_client.api.exec_start(exec_id, stream=True):
+                    block = line_splitter.feed(chunk)
+                    if block is None:
+                        continue
+
+                    if on_output is not None:
+                        on_output(block.decode("utf-8", errors="replace"))
+
+                    printer.write(block)
+            except:
+                # This will crash when the container is removed, ignore the exception
+                pass
+            finally:
+                block = line_splitter.flush()
+                if block is not None:
+                    printer.write(block + b"\n")
+
+        output_thread = threading.Thread(target=print_output)
+        output_thread.daemon = True
+        output_thread.start()
+
+        while output_thread.is_alive():
+            output_thread.join(0.1)
+            printer.flush()
+
+        printer.close()
+
+        if killed:
+            sys.exit(1)
+
+        return docker_client.api.exec_inspect(exec_id)["ExitCode"] == 0
 
     def show_logs(self, container_name: str, follow: bool = False) -> None:
         """Shows the logs of a Docker container in the terminal.
@@ -400,6 +597,67 @@ class DockerManager:
 
         subprocess.run(command)
 
+    def stream_logs(self,
+                    container_names: List[str],
+                    follow: bool = False,
+                    since: Optional[datetime] = None,
+                    tail: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+        """Streams the logs of multiple containers as one stream of lines.
+
+        Every container is read on its own thread, lines are yielded in the order they are received.
+
+        :param container_names: the names of the containers to stream the logs of
+        :param follow: True to keep streaming until all containers have exited, False to stop at the current end
+        :param since: the time lines must be logged after, or None to start at the first line
+        :param tail: the amount of lines at the end of each container's logs to start at, or None to start at the first line
+        :return: an iterator yielding (container name, line) tuples, lines include their trailing newlines
+        """
+        lines = Queue(maxsize=10000)
+        done = object()
+
+        def read_logs(container: Container) -> None:
+            line_splitter = LineSplitter()
+            container_name = container.name.lstrip("/")
+
+            try:
+                for chunk in container.logs(stream=True,
+                                            follow=follow,
+                                            since=since,
+                                            tail="all" if tail is None else tail):
+                    block = line_splitter.feed(chunk)
+                    if block is not None:
+                        for line in block.splitlines(keepends=True):
+                            lines.put((container_name, line))
+            except:
+                # This will crash when the container is removed, ignore the exception
+                pass
+            finally:
+                block = line_splitter.flush()
+                if block is not None:
+                    lines.put((container_name, block + b"\n"))
+                lines.put(done)
+
+        containers = [self.get_container_by_name(name) for name in container_names]
+        containers = [c for c in containers if c is not None]
+
+        for container in containers:
+            thread = threading.Thread(target=read_logs, args=[container])
+            thread.daemon = True
+            thread.start()
+
+        remaining_containers = len(containers)
+        while remaining_containers > 0:
+            # A timeout keeps the main thread responsive to Ctrl+C on Windows
+            try:
+                item = lines.get(timeout=0.1)
+            except Empty:
+                continue
+
+            if item is done:
+                remaining_containers -= 1
+            else:
+                yield item
+
     def is_missing_permission(self) -> bool:
         """Returns whether we cannot connect to the Docker client because of a permissions issue.
 
@@ -414,27 +672,54 @@ class DockerManager:
         return False
 
     def _get_docker_client(self) -> docker.DockerClient:
-        """Creates a DockerClient instance.
+        """Returns the DockerClient instance of this process, creating and pinging it on the first call.
 
         Raises an error if Docker is not running.
 
         :return: a DockerClient instance which responds to requests
         """
-        error = MoreInfoError("Please make sure Docker is installed and running",
-                              "https://www.lean.io/docs/lean-cli/key-concepts/troubleshooting#02-Common-Errors")
+        with self._docker_client_lock:
+            if self._docker_client is not None:
+                return self._docker_client
 
-        try:
-            docker_client = docker.from_env()
-        except Exception:
-            raise error
+            error = MoreInfoError("Please make sure Docker is installed and running",
+                                  "https://www.lean.io/docs/lean-cli/key-concepts/troubleshooting#02-Common-Errors")
 
-        try:
-            if not docker_client.ping():
+            try:
+                docker_client = docker.from_env()
+            except Exception:
                 raise error
-        except Exception:
-            raise error
 
-        return docker_client
+            try:
+                if not docker_client.ping():
+                    raise error
+            except Exception:
+                raise error
+
+            self._docker_client = docker_client
+            return docker_client
+
+    def _get_inventory(self, object_type: str, name: str) -> Optional[bool]:
+        """Returns whether a Docker object exists according to the inventory cache.
+
+        :param object_type: the type of the object, like "image", "network" or "volume"
+        :param name: the name of the object
+        :return: whether the object exists, or None if the cache holds no recent information about it
+        """
+        entry = self._inventory.get((object_type, name), None)
+        if entry is None or time() - entry[1] > DOCKER_INVENTORY_CACHE_TTL:
+            return None
+
+        return entry[0]
+
+    def _update_inventory(self, object_type: str, name: str, exists: bool) -> None:
+        """Records whether a Docker object exists in the inventory cache.
+
+        :param object_type: the type of the object, like "image", "network" or "volume"
+        :param name: the name of the object
+        :param exists: whether the object exists
+        """
+        self._inventory[(object_type, name)] = (exists, time())
 
     def _format_source_path(self, path: str) -> str:
         """Formats a source path so Docker knows what it refers to.
@@ -12,6 +12,7 @@
 # limitations under the License.
 
 import json
+import math
 import os
 import re
 import uuid
@@ -27,13 +28,17 @@ from lean.components.config.lean_config_manager import LeanConfigManager
 from lean.components.config.output_config_manager import OutputConfigManager
 from lean.components.config.project_config_manager import ProjectConfigManager
 from lean.components.docker.docker_manager import DockerManager
+from lean.components.docker.warm_container_pool import WarmContainerPool
 from lean.components.util.logger import Logger
+from lean.components.util.platform_manager import PlatformManager
 from lean.components.util.project_manager import ProjectManager
+from lean.components.util.system_resources import get_numa_node_cpus, parse_cpu_list, parse_memory_size
 from lean.components.util.temp_manager import TempManager
 from lean.components.util.xml_manager import XMLManager
-from lean.constants import MODULES_DIRECTORY, TERMINAL_LINK_PRODUCT_ID
+from lean.constants import CONTAINER_LOG_DIRECTORY_NAME, DOTNET_GC_HEAP_LIMIT_RATIO, MODULES_DIRECTORY, \
+    TERMINAL_LINK_PRODUCT_ID
 from lean.models.json_module_config import DebuggingMethod
-from lean.models.docker import DockerImage
+from lean.models.docker import DockerImage, DockerResources
 
 
 class LeanRunner:
@@ -48,7 +53,9 @@ class LeanRunner:
                  module_manager: ModuleManager,
                  project_manager: ProjectManager,
                  temp_manager: TempManager,
-                 xml_manager: XMLManager) -> None:
+                 xml_manager: XMLManager,
+                 warm_container_pool: WarmContainerPool,
+                 platform_manager: PlatformManager) -> None:
         """Creates a new LeanRunner instance.
 
         :param logger: the logger that is used to print messages
@@ -60,6 +67,8 @@ class LeanRunner:
         :param project_manager: the ProjectManager instance to use for copying source code to output directories
         :param temp_manager: the TempManager instance to use for creating temporary directories
         :param xml_manager: the XMLManager instance to use for reading/writing XML files
+        :param warm_container_pool: the WarmContainerPool instance to run backtests in warm containers with
+        :param platform_manager: the PlatformManager used when checking which operating system is in use
         """
         self._logger = logger
         self._project_config_manager = project_config_manager
@@ -70,6 +79,8 @@ class LeanRunner:
         self._project_manager = project_manager
         self._temp_manager = temp_manager
         self._xml_manager = xml_manager
+        self._warm_container_pool = warm_container_pool
+        self._platform_manager = platform_manager
 
     def run_lean(self,
                  lean_config: Dict[str, Any],
@@ -79,7 +90,10 @@ class LeanRunner:
                  image: DockerImage,
                  debugging_method: Optional[DebuggingMethod],
                  release: bool,
-                 detach: bool) -> None:
+                 detach: bool,
+                 warm: bool = False,
+                 resources: Optional[DockerResources] = None,
+                 log_prefix: Optional[str] = None) -> None:
         """Runs the LEAN engine locally in Docker.
 
         Raises an error if something goes wrong.
@@ -92,6 +106,9 @@ class LeanRunner:
         :param debugging_method: the debugging method if debugging needs to be enabled, None if not
         :param release: whether C# projects should be compiled in release configuration instead of debug
         :param detach: whether LEAN should run in a detached container
+        :param warm: whether LEAN should run in a warm container if the run options allow it
+        :param resources: the resources the container may use, overriding the project's configuration
+        :param log_prefix: the text to print before every line of output, or None to print the output as-is
         """
         project_dir = algorithm_file.parent
 
@@ -102,7 +119,8 @@ class LeanRunner:
                                                    output_dir,
                                                    debugging_method,
                                                    release,
-                                                   detach)
+                                                   detach,
+                                                   resources)
 
         # Set up PTVSD debugging
         if debugging_method == DebuggingMethod.PTVSD:
@@ -130,13 +148,33 @@ class LeanRunner:
                 "mode": "rw"
             }
 
-        run_options["commands"].append("exec dotnet QuantConnect.Lean.Launcher.dll")
+        # Store the full output of the engine, the output printed to a terminal is rate-limited
+        run_options["log_directory"] = output_dir / CONTAINER_LOG_DIRECTORY_NAME
+        run_options["log_prefix"] = log_prefix
+
+        if warm:
+            unsupported_reason = self._warm_container_pool.get_unsupported_reason(algorithm_file,
+                                                                                 output_dir,
+                                                                                 run_options,
+                                                                                 debugging_method,
+                                                                                 detach)
+            if unsupported_reason is not None:
+                self._logger.info(f"Not using a warm container because {unsupported_reason}")
+                warm = False
 
         # Copy the project's code to the output directory
         self._project_manager.copy_code(algorithm_file.parent, output_dir / "code")
 
         # Run the engine and log the result
-        success = self._docker_manager.run_image(image, **run_options)
+        if warm:
+            # Warm containers are shared between backtests, so the output directory doesn't have a container of its own
+            output_config = self._output_config_manager.get_output_config(output_dir)
+            output_config.delete("container")
+
+            success = self._warm_container_pool.run_lean(image, run_options, project_dir, output_dir)
+        else:
+            run_options["commands"].append("exec dotnet QuantConnect.Lean.Launcher.dll")
+            success = self._docker_manager.run_image(image, **run_options)
 
         cli_root_dir = self._lean_config_manager.get_cli_root_directory()
         relative_project_dir = project_dir.relative_to(cli_root_dir)
@@ -162,7 +200,8 @@ class LeanRunner:
                                 output_dir: Path,
                                 debugging_method: Optional[DebuggingMethod],
                                 release: bool,
-                                detach: bool) -> Dict[str, Any]:
+                                detach: bool,
+                                resources: Optional[DockerResources] = None) -> Dict[str, Any]:
         """Creates a basic Docker config to run the engine with.
 
         This method constructs the parts of the Docker config that is the same for both the engine and the optimizer.
@@ -173,6 +212,7 @@ class LeanRunner:
         :param debugging_method: the debugging method if debugging needs to be enabled, None if not
         :param release: whether C# projects should be compiled in release configuration instead of debug
         :param detach: whether LEAN should run in a detached container
+        :param resources: the resources the container may use, overriding the project's configuration
         :return: the Docker configuration containing basic configuration to run Lean
         """
         project_dir = algorithm_file.parent
@@ -225,6 +265,9 @@ class LeanRunner:
             "ports": docker_project_config.get("ports", {})
         }
 
+        # Limit the resources of the container
+        self.set_up_resource_options(self.get_resources(project_dir, resources), run_options)
+
         # Mount the data directory
         run_options["volumes"][str(data_dir)] = {
             "bind": "/Lean/Data",
@@ -333,6 +376,80 @@ class LeanRunner:
 
         return run_options
 
+    def get_resources(self, project_dir: Path, overrides: Optional[DockerResources] = None) -> DockerResources:
+        """Returns the resources the container running a project may use.
+
+        :param project_dir: the path to the project directory
+        :param overrides: the resources given on the command-line, taking precedence over the project config
+        :return: the resources configured in the "docker" object of the project's config, updated with the overrides
+        """
+        docker_project_config = self._project_config_manager.get_project_config(project_dir).get("docker", {})
+
+        resources = DockerResources(**{key.replace("-", "_"): value
+                                       for key, value in docker_project_config.items()
+                                       if key in ["cpus", "memory", "cpuset-cpus", "numa-node", "shm-size"]})
+        if overrides is not None:
+            resources = resources.override(overrides)
+
+        return resources
+
+    def set_up_resource_options(self, resources: DockerResources, run_options: Dict[str, Any]) -> None:
+        """Sets up Docker run options limiting the resources of the container.
+
+        The .NET garbage collector sizes its heaps for all CPUs and memory it can see,
+        so it is configured to match the limits to make containers scale with the resources they are given.
+
+        :param resources: the resources the container may use
+        :param run_options: the dictionary to append run options to
+        """
+        cpu_count = None
+
+        if resources.cpus is not None:
+            if resources.cpus <= 0:
+                raise RuntimeError("The amount of CPUs must be positive")
+
+            run_options["nano_cpus"] = int(resources.cpus * 1e9)
+            cpu_count = math.ceil(resources.cpus)
+
+        cpuset_cpus = resources.cpuset_cpus
+        if resources.numa_node is not None:
+            run_options["cpuset_mems"] = str(resources.numa_node)
+
+            # The CPUs of the node can only be looked up if the containers run on this machine
+            if cpuset_cpus is None and self._platform_manager.is_host_linux():
+                cpuset_cpus = get_numa_node_cpus(resources.numa_node)
+                if cpuset_cpus is None:
+                    raise RuntimeError(f"NUMA node {resources.numa_node} does not exist")
+
+        if cpuset_cpus is not None:
+            try:
+                pinned_cpus = len(parse_cpu_list(cpuset_cpus))
+            except ValueError as error:
+                raise RuntimeError(str(error))
+
+            run_options["cpuset_cpus"] = cpuset_cpus
+            cpu_count = pinned_cpus if cpu_count is None else min(cpu_count, pinned_cpus)
+
+        if resources.shm_size is not None:
+            run_options["shm_size"] = resources.shm_size
+
+        # The GC settings are read as hexadecimal numbers, values in the project's environment take precedence
+        environment = run_options["environment"]
+        if cpu_count is not None:
+            environment.setdefault("DOTNET_gcServer", "1" if cpu_count > 1 else "0")
+            environment.setdefault("DOTNET_GCHeapCount", format(cpu_count, "x"))
+            environment.setdefault("OMP_NUM_THREADS", str(cpu_count))
+
+        if resources.memory is not None:
+            try:
+                memory_limit = parse_memory_size(resources.memory)
+            except ValueError as error:
+                raise RuntimeError(str(error))
+
+            run_options["mem_limit"] = memory_limit
+            heap_limit = int(memory_limit * DOTNET_GC_HEAP_LIMIT_RATIO)
+            environment.setdefault("DOTNET_GCHeapHardLimit", format(heap_limit, "x"))
+
     def set_up_python_options(self, project_dir: Path, run_options: Dict[str, Any]) -> None:
         """Sets up Docker run options specific to Python projects.
 
@@ -358,10 +475,7 @@ class LeanRunner:
             run_options["commands"].append("mkdir -p $(python -m site --user-site)")
             run_options["commands"].append("echo /Library > $(python -m site --user-site)/lean-cli.pth")
 
-        # Combine the requirements from all library projects and the current project
-        requirements_files = list(library_dir.rglob("requirements.txt")) + [project_dir / "requirements.txt"]
-        requirements_files = [file for file in requirements_files if file.is_file()]
-        requirements = self._concat_python_requirements(requirements_files)
+        requirements = self.get_python_requirements(project_dir)
 
         # Check if we have any dependencies to install, so we don't mount volumes needlessly
         if requirements == "":
@@ -405,6 +519,20 @@ class LeanRunner:
             f"touch {marker_file}"
         ])
 
+    def get_python_requirements(self, project_dir: Path) -> str:
+        """Returns the Python requirements which are installed in the container running a project.
+
+        Projects with the same requirements share the same site-packages volume.
+
+        :param project_dir: the path to the project directory
+        :return: the combined requirements of all library projects and the given project, empty if there are none
+        """
+        # Combine the requirements from all library projects and the current project
+        library_dir = self._lean_config_manager.get_cli_root_directory() / "Library"
+        requirements_files = list(library_dir.rglob("requirements.txt")) + [project_dir / "requirements.txt"]
+        requirements_files = [file for file in requirements_files if file.is_file()]
+        return self._concat_python_requirements(requirements_files)
+
     def _concat_python_requirements(self, requirements_files: List[Path]) -> str:
         """Combines the requirements from multiple requirements.txt files.
 
@@ -0,0 +1,553 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import shlex
+import shutil
+import uuid
+from pathlib import Path
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dateutil.parser import isoparse
+from docker.errors import APIError
+from docker.models.containers import Container
+from docker.types import Mount
+
+from lean.components.config.cli_config_manager import CLIConfigManager
+from lean.components.config.lean_config_manager import LeanConfigManager
+from lean.components.docker.docker_manager import DockerManager
+from lean.components.util.logger import Logger
+from lean.constants import WARM_POOL_DIRECTORY, WARM_CONTAINER_LABEL, DEFAULT_WARM_POOL_SIZE, \
+    WARM_POOL_MAX_IDLE_CONTAINERS, WARM_CONTAINER_MAX_USES, WARM_CONTAINER_IDLE_TTL
+from lean.models.docker import DockerImage
+from lean.models.json_module_config import DebuggingMethod
+
+
+class WarmContainerPool:
+    """The WarmContainerPool class runs backtests in long-lived engine containers which are initialized only once.
+
+    A warm container runs all setup commands of a normal engine container, like installing modules and Python
+    requirements, and then waits for work. The CLI root directory is mounted into it, so each backtest only has to
+    point /LeanCLI, /Results and /Storage to the right directories and start the engine with a new config.
+
+    Containers are shared between all backtests with the same fingerprint, which covers the image, the mounted
+    directories, the setup commands and the files they use. Idle and busy containers are told apart by their name.
+    Renaming a container is atomic, which makes it safe for multiple CLI processes to claim containers concurrently.
+
+    A container stops itself when it hasn't run LEAN for WARM_CONTAINER_IDLE_TTL seconds,
+    so idle containers don't hold on to memory when no backtests are run for a while.
+    """
+
+    # The container paths which are different for every backtest and therefore not mounted into warm containers
+    _per_run_targets = ["/LeanCLI", "/Results", "/Storage"]
+    _config_target = "/Lean/Launcher/bin/Debug/config.json"
+
+    # The run options limiting the resources of a container, which can only be set when the container is started
+    _resource_options = ["nano_cpus", "mem_limit", "cpuset_cpus", "cpuset_mems", "shm_size"]
+
+    # The line a warm container prints when it is done running its setup commands
+    _ready_marker = "LEAN_CLI_WARM_CONTAINER_READY"
+
+    # The file in the container directory of which the modification time is the last time the container was used
+    _last_used_file = "last-used"
+
+    # The file in the container directory containing the output of the setup commands
+    # Containers are removed when they exit, so this is the only output left of a container which failed its setup
+    _setup_output_file = "setup-output.txt"
+
+    def __init__(self,
+                 logger: Logger,
+                 docker_manager: DockerManager,
+                 lean_config_manager: LeanConfigManager,
+                 cli_config_manager: CLIConfigManager) -> None:
+        """Creates a new WarmContainerPool instance.
+
+        :param logger: the logger that is used to print messages
+        :param docker_manager: the DockerManager instance which is used to interact with Docker
+        :param lean_config_manager: the LeanConfigManager instance to retrieve the CLI root directory from
+        :param cli_config_manager: the CLIConfigManager instance to retrieve the pool size from
+        """
+        self._logger = logger
+        self._docker_manager = docker_manager
+        self._lean_config_manager = lean_config_manager
+        self._cli_config_manager = cli_config_manager
+
+    def is_enabled(self, override: Optional[bool] = None) -> bool:
+        """Returns whether backtests should run in warm containers.
+
+        :param override: True or False to force using warm containers or not, None to use the configured default
+        :return: True if the warm-pool-size option is set or the override is True, False if not
+        """
+        if override is not None:
+            return override
+
+        return self._cli_config_manager.warm_pool_size.get_value() is not None
+
+    def get_unsupported_reason(self,
+                               algorithm_file: Path,
+                               output_dir: Path,
+                               run_options: Dict[str, Any],
+                               debugging_method: Optional[DebuggingMethod],
+                               detach: bool) -> Optional[str]:
+        """Returns why a backtest cannot run in a warm container.
+
+        :param algorithm_file: the path to the file containing the algorithm
+        :param output_dir: the directory to save output data to
+        :param run_options: the Docker run options created by the LeanRunner
+        :param debugging_method: the debugging method if debugging needs to be enabled, None if not
+        :param detach: whether LEAN should run in a detached container
+        :return: the reason the backtest cannot run in a warm container, or None if it can
+        """
+        if debugging_method is not None or detach:
+            return "debugging sessions and detached backtests need a dedicated container"
+
+        # C# projects are compiled against .csproj files that are mounted over the user's, which is done per run
+        if not algorithm_file.name.endswith(".py"):
+            return "C# projects are compiled in a dedicated container"
+
+        if len(run_options["ports"]) > 0:
+            return "the project publishes ports, which can only be bound by one container"
+
+        if any(mount["Target"].startswith("/Files/") for mount in run_options["mounts"]):
+            return "the Lean configuration references local files, which must be mounted per run"
+
+        cli_root_dir = self._lean_config_manager.get_cli_root_directory()
+        for path in [algorithm_file.parent, output_dir]:
+            try:
+                path.relative_to(cli_root_dir)
+            except ValueError:
+                return f"'{path}' is not inside the CLI root directory"
+
+        return None
+
+    def run_lean(self, image: DockerImage, run_options: Dict[str, Any], project_dir: Path, output_dir: Path) -> bool:
+        """Runs the LEAN engine in a warm container, starting one if there is no idle container to use.
+
+        :param image: the LEAN engine image to use
+        :param run_options: the Docker run options created by the LeanRunner, without the command starting LEAN
+        :param project_dir: the path to the project directory
+        :param output_dir: the directory to save output data to
+        :return: True if LEAN exited successfully, False if not
+        """
+        if not self._docker_manager.image_installed(image):
+            self._docker_manager.pull_image(image)
+
+        container_options, config_file = self._split_run_options(run_options)
+        fingerprint = self._get_fingerprint(image, container_options)
+
+        self._remove_unused_containers(fingerprint)
+
+        container = self._claim_container(image, container_options, fingerprint)
+        container_dir = self._get_container_directory(container)
+
+        completed = False
+        try:
+            cli_root_dir = self._lean_config_manager.get_cli_root_directory()
+            container_paths = {
+                "/LeanCLI": project_dir,
+                "/Results": output_dir,
+                "/Storage": project_dir / "storage"
+            }
+
+            # Point the per-run paths to the right directories in the mounted CLI root directory and start LEAN
+            run_commands = ["#!/usr/bin/env bash", "set -e"]
+            for target, path in container_paths.items():
+                source = f"/LeanCLIRoot/{path.relative_to(cli_root_dir).as_posix()}"
+                run_commands.append(f"rm -rf {target}")
+                run_commands.append(f"ln -s {shlex.quote(source)} {target}")
+            run_commands.append(f"cp /LeanCLIWarm/config.json {self._config_target}")
+            run_commands.append("cd /Lean/Launcher/bin/Debug")
+            run_commands.append("exec dotnet QuantConnect.Lean.Launcher.dll")
+
+            shutil.copyfile(config_file, container_dir / "config.json")
+            with (container_dir / "run.sh").open("w+", encoding="utf-8", newline="\n") as file:
+                file.write("\n".join(run_commands) + "\n")
+
+            self._logger.debug(f"Running LEAN in warm container '{container.name}'")
+            success = self._docker_manager.run_in_container(container,
+                                                            ["bash", "/LeanCLIWarm/run.sh"],
+                                                            log_directory=run_options.get("log_directory", None),
+                                                            log_prefix=run_options.get("log_prefix", None))
+            completed = True
+        finally:
+            # LEAN may still be running in the container if the run was interrupted, so it can't be reused
+            if completed:
+                self._release_container(container)
+            else:
+                self._remove_container(container)
+
+        self._fill_pool(image, container_options, fingerprint)
+
+        return success
+
+    def _split_run_options(self, run_options: Dict[str, Any]) -> Tuple[Dict[str, Any], Path]:
+        """Splits run options into the options shared by all backtests and the config file of this backtest.
+
+        :param run_options: the Docker run options created by the LeanRunner
+        :return: the options to start warm containers with and the path to the Lean config of this backtest
+        """
+        container_options = {
+            "commands": list(run_options["commands"]),
+            "environment": dict(run_options["environment"]),
+            "volumes": {source: volume for source, volume in run_options["volumes"].items()
+                        if volume["bind"] not in self._per_run_targets},
+            "mounts": [mount for mount in run_options["mounts"] if mount["Target"] != self._config_target],
+            "resources": {key: run_options[key] for key in self._resource_options if key in run_options}
+        }
+
+        config_mount = next(mount for mount in run_options["mounts"] if mount["Target"] == self._config_target)
+        return container_options, Path(config_mount["Source"])
+
+    def _get_fingerprint(self, image: DockerImage, container_options: Dict[str, Any]) -> str:
+        """Returns the fingerprint of the warm containers which can run a backtest with the given options.
+
+        :param image: the LEAN engine image to use
+        :param container_options: the options to start warm containers with
+        :return: a hash covering the image, the mounts, the environment, the resources and the setup commands
+        """
+        fingerprint = {
+            "image": self._docker_manager.get_local_id(image),
+            "cli-root": str(self._lean_config_manager.get_cli_root_directory()),
+            "commands": container_options["commands"],
+            "environment": container_options["environment"],
+            "volumes": container_options["volumes"],
+            "resources": container_options["resources"],
+            "mounts": [[mount["Target"], hashlib.sha256(Path(mount["Source"]).read_bytes()).hexdigest()]
+                       for mount in container_options["mounts"]]
+        }
+
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def _claim_container(self, image: DockerImage, container_options: Dict[str, Any], fingerprint: str) -> Container:
+        """Claims an idle warm container with the given fingerprint, starting a new one if none are idle.
+
+        :param image: the LEAN engine image to use
+        :param container_options: the options to start warm containers with
+        :param fingerprint: the fingerprint of the containers that can be claimed
+        :return: the claimed container, which is ready to run LEAN
+        """
+        started_container_id = None
+
+        while True:
+            idle_containers = [c for c in self._get_containers(fingerprint) if not self._is_busy(c)]
+            if len(idle_containers) == 0:
+                # A container which exited before it could be claimed failed its setup, another one would fail too
+                if started_container_id is not None and not self._is_running(started_container_id):
+                    self._raise_setup_error(started_container_id)
+
+                self._logger.info("Starting a warm engine container, later backtests with this configuration reuse it")
+                started_container_id = self._start_container(image, container_options, fingerprint)
+                continue
+
+            for container in idle_containers:
+                try:
+                    container.rename(f"{WARM_CONTAINER_LABEL}_busy_{self._get_container_id(container)}")
+                except APIError:
+                    # Another CLI process claimed the container first or it stopped in the meantime
+                    continue
+
+                # Claiming the container counts as using it, so it doesn't stop itself before LEAN starts
+                self._touch_last_used(container)
+
+                try:
+                    container.reload()
+                except APIError:
+                    # The container stopped itself because it was idle for too long right before it was claimed
+                    continue
+
+                if self._wait_until_ready(container):
+                    return container
+
+                self._remove_container(container)
+                raise RuntimeError(
+                    "Something went wrong while starting the warm engine container, see the logs above for more information")
+
+    def _start_container(self, image: DockerImage, container_options: Dict[str, Any], fingerprint: str) -> str:
+        """Starts a new idle warm container, without waiting for its setup commands to finish.
+
+        :param image: the LEAN engine image to use
+        :param container_options: the options to start warm containers with
+        :param fingerprint: the fingerprint of the container
+        :return: the id of the started container
+        """
+        container_id = uuid.uuid4().hex
+        container_dir = Path(WARM_POOL_DIRECTORY) / container_id
+        (container_dir / "files").mkdir(parents=True)
+
+        # The temporary files mounted into normal containers are deleted when the CLI exits
+        # Warm containers outlive the CLI, so they get copies of these files which are removed with the container
+        mounts = []
+        for index, mount in enumerate(container_options["mounts"]):
+            source = Path(mount["Source"])
+            persistent_source = container_dir / "files" / f"{index}-{source.name}"
+            shutil.copyfile(source, persistent_source)
+
+            mounts.append(Mount(target=mount["Target"],
+                                source=str(persistent_source),
+                                type="bind",
+                                read_only=mount.get("ReadOnly", False)))
+
+        setup_commands = ["#!/usr/bin/env bash", "set -e"]
+        if self._logger.debug_logging_enabled:
+            setup_commands.append("set -x")
+        setup_commands += container_options["commands"]
+
+        with (container_dir / "setup.sh").open("w+", encoding="utf-8", newline="\n") as file:
+            file.write("\n".join(setup_commands) + "\n")
+
+        # The pipeline waits for tee, so the output file is complete when the container exits after a failed setup
+        start_commands = [
+            "#!/usr/bin/env bash",
+            "set -o pipefail",
+            f"bash /LeanCLIWarm/setup.sh 2>&1 | tee /LeanCLIWarm/{self._setup_output_file} || exit 1",
+            f"echo {self._ready_marker}"
+        ]
+
+        # Wait for work until LEAN hasn't run for the idle TTL, the pattern doesn't match grep's own command line
+        last_used_file = f"/LeanCLIWarm/{self._last_used_file}"
+        expired_last_used_file = f"$(find {last_used_file} -mmin +{WARM_CONTAINER_IDLE_TTL // 60} 2>/dev/null)"
+        start_commands += [
+            f"touch {last_used_file}",
+            "while sleep 60; do",
+            f"    if grep -qs 'QuantConnect[.]Lean[.]Launcher' /proc/[0-9]*/cmdline; then touch {last_used_file}; fi",
+            f"    if [ -n \"{expired_last_used_file}\" ]; then exit 0; fi",
+            "done"
+        ]
+
+        with (container_dir / "start.sh").open("w+", encoding="utf-8", newline="\n") as file:
+            file.write("\n".join(start_commands) + "\n")
+
+        volumes = dict(container_options["volumes"])
+        volumes[str(self._lean_config_manager.get_cli_root_directory())] = {
+            "bind": "/LeanCLIRoot",
+            "mode": "rw"
+        }
+        volumes[str(container_dir)] = {
+            "bind": "/LeanCLIWarm",
+            "mode": "rw"
+        }
+
+        self._docker_manager.run_image(image,
+                                       name=f"{WARM_CONTAINER_LABEL}_{container_id}",
+                                       detach=True,
+                                       entrypoint=["bash", "/LeanCLIWarm/start.sh"],
+                                       environment=dict(container_options["environment"]),
+                                       volumes=volumes,
+                                       mounts=mounts,
+                                       labels={WARM_CONTAINER_LABEL: fingerprint},
+                                       **container_options["resources"])
+
+        return container_id
+
+    def _wait_until_ready(self, container: Container) -> bool:
+        """Waits until a warm container has finished running its setup commands.
+
+        The output of the setup commands is printed if the container is not ready yet.
+
+        :param container: the container to wait for
+        :return: True if the container is ready, False if it exited before it became ready
+        """
+        if self._ready_marker in container.logs().decode("utf-8"):
+            return True
+
+        chunk_buffer = bytes()
+        try:
+            for chunk in container.logs(stream=True, follow=True):
+                chunk_buffer += chunk
+
+                if not chunk_buffer.endswith(b"\n"):
+                    continue
+
+                chunk = chunk_buffer.decode("utf-8")
+                chunk_buffer = bytes()
+
+                if self._ready_marker in chunk:
+                    return True
+
+                self._logger.info(chunk.rstrip())
+        except Exception:
+            # The stream is interrupted when the container exits and is removed
+            pass
+
+        return False
+
+    def _is_running(self, container_id: str) -> bool:
+        """Returns whether a warm container is still running, regardless of whether it has been claimed.
+
+        :param container_id: the id the CLI assigned to the container
+        :return: True if the container is running, False if it exited
+        """
+        for name in [f"{WARM_CONTAINER_LABEL}_{container_id}", f"{WARM_CONTAINER_LABEL}_busy_{container_id}"]:
+            container = self._docker_manager.get_container_by_name(name)
+            if container is not None and container.status == "running":
+                return True
+
+        return False
+
+    def _raise_setup_error(self, container_id: str) -> None:
+        """Prints the output of a warm container which exited before it became ready and raises an error.
+
+        :param container_id: the id the CLI assigned to the container
+        """
+        container_dir = Path(WARM_POOL_DIRECTORY) / container_id
+
+        output_file = container_dir / self._setup_output_file
+        if output_file.is_file():
+            output = output_file.read_text(encoding="utf-8", errors="replace").rstrip()
+            if output != "":
+                self._logger.info(output)
+
+        shutil.rmtree(container_dir, ignore_errors=True)
+
+        raise RuntimeError(
+            "Something went wrong while starting the warm engine container, see the logs above for more information")
+
+    def _release_container(self, container: Container) -> None:
+        """Makes a claimed container idle again, or removes it if it should be replaced.
+
+        :param container: the claimed container to release
+        """
+        container_dir = self._get_container_directory(container)
+
+        uses_file = container_dir / "uses"
+        uses = int(uses_file.read_text(encoding="utf-8")) + 1 if uses_file.is_file() else 1
+
+        try:
+            container.reload()
+        except APIError:
+            self._remove_container(container)
+            return
+
+        if container.status != "running" or uses >= WARM_CONTAINER_MAX_USES:
+            self._remove_container(container)
+            return
+
+        uses_file.write_text(str(uses), encoding="utf-8")
+        self._touch_last_used(container)
+
+        try:
+            container.rename(f"{WARM_CONTAINER_LABEL}_{self._get_container_id(container)}")
+        except APIError:
+            # A container that can't be made idle again would stay claimed forever
+            self._remove_container(container)
+
+    def _touch_last_used(self, container: Container) -> None:
+        """Records that a warm container is used, which resets the time after which it stops itself.
+
+        :param container: the container that is used
+        """
+        try:
+            (self._get_container_directory(container) / self._last_used_file).touch()
+        except OSError:
+            pass
+
+    def _fill_pool(self, image: DockerImage, container_options: Dict[str, Any], fingerprint: str) -> None:
+        """Starts new warm containers until the pool for the given fingerprint has the configured size.
+
+        :param image: the LEAN engine image to use
+        :param container_options: the options to start warm containers with
+        :param fingerprint: the fingerprint of the pool to fill
+        """
+        missing_containers = self._get_pool_size() - len(self._get_containers(fingerprint))
+        for _ in range(missing_containers):
+            self._start_container(image, container_options, fingerprint)
+
+    def _remove_unused_containers(self, fingerprint: str) -> None:
+        """Removes idle containers with other fingerprints when there are too many idle containers.
+
+        Also removes the directories of containers which no longer exist.
+
+        :param fingerprint: the fingerprint of the containers that are about to be used
+        """
+        all_containers = self._get_containers()
+
+        idle_containers = [c for c in all_containers if not self._is_busy(c)]
+        unused_containers = [c for c in idle_containers if c.labels.get(WARM_CONTAINER_LABEL, None) != fingerprint]
+        unused_containers = sorted(unused_containers, key=lambda c: isoparse(c.attrs["Created"]))
+
+        removed_containers = unused_containers[:max(0, len(idle_containers) - WARM_POOL_MAX_IDLE_CONTAINERS)]
+        for container in removed_containers:
+            self._logger.debug(f"Removing unused warm container '{container.name}'")
+            self._remove_container(container)
+
+        # Containers remove themselves when they stop, but their directories remain
+        # The age check prevents removing directories of containers that another CLI process is starting
+        existing_ids = {self._get_container_id(c) for c in all_containers if c not in removed_containers}
+        warm_pool_dir = Path(WARM_POOL_DIRECTORY)
+        if warm_pool_dir.is_dir():
+            for container_dir in warm_pool_dir.iterdir():
+                if container_dir.name not in existing_ids and time() - container_dir.stat().st_mtime > 60 * 60:
+                    shutil.rmtree(container_dir, ignore_errors=True)
+
+    def _remove_container(self, container: Container) -> None:
+        """Removes a warm container and its directory.
+
+        :param container: the container to remove
+        """
+        try:
+            container.remove(force=True)
+        except APIError:
+            pass
+
+        shutil.rmtree(self._get_container_directory(container), ignore_errors=True)
+
+    def _get_containers(self, fingerprint: Optional[str] = None) -> List[Container]:
+        """Returns the running warm containers.
+
+        :param fingerprint: the fingerprint of the containers to return, or None to return all warm containers
+        :return: the running warm containers with the given fingerprint
+        """
+        return self._docker_manager.get_containers_by_label(WARM_CONTAINER_LABEL, fingerprint)
+
+    def _get_pool_size(self) -> int:
+        """Returns the amount of warm containers to keep per fingerprint.
+
+        :return: the configured pool size, or DEFAULT_WARM_POOL_SIZE if it is not set or invalid
+        """
+        option = self._cli_config_manager.warm_pool_size
+
+        value = option.get_value()
+        if value is None:
+            return DEFAULT_WARM_POOL_SIZE
+
+        try:
+            return max(1, int(value))
+        except ValueError:
+            self._logger.debug(f"Ignoring invalid value '{value}' of the '{option.key}' option")
+            return DEFAULT_WARM_POOL_SIZE
+
+    def _is_busy(self, container: Container) -> bool:
+        """Returns whether a warm container is claimed by a backtest.
+
+        :param container: the container to check
+        :return: True if the container is running a backtest, False if it is idle
+        """
+        return container.name.lstrip("/").startswith(f"{WARM_CONTAINER_LABEL}_busy_")
+
+    def _get_container_id(self, container: Container) -> str:
+        """Returns the id the CLI assigned to a warm container, which stays the same when the container is renamed.
+
+        :param container: the container to get the id of
+        :return: the id of the container, which is also the name of its directory
+        """
+        return container.name.split("_")[-1]
+
+    def _get_container_directory(self, container: Container) -> Path:
+        """Returns the directory containing the scripts and configuration of a warm container.
+
+        :param container: the container to get the directory of
+        :return: the path to the directory which is mounted to /LeanCLIWarm in the container
+        """
+        return Path(WARM_POOL_DIRECTORY) / self._get_container_id(container)
@@ -0,0 +1,159 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import threading
+from time import perf_counter, sleep
+from typing import Optional
+
+
+class ConcurrencyBudget:
+    """A ConcurrencyBudget limits the amount of concurrent transfers across all parts of the CLI that share it.
+
+    Every transfer holds one slot while it runs. A transfer that can split itself into parallel parts
+    only claims the slots that are free, so splitting never blocks and never exceeds the budget.
+
+    The amount of usable slots adapts to the observed throughput and errors (additive increase, multiplicative decrease).
+    After every window of completed transfers one slot is added if the throughput did not drop,
+    and the last added slot is removed again if it did. Every error halves the amount of usable slots.
+    """
+
+    def __init__(self, size: int) -> None:
+        """Creates a new ConcurrencyBudget instance.
+
+        :param size: the maximum amount of slots that can be held at the same time
+        """
+        self._condition = threading.Condition()
+        self._size = max(1, size)
+        self._limit = self._size
+        self._used = 0
+
+        self._window_start = perf_counter()
+        self._window_bytes = 0
+        self._window_transfers = 0
+        self._last_throughput = 0.0
+
+        self._max_bandwidth: Optional[float] = None
+        self._bandwidth_lock = threading.Lock()
+        self._bandwidth_time = perf_counter()
+
+    def configure(self, size: int, initial_size: int, max_bandwidth: Optional[float] = None) -> None:
+        """Configures the budget before a batch of transfers starts.
+
+        :param size: the maximum amount of slots that can be held at the same time
+        :param initial_size: the amount of usable slots to start with, which grows up to the size
+        :param max_bandwidth: the maximum amount of bytes per second all transfers may receive together
+        """
+        with self._condition:
+            self._size = max(1, size)
+            self._limit = max(1, min(initial_size, self._size))
+            self._max_bandwidth = max_bandwidth
+            self._reset_window()
+            self._last_throughput = 0.0
+            self._condition.notify_all()
+
+    def get_size(self) -> int:
+        """Returns the maximum amount of slots that can be held at the same time.
+
+        :return: the size of the budget
+        """
+        return self._size
+
+    def get_limit(self) -> int:
+        """Returns the amount of slots that can currently be held at the same time.
+
+        :return: the current limit of the budget, which is at most its size
+        """
+        return self._limit
+
+    def acquire(self) -> None:
+        """Blocks until a slot is free and claims it."""
+        with self._condition:
+            while self._used >= self._limit:
+                self._condition.wait()
+            self._used += 1
+
+    def try_acquire(self, count: int) -> int:
+        """Claims up to a given amount of slots without blocking.
+
+        :param count: the maximum amount of slots to claim
+        :return: the amount of slots that were claimed, which may be 0
+        """
+        with self._condition:
+            claimed = max(0, min(count, self._limit - self._used))
+            self._used += claimed
+            return claimed
+
+    def release(self, count: int = 1) -> None:
+        """Releases slots that were claimed before.
+
+        :param count: the amount of slots to release
+        """
+        with self._condition:
+            self._used = max(0, self._used - count)
+            self._condition.notify_all()
+
+    def record_transfer(self, size: int) -> None:
+        """Records a completed transfer, adjusting the limit once a full window of transfers has completed.
+
+        :param size: the amount of bytes that were transferred
+        """
+        with self._condition:
+            self._window_bytes += size
+            self._window_transfers += 1
+
+            if self._window_transfers < self._limit:
+                return
+
+            elapsed = perf_counter() - self._window_start
+            throughput = self._window_bytes / elapsed if elapsed > 0 else 0.0
+
+            # 5% of slack prevents noise from undoing every increase
+            if throughput >= self._last_throughput * 0.95:
+                self._limit = min(self._size, self._limit + 1)
+            else:
+                self._limit = max(1, self._limit - 1)
+
+            self._last_throughput = throughput
+            self._reset_window()
+            self._condition.notify_all()
+
+    def record_error(self) -> None:
+        """Records a failed transfer attempt, halving the limit."""
+        with self._condition:
+            self._limit = max(1, self._limit // 2)
+            self._reset_window()
+
+    def throttle(self, size: int) -> None:
+        """Blocks long enough to keep all transfers together below the maximum bandwidth.
+
+        :param size: the amount of bytes that were just received
+        """
+        if self._max_bandwidth is None:
+            return
+
+        # Every chunk reserves its share of the bandwidth after the chunks reserved before it
+        with self._bandwidth_lock:
+            now = perf_counter()
+            self._bandwidth_time = max(self._bandwidth_time, now) + size / self._max_bandwidth
+            delay = self._bandwidth_time - now
+
+        # A small burst is allowed so transfers don't sleep after every chunk
+        if delay > 0.1:
+            sleep(delay)
+
+    def _reset_window(self) -> None:
+        """Starts a new window of transfers to measure the throughput of. The caller must hold the condition."""
+        self._window_start = perf_counter()
+        self._window_bytes = 0
+        self._window_transfers = 0
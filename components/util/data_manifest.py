@@ -0,0 +1,192 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import hashlib
+import sqlite3
+import threading
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from lean.models.data_manifest import DataManifestEntry
+
+
+def hash_file(file: Path) -> str:
+    """Calculates the SHA-256 hash of a file without reading the whole file into memory.
+
+    :param file: the path to the file to hash
+    :return: the hex digest of the SHA-256 hash of the file's content
+    """
+    sha256 = hashlib.sha256()
+    with file.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def verify_file(data_directory: Path, entry: DataManifestEntry) -> Optional[str]:
+    """Verifies that a file in the data directory still matches its manifest entry.
+
+    This function runs in the worker processes of `lean data verify`, so it must be importable at the module level.
+
+    :param data_directory: the path to the local data directory
+    :param entry: the manifest entry of the file to verify
+    :return: a description of the problem if the file is invalid, None if the file is valid
+    """
+    file = data_directory / entry.path
+
+    if not file.is_file():
+        return "File is missing"
+
+    size = file.stat().st_size
+    if size != entry.size:
+        return f"Size is {size:,.0f} bytes, expected {entry.size:,.0f} bytes"
+
+    if entry.sha256 is not None and hash_file(file) != entry.sha256:
+        return "Checksum does not match"
+
+    if file.suffix == ".zip":
+        return verify_zip_file(file)
+
+    return None
+
+
+def verify_zip_file(file: Path) -> Optional[str]:
+    """Verifies that a zip file is valid and that the CRCs of its members match their content.
+
+    :param file: the path to the zip file to verify
+    :return: a description of the problem if the file is invalid, None if the file is valid
+    """
+    try:
+        with zipfile.ZipFile(file) as zip_file:
+            corrupt_member = zip_file.testzip()
+    except (zipfile.BadZipFile, OSError) as e:
+        return f"Invalid zip file: {e}"
+
+    if corrupt_member is not None:
+        return f"CRC check failed for {corrupt_member}"
+
+    return None
+
+
+class DataManifest:
+    """A DataManifest records the size and hash of every file downloaded to a data directory.
+
+    The manifest is a SQLite database, so recording a file is a single indexed write regardless of the manifest's size.
+    """
+
+    def __init__(self, file: Path) -> None:
+        """Creates a new DataManifest instance.
+
+        :param file: the path to the SQLite database, which is created if it does not exist yet
+        """
+        self._file = file
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def get(self, relative_file: str) -> Optional[DataManifestEntry]:
+        """Returns the manifest entry of a file.
+
+        :param relative_file: the path of the file relative to the data directory
+        :return: the entry of the file, or None if the file is not in the manifest
+        """
+        with self._lock:
+            row = self._get_connection().execute("SELECT * FROM files WHERE path = ?", [relative_file]).fetchone()
+
+        return self._parse_row(row) if row is not None else None
+
+    def get_all(self) -> List[DataManifestEntry]:
+        """Returns all entries in the manifest.
+
+        :return: the entries of all files in the manifest, ordered by path
+        """
+        with self._lock:
+            rows = self._get_connection().execute("SELECT * FROM files ORDER BY path").fetchall()
+
+        return [self._parse_row(row) for row in rows]
+
+    def add(self, data_directory: Path, relative_file: str, vendor: Optional[str], calculate_hash: bool = True) -> None:
+        """Records a file that was downloaded, replacing its existing entry if there is one.
+
+        :param data_directory: the path to the local data directory
+        :param relative_file: the path of the file relative to the data directory
+        :param vendor: the name of the vendor the file was bought from
+        :param calculate_hash: whether the SHA-256 hash of the file should be calculated and recorded
+        """
+        file = data_directory / relative_file
+        size = file.stat().st_size
+        sha256 = hash_file(file) if calculate_hash else None
+        downloaded_at = datetime.now(tz=timezone.utc).timestamp()
+
+        with self._lock:
+            connection = self._get_connection()
+            connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                               [relative_file, size, sha256, vendor, downloaded_at])
+            connection.commit()
+
+    def remove(self, relative_file: str) -> None:
+        """Removes the entry of a file from the manifest.
+
+        :param relative_file: the path of the file relative to the data directory
+        """
+        with self._lock:
+            connection = self._get_connection()
+            connection.execute("DELETE FROM files WHERE path = ?", [relative_file])
+            connection.commit()
+
+    def close(self) -> None:
+        """Closes the connection to the database if it is open."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Returns the connection to the database, opening it and creating the schema on first use.
+
+        The caller must hold the lock.
+
+        :return: the connection to the database
+        """
+        if self._connection is None:
+            self._file.parent.mkdir(parents=True, exist_ok=True)
+
+            # The connection is shared by the download threads, which serialize their access with the lock
+            self._connection = sqlite3.connect(str(self._file), check_same_thread=False)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    sha256 TEXT,
+                    vendor TEXT,
+                    downloaded_at REAL NOT NULL
+                )
+            """)
+            self._connection.commit()
+
+        return self._connection
+
+    def _parse_row(self, row: tuple) -> DataManifestEntry:
+        """Parses a row of the files table into a manifest entry.
+
+        :param row: the row to parse
+        :return: the parsed manifest entry
+        """
+        path, size, sha256, vendor, downloaded_at = row
+        return DataManifestEntry(path=path,
+                                 size=size,
+                                 sha256=sha256,
+                                 vendor=vendor,
+                                 downloaded_at=datetime.fromtimestamp(downloaded_at, tz=timezone.utc))
@@ -0,0 +1,140 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import threading
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+
+class DownloadJournal:
+    """A DownloadJournal records which files of a download are resolved, which are in-flight and which are completed.
+
+    The journal is an append-only JSON lines file, so recording a file's state never rewrites the whole journal.
+    If a download is interrupted, the next download of the same files reads the journal
+    to resume where the previous one stopped.
+    """
+
+    def __init__(self, file: Path, files: Iterable[str]) -> None:
+        """Creates a new DownloadJournal instance, reading the entries of an interrupted download if there are any.
+
+        The entries are only read if the interrupted download downloaded the same files,
+        the journal of a download of other files is discarded.
+
+        :param file: the path to the journal file
+        :param files: the relative paths of the files that are downloaded
+        """
+        self._file = file
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+        self._scope = sha256("\n".join(sorted(set(files))).encode("utf-8")).hexdigest()
+        self._has_header = False
+
+        if file.is_file():
+            lines = file.read_text(encoding="utf-8").splitlines()
+
+            try:
+                self._has_header = len(lines) > 0 and json.loads(lines[0]).get("scope", None) == self._scope
+            except ValueError:
+                pass
+
+            if not self._has_header:
+                return
+
+            for line in lines[1:]:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line may be incomplete if the previous download was killed while writing it
+                    continue
+
+                self._entries[entry["file"]] = entry
+
+    def has_entries(self) -> bool:
+        """Returns whether the journal contains entries of an interrupted download.
+
+        :return: True if the journal is not empty, False if it is
+        """
+        return len(self._entries) > 0
+
+    def is_completed(self, relative_file: str) -> bool:
+        """Returns whether a file was completely downloaded.
+
+        :param relative_file: the path of the file relative to the data directory
+        :return: True if the file was completely downloaded, False if not
+        """
+        with self._lock:
+            return self._entries.get(relative_file, {}).get("state", None) == "completed"
+
+    def get_validator(self, relative_file: str) -> Optional[str]:
+        """Returns the validator of the partially downloaded content of a file.
+
+        :param relative_file: the path of the file relative to the data directory
+        :return: the ETag of the remote file the partial content belongs to, or None if it is unknown
+        """
+        with self._lock:
+            return self._entries.get(relative_file, {}).get("validator", None)
+
+    def resolve(self, relative_file: str) -> None:
+        """Records that the link of a file has been resolved, which means the file has been purchased.
+
+        The validator of partial content written by an interrupted download is kept, so the file can still be resumed.
+
+        :param relative_file: the path of the file relative to the data directory
+        """
+        self._append({"file": relative_file, "state": "resolved", "validator": self.get_validator(relative_file)})
+
+    def start(self, relative_file: str, validator: Optional[str]) -> None:
+        """Records that a file is being downloaded.
+
+        :param relative_file: the path of the file relative to the data directory
+        :param validator: the ETag of the remote file, used to check whether the partial content can be resumed
+        """
+        self._append({"file": relative_file, "state": "in-flight", "validator": validator})
+
+    def complete(self, relative_file: str) -> None:
+        """Records that a file was completely downloaded.
+
+        :param relative_file: the path of the file relative to the data directory
+        """
+        self._append({"file": relative_file, "state": "completed"})
+
+    def clear(self) -> None:
+        """Clears the journal and deletes the underlying file."""
+        with self._lock:
+            self._entries.clear()
+            self._has_header = False
+            if self._file.is_file():
+                self._file.unlink()
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        """Appends an entry to the journal.
+
+        :param entry: the entry to append
+        """
+        with self._lock:
+            self._entries[entry["file"]] = entry
+
+            self._file.parent.mkdir(parents=True, exist_ok=True)
+
+            # The journal of a download of other files is replaced by the journal of this download
+            if not self._has_header:
+                with self._file.open("w", encoding="utf-8") as file:
+                    file.write(json.dumps({"scope": self._scope}) + "\n")
+                self._has_header = True
+
+            with self._file.open("a", encoding="utf-8") as file:
+                file.write(json.dumps(entry) + "\n")
@@ -0,0 +1,353 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import atexit
+import bisect
+import hashlib
+import json
+import os
+import threading
+import uuid
+from io import BytesIO
+from pathlib import Path
+from time import sleep
+from typing import Any, BinaryIO, Dict, List, Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+class HTTPCassette:
+    """An HTTPCassette contains recorded HTTP interactions.
+
+    The interactions are stored in a JSON file, response bodies are stored next to it in a <file>.bodies directory.
+    Bodies are stored by hash, so identical responses (like repeatedly polled states) are only stored once.
+
+    An interaction is added when its response headers arrive and completed when its body has been read,
+    so interactions keep the order in which their requests were sent even if their bodies are streamed.
+    """
+
+    def __init__(self, file: Path) -> None:
+        """Creates a new HTTPCassette instance, loading the interactions in the file if it exists.
+
+        :param file: the path to the cassette file
+        """
+        self._file = file
+        self._bodies_directory = file.parent / f"{file.name}.bodies"
+        self._lock = threading.Lock()
+
+        self._interactions: List[Dict[str, Any]] = []
+        if file.is_file():
+            self._interactions = json.loads(file.read_text(encoding="utf-8"))["interactions"]
+
+        # The request key -> indices of the completed interactions with that key, in the order they were recorded
+        # Looking up a request by its key keeps replaying a long session linear in the amount of requests
+        self._completed_interactions: Dict[str, List[int]] = {}
+        for index, interaction in enumerate(self._interactions):
+            if interaction["response"]["body"] is not None:
+                self._completed_interactions.setdefault(interaction["request"]["key"], []).append(index)
+
+        # The request key -> index of the next interaction to replay for it
+        self._replay_positions: Dict[str, int] = {}
+
+    def start_recording(self, request: requests.PreparedRequest, response: requests.Response) -> int:
+        """Adds an interaction of which the body still has to be read.
+
+        :param request: the request that was sent
+        :param response: the response of which the headers were received
+        :return: the index of the interaction, which must be passed to finish_recording() once the body is read
+        """
+        with self._lock:
+            self._interactions.append({
+                "request": {
+                    "method": request.method,
+                    "url": request.url,
+                    "key": self._get_key(request)
+                },
+                "response": {
+                    "status": response.status_code,
+                    "reason": response.reason,
+                    "headers": dict(response.headers),
+                    "body": None
+                },
+                "elapsed": response.elapsed.total_seconds()
+            })
+
+            return len(self._interactions) - 1
+
+    def create_body_file(self) -> Path:
+        """Returns the path to a new temporary file to write a response body to while it is being read.
+
+        :return: the path to a file in the bodies directory which does not exist yet
+        """
+        self._bodies_directory.mkdir(parents=True, exist_ok=True)
+        return self._bodies_directory / f"{uuid.uuid4().hex}.tmp"
+
+    def finish_recording(self, index: int, body_file: Path, body_hash: str) -> None:
+        """Completes an interaction after its body has been read.
+
+        :param index: the index of the interaction, as returned by start_recording()
+        :param body_file: the temporary file containing the body
+        :param body_hash: the SHA-256 hash of the body
+        """
+        target_file = self._bodies_directory / body_hash
+        if target_file.is_file():
+            body_file.unlink()
+        else:
+            os.replace(body_file, target_file)
+
+        with self._lock:
+            interaction = self._interactions[index]
+            interaction["response"]["body"] = body_hash
+
+            # Bodies may be read in a different order than their requests were sent
+            bisect.insort(self._completed_interactions.setdefault(interaction["request"]["key"], []), index)
+
+    def replay(self, request: requests.PreparedRequest) -> Optional[Dict[str, Any]]:
+        """Returns the recorded interaction to replay for a request.
+
+        Interactions with the same request are replayed in the order they were recorded.
+        Once all of them are replayed, the last one is replayed again, so polling loops always finish.
+
+        :param request: the request to find the recorded interaction of
+        :return: the recorded interaction, or None if the request was never recorded
+        """
+        key = self._get_key(request)
+
+        with self._lock:
+            matches = self._completed_interactions.get(key, [])
+            if len(matches) == 0:
+                return None
+
+            position = self._replay_positions.get(key, 0)
+            self._replay_positions[key] = position + 1
+
+            return self._interactions[matches[min(position, len(matches) - 1)]]
+
+    def read_body(self, body_hash: str) -> bytes:
+        """Reads a recorded response body.
+
+        :param body_hash: the hash of the body, as stored in the recorded interaction
+        :return: the content of the body
+        """
+        return (self._bodies_directory / body_hash).read_bytes()
+
+    def save(self) -> None:
+        """Saves the interactions to the cassette file.
+
+        Interactions of which the body was never read completely, like interrupted downloads, are left out.
+        """
+        with self._lock:
+            interactions = [interaction for interaction in self._interactions
+                            if interaction["response"]["body"] is not None]
+
+            self._file.parent.mkdir(parents=True, exist_ok=True)
+            with self._file.open("w+", encoding="utf-8") as file:
+                file.write(json.dumps({"interactions": interactions}, indent=4) + "\n")
+
+    def _get_key(self, request: requests.PreparedRequest) -> str:
+        """Returns the key which identifies a request in the cassette.
+
+        Most headers are not part of the key, as they contain values that differ between runs like authentication hashes.
+        The Range and If-Range headers are, because they select which part of the resource is returned.
+
+        :param request: the request to get the key of
+        :return: the key of the request
+        """
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        key = f"{request.method} {request.url} {hashlib.sha256(body).hexdigest()}"
+
+        for header in ["Range", "If-Range"]:
+            if header in request.headers:
+                key += f" {header}={request.headers[header]}"
+
+        return key
+
+
+class RecordingAdapter(HTTPAdapter):
+    """An HTTPAdapter which records all interactions in a cassette."""
+
+    def __init__(self, cassette: HTTPCassette, **kwargs) -> None:
+        """Creates a new RecordingAdapter instance.
+
+        :param cassette: the cassette to record the interactions in
+        :param kwargs: the kwargs that are passed on to the HTTPAdapter constructor
+        """
+        super().__init__(**kwargs)
+        self._cassette = cassette
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        response = super().send(request, **kwargs)
+
+        # The body is recorded while the caller reads it, so large streamed downloads are never held in memory
+        index = self._cassette.start_recording(request, response)
+        response.raw = _RecordingStream(response.raw, self._cassette, index, request.method)
+
+        return response
+
+
+class _RecordingStream:
+    """A file-like object which writes the decoded body of a response to a cassette while it is being read."""
+
+    def __init__(self, raw: Any, cassette: HTTPCassette, index: int, method: str) -> None:
+        self._raw = raw
+        self._cassette = cassette
+        self._index = index
+        self._method = method
+
+        self._body_file = cassette.create_body_file()
+        self._body: Optional[BinaryIO] = self._body_file.open("wb")
+        self._body_hash = hashlib.sha256()
+        self._body_size = 0
+
+        # Bodies are always read decoded, callers may set this like they do on the original stream
+        self.decode_content = True
+
+    def read(self, amt: Optional[int] = None, **kwargs) -> bytes:
+        data = self._raw.read(amt if amt is None or amt >= 0 else None, decode_content=True)
+
+        if self._body is not None:
+            if len(data) > 0:
+                self._body.write(data)
+                self._body_hash.update(data)
+                self._body_size += len(data)
+
+            if len(data) == 0 or amt is None or amt < 0:
+                self._finish(True)
+
+        return data
+
+    def close(self) -> None:
+        # A body which was closed before it was read completely is only recorded if there was nothing to read
+        content_length = self._raw.headers.get("Content-Length", None) if hasattr(self._raw, "headers") else None
+        self._finish(self._method == "HEAD" or (content_length == "0" and self._body_size == 0))
+
+        self._raw.close()
+
+    def release_conn(self) -> None:
+        if hasattr(self._raw, "release_conn"):
+            self._raw.release_conn()
+
+    def _finish(self, complete: bool) -> None:
+        if self._body is None:
+            return
+
+        self._body.close()
+        self._body = None
+
+        if complete:
+            self._cassette.finish_recording(self._index, self._body_file, self._body_hash.hexdigest())
+        else:
+            self._body_file.unlink()
+
+
+class _ThrottledStream:
+    """A file-like object which reads from a buffer at a limited speed."""
+
+    def __init__(self, content: bytes, bandwidth: Optional[float]) -> None:
+        self._buffer = BytesIO(content)
+        self._bandwidth = bandwidth
+
+    def read(self, size: int = -1, **kwargs) -> bytes:
+        data = self._buffer.read(size)
+        if self._bandwidth is not None and len(data) > 0:
+            sleep(len(data) / self._bandwidth)
+        return data
+
+    def close(self) -> None:
+        self._buffer.close()
+
+    def release_conn(self) -> None:
+        pass
+
+
+class ReplayAdapter(BaseAdapter):
+    """An adapter which replays the interactions of a cassette instead of sending requests."""
+
+    def __init__(self, cassette: HTTPCassette, latency: Optional[float], bandwidth: Optional[float]) -> None:
+        """Creates a new ReplayAdapter instance.
+
+        :param cassette: the cassette to replay interactions from
+        :param latency: the amount of seconds to wait before returning a response, or None to use no latency
+        :param bandwidth: the amount of bytes per second response bodies are read at, or None to not limit it
+        """
+        super().__init__()
+        self._cassette = cassette
+        self._latency = latency
+        self._bandwidth = bandwidth
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        interaction = self._cassette.replay(request)
+        if interaction is None:
+            raise requests.exceptions.ConnectionError(f"No recorded response for {request.method} {request.url}",
+                                                      request=request)
+
+        if self._latency is not None:
+            sleep(self._latency)
+
+        recorded_response = interaction["response"]
+
+        response = requests.Response()
+        response.status_code = recorded_response["status"]
+        response.reason = recorded_response["reason"]
+        response.headers = CaseInsensitiveDict(recorded_response["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _ThrottledStream(self._cassette.read_body(recorded_response["body"]), self._bandwidth)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+
+        # The recorded body is stored decoded, so it must not be decoded again
+        if "Content-Encoding" in response.headers:
+            response.headers.pop("Content-Encoding")
+            response.headers.pop("Content-Length", None)
+
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+# The cassettes in use, so all sessions of a process record to and replay from the same cassette
+_cassettes: Dict[Path, HTTPCassette] = {}
+
+
+def create_cassette_adapter(mode: str, file: Path, latency: Optional[float], bandwidth: Optional[float],
+                            **kwargs) -> BaseAdapter:
+    """Creates the adapter which records to or replays from a cassette.
+
+    :param mode: "record" to record all interactions, "replay" to replay them
+    :param file: the path to the cassette file
+    :param latency: the simulated latency in seconds when replaying
+    :param bandwidth: the simulated bandwidth in bytes per second when replaying
+    :param kwargs: the kwargs that are passed on to the HTTPAdapter constructor when recording
+    :return: the adapter to mount on sessions
+    """
+    cassette = _cassettes.get(file, None)
+    if cassette is None:
+        cassette = HTTPCassette(file)
+        _cassettes[file] = cassette
+
+        if mode == "record":
+            atexit.register(cassette.save)
+
+    if mode == "record":
+        return RecordingAdapter(cassette, **kwargs)
+
+    return ReplayAdapter(cassette, latency, bandwidth)
@@ -12,21 +12,49 @@
 # limitations under the License.
 
 import json
+import threading
+from time import perf_counter, time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from lean.components.config.cli_config_manager import CLIConfigManager
 from lean.components.util.logger import Logger
+from lean.components.util.http_cassette import create_cassette_adapter
+from lean.components.util.http_tracer import HTTPTracer
+from lean.constants import (DEFAULT_HTTP_KEEP_ALIVE, DEFAULT_HTTP_POOL_SIZE, HTTP_CASSETTE_MODE, HTTP_CASSETTE_PATH,
+                            HTTP_REPLAY_BANDWIDTH, HTTP_REPLAY_LATENCY)
+from lean.models.options import Option
 
 
 class HTTPClient:
-    """The HTTPClient class is a lightweight wrapper around the requests library with additional logging."""
+    """The HTTPClient class is a lightweight wrapper around the requests library with additional logging.
 
-    def __init__(self, logger: Logger) -> None:
+    Requests are sent through one requests.Session per host, which keeps a pool of keep-alive connections.
+    This makes it possible to reuse TCP and TLS connections across requests and across threads.
+    """
+
+    def __init__(self, logger: Logger, cli_config_manager: CLIConfigManager, http_tracer: HTTPTracer) -> None:
         """Creates a new HTTPClient instance.
 
         :param logger: the logger to log debug messages with
+        :param cli_config_manager: the CLIConfigManager instance containing the connection pool options
+        :param http_tracer: the HTTPTracer instance to record the timing of requests in
         """
         self._logger = logger
+        self._cli_config_manager = cli_config_manager
+        self._http_tracer = http_tracer
+
+        # The scheme://host -> (session, time of last use) pool of sessions
+        self._sessions: Dict[str, Tuple[requests.Session, float]] = {}
+        self._sessions_lock = threading.Lock()
+
+        self._pool_size: Optional[int] = None
+        self._keep_alive: Optional[float] = None
+        self._proxies: Optional[Dict[str, str]] = None
 
     def get(self, url: str, **kwargs) -> requests.Response:
         """A wrapper around requests.get().
@@ -37,13 +65,7 @@ class HTTPClient:
         :param kwargs: any kwargs to pass on to requests.get()
         :return: the response of the request
         """
-        self._log_request("GET", url, **kwargs)
-
-        raise_for_status = kwargs.pop("raise_for_status", True)
-        response = requests.get(url, **kwargs)
-
-        self._check_response(response, raise_for_status)
-        return response
+        return self.request("GET", url, **kwargs)
 
     def post(self, url: str, **kwargs) -> requests.Response:
         """A wrapper around requests.post().
@@ -54,18 +76,13 @@ class HTTPClient:
         :param kwargs: any kwargs to pass on to requests.post()
         :return: the response of the request
         """
-        self._log_request("POST", url, **kwargs)
-
-        raise_for_status = kwargs.pop("raise_for_status", True)
-        response = requests.post(url, **kwargs)
-
-        self._check_response(response, raise_for_status)
-        return response
+        return self.request("POST", url, **kwargs)
 
     def request(self, method: str, url: str, **kwargs) -> requests.Response:
         """A wrapper around requests.request().
 
         An error is raised if the response is unsuccessful unless kwargs["raise_for_status"] == False.
+        kwargs["retry_count"] can be set to the amount of times the request was retried, which is used for tracing.
 
         :param method: the request method
         :param url: the request url
@@ -75,11 +92,40 @@ class HTTPClient:
         self._log_request(method, url, **kwargs)
 
         raise_for_status = kwargs.pop("raise_for_status", True)
-        response = requests.request(method, url, **kwargs)
+        retry_count = kwargs.pop("retry_count", 0)
+
+        # Proxies passed to a request take precedence over the environment, proxies set on a session don't
+        if self._get_proxies() is not None:
+            kwargs.setdefault("proxies", self._get_proxies())
+
+        start_time = perf_counter()
+        try:
+            response = self._get_session(url).request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self._http_tracer.record(method, url, None, 0, None, None, perf_counter() - start_time, retry_count)
+            raise
+
+        if self._http_tracer.enabled:
+            if kwargs.get("stream", False):
+                # Streamed bodies are read by the caller, so they are traced once they are consumed or closed
+                response.raw = _TracedStream(response.raw,
+                                             lambda bytes_in: self._trace_response(response,
+                                                                                   perf_counter() - start_time,
+                                                                                   retry_count,
+                                                                                   bytes_in))
+            else:
+                self._trace_response(response, perf_counter() - start_time, retry_count, len(response.content))
 
         self._check_response(response, raise_for_status)
         return response
 
+    def close(self) -> None:
+        """Closes all pooled connections."""
+        with self._sessions_lock:
+            for session, _ in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
     def log_unsuccessful_response(self, response: requests.Response) -> None:
         """Logs an unsuccessful response's status code and body.
 
@@ -88,6 +134,110 @@ class HTTPClient:
         body = f"body:\n{response.text}" if response.text != "" else "empty body"
         self._logger.debug(f"Request was not successful, status code {response.status_code}, {body}")
 
+    def _get_session(self, url: str) -> requests.Session:
+        """Returns the pooled session to use for requests to the host of a url.
+
+        Sessions that have been idle for longer than the keep-alive time are replaced,
+        because the server has most likely closed their connections by then.
+
+        :param url: the url to get the session for
+        :return: the session to send requests to the url's host with
+        """
+        parsed_url = urlparse(url)
+        key = f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+        with self._sessions_lock:
+            now = time()
+
+            if key in self._sessions:
+                session, last_used = self._sessions[key]
+                if now - last_used > self._get_keep_alive():
+                    session.close()
+                    session = self._create_session()
+            else:
+                session = self._create_session()
+
+            self._sessions[key] = (session, now)
+            return session
+
+    def _create_session(self) -> requests.Session:
+        """Creates a new session with a connection pool of the configured size.
+
+        :return: the created session
+        """
+        session = requests.Session()
+
+        # Multiple threads send requests to the same host at the same time when downloading data
+        # The pool is not blocking, so additional connections are opened (and discarded) when all are in use
+        # When a cassette is used, the adapter records or replays all interactions instead, see HTTP_CASSETTE_MODE
+        if HTTP_CASSETTE_MODE is not None:
+            adapter = create_cassette_adapter(HTTP_CASSETTE_MODE,
+                                              Path(HTTP_CASSETTE_PATH),
+                                              HTTP_REPLAY_LATENCY,
+                                              HTTP_REPLAY_BANDWIDTH,
+                                              pool_connections=1,
+                                              pool_maxsize=self._get_pool_size())
+        else:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._get_pool_size())
+
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        if self._get_keep_alive() <= 0:
+            session.headers["Connection"] = "close"
+
+        return session
+
+    def _get_pool_size(self) -> int:
+        """Returns the maximum amount of connections kept open per host.
+
+        :return: the value of the http-pool-size option, or DEFAULT_HTTP_POOL_SIZE if it is not set or invalid
+        """
+        if self._pool_size is None:
+            self._pool_size = max(1, int(self._get_numeric_option(self._cli_config_manager.http_pool_size,
+                                                                  DEFAULT_HTTP_POOL_SIZE)))
+
+        return self._pool_size
+
+    def _get_keep_alive(self) -> float:
+        """Returns the amount of seconds idle connections are kept open.
+
+        :return: the value of the http-keep-alive option, or DEFAULT_HTTP_KEEP_ALIVE if it is not set or invalid
+        """
+        if self._keep_alive is None:
+            self._keep_alive = self._get_numeric_option(self._cli_config_manager.http_keep_alive,
+                                                        DEFAULT_HTTP_KEEP_ALIVE)
+
+        return self._keep_alive
+
+    def _get_proxies(self) -> Optional[Dict[str, str]]:
+        """Returns the proxies to send requests through.
+
+        :return: the proxies dict to pass to requests, or None if the http-proxy option is not set
+        """
+        if self._proxies is None:
+            proxy = self._cli_config_manager.http_proxy.get_value()
+            self._proxies = {"http": proxy, "https": proxy} if proxy is not None else {}
+
+        return self._proxies if len(self._proxies) > 0 else None
+
+    def _get_numeric_option(self, option: Option, default: float) -> float:
+        """Returns the numeric value of a CLI option.
+
+        :param option: the option to get the value of
+        :param default: the value to return if the option is not set or not numeric
+        :return: the value of the option as a float
+        """
+        value = option.get_value()
+        if value is None:
+            return default
+
+        try:
+            return float(value)
+        except ValueError:
+            self._logger.debug(f"Ignoring invalid value '{value}' of the '{option.key}' option")
+            return default
+
     def _log_request(self, method: str, url: str, **kwargs) -> None:
         """Logs a request.
 
@@ -95,6 +245,10 @@ class HTTPClient:
         :param url: the request url
         :param kwargs: any kwargs passed to a request.* method
         """
+        # Formatting the payload is expensive for large requests, so we only do it when it is actually logged
+        if not self._logger.debug_logging_enabled:
+            return
+
         message = f"--> {method.upper()} {url}"
 
         data = next((kwargs.get(key) for key in ["json", "data", "params"] if key in kwargs), None)
@@ -103,6 +257,29 @@ class HTTPClient:
 
         self._logger.debug(message)
 
+    def _trace_response(self,
+                        response: requests.Response,
+                        total_time: float,
+                        retry_count: int,
+                        bytes_in: int) -> None:
+        """Records a response in the HTTPTracer.
+
+        :param response: the response to record
+        :param total_time: the amount of seconds the request took, including reading the body
+        :param retry_count: the amount of times the request was retried before this attempt
+        :param bytes_in: the amount of bytes of the response body that were read
+        """
+        body = response.request.body or b""
+
+        self._http_tracer.record(response.request.method,
+                                 response.url,
+                                 response.status_code,
+                                 len(body),
+                                 bytes_in,
+                                 response.elapsed.total_seconds(),
+                                 total_time,
+                                 retry_count)
+
     def _check_response(self, response: requests.Response, raise_for_status: bool) -> None:
         """Checks a response, logging a debug message if it wasn't successful.
 
@@ -114,3 +291,57 @@ class HTTPClient:
 
         if raise_for_status:
             response.raise_for_status()
+
+
+class _TracedStream:
+    """A file-like object which counts the bytes read from a response body and reports them once it is consumed."""
+
+    def __init__(self, raw: Any, on_finished: Callable[[int], None]) -> None:
+        """Creates a new _TracedStream instance.
+
+        :param raw: the raw stream of the response
+        :param on_finished: the function to call with the amount of read bytes when the body is consumed or closed
+        """
+        self._raw = raw
+        self._on_finished = on_finished
+        self._bytes_read = 0
+        self._finished = False
+
+    @property
+    def decode_content(self) -> bool:
+        return self._raw.decode_content
+
+    @decode_content.setter
+    def decode_content(self, value: bool) -> None:
+        self._raw.decode_content = value
+
+    def read(self, amt: Optional[int] = None, **kwargs) -> bytes:
+        data = self._raw.read(amt, **kwargs)
+        self._bytes_read += len(data)
+
+        if len(data) == 0 or amt is None:
+            self._finish()
+
+        return data
+
+    def stream(self, amt: int = 2 ** 16, decode_content: Optional[bool] = None) -> Iterator[bytes]:
+        while True:
+            data = self.read(amt, decode_content=decode_content)
+            if len(data) == 0:
+                return
+
+            yield data
+
+    def close(self) -> None:
+        self._finish()
+        self._raw.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+    def _finish(self) -> None:
+        if self._finished:
+            return
+
+        self._finished = True
+        self._on_finished(self._bytes_read)
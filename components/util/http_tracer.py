@@ -0,0 +1,172 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import math
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, TextIO
+from urllib.parse import urlparse
+
+from lean.constants import API_BASE_URL, HTTP_TRACE_RING_SIZE
+
+
+class HTTPTracer:
+    """The HTTPTracer class records the timing and size of every HTTP request sent by the HTTPClient."""
+
+    def __init__(self) -> None:
+        """Creates a new HTTPTracer instance."""
+        self._lock = threading.Lock()
+        self._records: Deque[Dict[str, Any]] = deque(maxlen=HTTP_TRACE_RING_SIZE)
+        self._output_file: Optional[Path] = None
+        self._output_handle: Optional[TextIO] = None
+
+        self.enabled = False
+
+    def enable(self, output_file: Optional[Path] = None) -> None:
+        """Starts recording requests.
+
+        :param output_file: the path to the JSONL file to append all records to, or None to only keep them in memory
+        """
+        self.enabled = True
+        self._output_file = output_file
+
+        # The file is opened once, opening it for every request would slow down the requests that are traced
+        if output_file is not None:
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            self._output_handle = output_file.open("a", encoding="utf-8")
+
+    def record(self,
+               method: str,
+               url: str,
+               status: Optional[int],
+               bytes_out: int,
+               bytes_in: Optional[int],
+               time_to_first_byte: Optional[float],
+               total_time: float,
+               retry_count: int) -> None:
+        """Records a request.
+
+        :param method: the request method
+        :param url: the request url
+        :param status: the status code of the response, or None if no response was received
+        :param bytes_out: the size of the request body in bytes
+        :param bytes_in: the size of the response body in bytes, or None if it is unknown
+        :param time_to_first_byte: the amount of seconds until the response headers were received
+        :param total_time: the amount of seconds the request took
+        :param retry_count: the amount of times the request was retried before this attempt
+        """
+        if not self.enabled:
+            return
+
+        record = {
+            "time": datetime.now(tz=timezone.utc).isoformat(),
+            "method": method.upper(),
+            "endpoint": self._get_endpoint(url),
+            "status": status,
+            "bytes_out": bytes_out,
+            "bytes_in": bytes_in,
+            "ttfb_ms": time_to_first_byte * 1000 if time_to_first_byte is not None else None,
+            "total_ms": total_time * 1000,
+            "retries": retry_count
+        }
+
+        with self._lock:
+            self._records.append(record)
+
+            if self._output_handle is not None:
+                self._output_handle.write(json.dumps(record) + "\n")
+
+    def report(self, logger: Any) -> None:
+        """Logs a table containing the latency percentiles and transferred bytes per endpoint.
+
+        Every attempt is recorded separately, so the number of retries is the number of attempts which were retries.
+        Requests recorded after the report are no longer saved to the output file.
+
+        :param logger: the logger to log the table with
+        """
+        # rich is only imported when a report is requested, main.py checks whether tracing is enabled on every run
+        from rich import box
+        from rich.table import Table
+
+        with self._lock:
+            records = list(self._records)
+
+            if self._output_handle is not None:
+                self._output_handle.close()
+                self._output_handle = None
+
+        records_by_endpoint: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            records_by_endpoint.setdefault(f"{record['method']} {record['endpoint']}", []).append(record)
+
+        table = Table(box=box.SQUARE)
+        for column in ["Endpoint", "Requests", "Errors", "Retries", "p50 (ms)", "p95 (ms)", "p99 (ms)",
+                       "TTFB p50 (ms)", "Bytes in", "Bytes out"]:
+            table.add_column(column, overflow="fold")
+
+        endpoints = sorted(records_by_endpoint.keys(),
+                           key=lambda e: sum(r["total_ms"] for r in records_by_endpoint[e]),
+                           reverse=True)
+
+        for endpoint in endpoints:
+            endpoint_records = records_by_endpoint[endpoint]
+            total_times = sorted(r["total_ms"] for r in endpoint_records)
+            ttfb_times = sorted(r["ttfb_ms"] for r in endpoint_records if r["ttfb_ms"] is not None)
+
+            table.add_row(endpoint,
+                          str(len(endpoint_records)),
+                          str(sum(1 for r in endpoint_records if r["status"] is None or r["status"] >= 400)),
+                          str(sum(1 for r in endpoint_records if r["retries"] > 0)),
+                          f"{self._get_percentile(total_times, 50):,.1f}",
+                          f"{self._get_percentile(total_times, 95):,.1f}",
+                          f"{self._get_percentile(total_times, 99):,.1f}",
+                          f"{self._get_percentile(ttfb_times, 50):,.1f}",
+                          f"{sum(r['bytes_in'] or 0 for r in endpoint_records):,}",
+                          f"{sum(r['bytes_out'] for r in endpoint_records):,}")
+
+        logger.info(table)
+        logger.info(f"{len(records)} HTTP requests took {sum(r['total_ms'] for r in records):,.1f} ms in total")
+
+        if self._output_file is not None:
+            logger.info(f"Saved all HTTP requests to '{self._output_file}'")
+
+    def _get_endpoint(self, url: str) -> str:
+        """Returns the name of the endpoint a url belongs to.
+
+        Requests to the QuantConnect API are grouped by API endpoint.
+        Other requests, like downloads of data files through presigned urls, are grouped by host.
+
+        :param url: the request url
+        :return: the name of the endpoint of the url
+        """
+        if url.startswith(API_BASE_URL):
+            return url[len(API_BASE_URL):].split("?")[0]
+
+        return urlparse(url).netloc
+
+    def _get_percentile(self, sorted_values: List[float], percentile: int) -> float:
+        """Returns a percentile of a list of values using the nearest-rank method.
+
+        :param sorted_values: the values to get the percentile of, in ascending order
+        :param percentile: the percentile to get
+        :return: the value at the given percentile, or 0 if there are no values
+        """
+        if len(sorted_values) == 0:
+            return 0.0
+
+        rank = max(1, math.ceil(percentile / 100 * len(sorted_values)))
+        return sorted_values[rank - 1]
@@ -0,0 +1,362 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import gzip
+import shutil
+import struct
+import threading
+from pathlib import Path
+from time import sleep, time
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional
+
+from lean.constants import LOG_SEGMENT_SIZE, LOG_INDEX_INTERVAL, LOG_SEGMENT_REMOVE_ATTEMPTS
+
+
+class _IndexEntry(NamedTuple):
+    """An entry in the index of a log store, pointing to the start of a line."""
+    segment: int
+    line: int
+    offset: int
+    timestamp: float
+
+
+# The entries in the index file are stored as (segment, line, offset in the uncompressed segment, capture time)
+_index_entry_struct = struct.Struct("<IQQd")
+
+_index_file_name = "index"
+_complete_file_name = "complete"
+
+
+def _get_segment_file(directory: Path, segment: int, compressed: bool) -> Path:
+    """Returns the path to a segment file of a log store.
+
+    :param directory: the directory of the log store
+    :param segment: the number of the segment
+    :param compressed: True to get the path to the compressed segment, False to get the path to the plain segment
+    :return: the path to the segment file
+    """
+    return directory / (f"{segment:06d}.log.gz" if compressed else f"{segment:06d}.log")
+
+
+class LogStoreWriter:
+    """The LogStoreWriter class stores the output of a container in a rotating, compressed log store.
+
+    A log store is a directory containing numbered segments, an index and a marker which is created when the
+    output is complete. The segment being written is a plain file. Once it reaches LOG_SEGMENT_SIZE bytes,
+    a new segment is started and the full segment is gzip-compressed on a background thread.
+
+    The index is a sparse list of line numbers, offsets and capture times. An entry is added at the start of every
+    segment and at least every LOG_INDEX_INTERVAL lines or every second, whichever comes first. This makes it possible
+    to find lines by number or capture time without reading the segments before them.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """Creates a new LogStoreWriter instance, removing any existing log store in the given directory.
+
+        :param directory: the directory to store the log in
+        """
+        self._directory = directory
+
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True)
+
+        self._index_file = (directory / _index_file_name).open("wb")
+        self._compression_threads: List[threading.Thread] = []
+
+        # The segments of which the plain file could not be removed after compressing them
+        self._lock = threading.Lock()
+        self._undeleted_segments: List[int] = []
+
+        self._segment = 0
+        self._segment_file: Optional[BinaryIO] = None
+        self._segment_size = 0
+
+        self._lines = 0
+        self._last_index_lines = 0
+        self._last_index_time = 0.0
+
+        self._start_segment()
+
+    def write(self, block: bytes) -> None:
+        """Appends a block of complete lines to the log.
+
+        :param block: the lines to append, including their trailing newlines
+        """
+        if self._segment_size >= LOG_SEGMENT_SIZE:
+            self._rotate_segment()
+
+        now = time()
+        if self._lines - self._last_index_lines >= LOG_INDEX_INTERVAL or now - self._last_index_time >= 1:
+            self._add_index_entry(now)
+
+        self._segment_file.write(block)
+        self._segment_size += len(block)
+        self._lines += block.count(b"\n")
+
+    def flush(self) -> None:
+        """Flushes the log so readers can see everything that has been written so far."""
+        self._segment_file.flush()
+        self._index_file.flush()
+
+    def close(self) -> None:
+        """Closes the log, compresses the last segment and marks the log as complete."""
+        self._segment_file.close()
+        self._index_file.close()
+
+        # Readers following the log keep the last segment open until the log is complete, so this doesn't wait for them
+        self._compress_segment(self._segment, 1)
+        for thread in self._compression_threads:
+            thread.join()
+
+        # Readers may have closed the plain files in the meantime, otherwise they are left next to the compressed ones
+        for segment in self._undeleted_segments:
+            self._remove_plain_segment(segment, 1)
+
+        (self._directory / _complete_file_name).write_text(str(self._lines), encoding="utf-8")
+
+    def _start_segment(self) -> None:
+        """Starts a new segment and adds an index entry pointing to its start."""
+        self._segment += 1
+        self._segment_file = _get_segment_file(self._directory, self._segment, False).open("wb")
+        self._segment_size = 0
+        self._add_index_entry(time())
+
+    def _rotate_segment(self) -> None:
+        """Closes the current segment, starts a new one and compresses the closed segment in the background."""
+        self._segment_file.close()
+
+        thread = threading.Thread(target=self._compress_segment, args=[self._segment, LOG_SEGMENT_REMOVE_ATTEMPTS])
+        thread.daemon = True
+        thread.start()
+        self._compression_threads.append(thread)
+
+        self._start_segment()
+
+    def _add_index_entry(self, timestamp: float) -> None:
+        """Adds an index entry pointing to the current position in the current segment.
+
+        :param timestamp: the capture time of the line at the current position
+        """
+        self._index_file.write(_index_entry_struct.pack(self._segment, self._lines, self._segment_size, timestamp))
+        self._last_index_lines = self._lines
+        self._last_index_time = timestamp
+
+    def _compress_segment(self, segment: int, remove_attempts: int) -> None:
+        """Compresses a closed segment.
+
+        The compressed file is written under a temporary name first, so readers only see complete compressed files.
+        The plain file is removed afterwards, readers which still have it open can keep reading it.
+
+        :param segment: the number of the segment to compress
+        :param remove_attempts: the amount of times to try removing the plain file
+        """
+        plain_file = _get_segment_file(self._directory, segment, False)
+        compressed_file = _get_segment_file(self._directory, segment, True)
+        temporary_file = compressed_file.with_name(compressed_file.name + ".tmp")
+
+        with plain_file.open("rb") as source, gzip.open(temporary_file, "wb") as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+
+        temporary_file.replace(compressed_file)
+
+        if not self._remove_plain_segment(segment, remove_attempts):
+            with self._lock:
+                self._undeleted_segments.append(segment)
+
+    def _remove_plain_segment(self, segment: int, attempts: int) -> bool:
+        """Removes the plain file of a segment which has been compressed.
+
+        On Windows a file can't be removed while a reader has it open, in which case removing it is retried.
+        Readers prefer the plain file, which has the same content as the compressed one, so leaving it is harmless.
+
+        :param segment: the number of the segment to remove the plain file of
+        :param attempts: the amount of times to try removing the file, waiting a second between attempts
+        :return: True if the plain file has been removed, False if it is still in use
+        """
+        plain_file = _get_segment_file(self._directory, segment, False)
+
+        for attempt in range(attempts):
+            if attempt > 0:
+                sleep(1)
+
+            try:
+                plain_file.unlink()
+                return True
+            except FileNotFoundError:
+                return True
+            except OSError:
+                continue
+
+        return False
+
+
+class LogStoreReader:
+    """The LogStoreReader class reads lines from a log store created by a LogStoreWriter.
+
+    Lines are streamed from the segments, so logs of any size can be read without loading them into memory.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """Creates a new LogStoreReader instance.
+
+        :param directory: the directory of the log store
+        """
+        self._directory = directory
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        """Returns whether a directory contains a log store.
+
+        :param directory: the directory to check
+        :return: True if the directory contains a log store, False if not
+        """
+        return (directory / _index_file_name).is_file()
+
+    def is_complete(self) -> bool:
+        """Returns whether the writer of the log store has finished.
+
+        :return: True if no more lines will be added to the log, False if not
+        """
+        return (self._directory / _complete_file_name).is_file()
+
+    def read_lines(self,
+                   since: Optional[float] = None,
+                   tail: Optional[int] = None,
+                   follow: bool = False) -> Iterator[bytes]:
+        """Reads lines from the log store.
+
+        :param since: the capture time lines must be logged after, or None to start at the first line
+        :param tail: the amount of lines at the end of the log to start at, or None to start at the first line
+        :param follow: True to keep waiting for new lines until the log is complete, False to stop at the current end
+        :return: an iterator yielding the lines, including their trailing newlines
+        """
+        index = self._read_index()
+        if len(index) == 0:
+            return
+
+        start = index[0]
+        skip_lines = 0
+
+        if since is not None:
+            position = bisect.bisect_left([entry.timestamp for entry in index], since)
+            if position < len(index):
+                start = index[position]
+            else:
+                start, skip_lines = index[-1], self._count_lines_after(index[-1])
+
+        if tail is not None:
+            total_lines = index[-1].line + self._count_lines_after(index[-1])
+            tail_line = max(0, total_lines - tail)
+
+            if tail_line > start.line + skip_lines:
+                position = bisect.bisect_right([entry.line for entry in index], tail_line) - 1
+                start, skip_lines = index[position], tail_line - index[position].line
+
+        for line in self._read_from(start.segment, start.offset, follow):
+            if skip_lines > 0:
+                skip_lines -= 1
+                continue
+
+            yield line
+
+    def _read_index(self) -> List[_IndexEntry]:
+        """Reads all complete entries from the index file.
+
+        :return: the index entries, ordered by line number
+        """
+        data = (self._directory / _index_file_name).read_bytes()
+        data = data[:len(data) - len(data) % _index_entry_struct.size]
+        return [_IndexEntry(*entry) for entry in _index_entry_struct.iter_unpack(data)]
+
+    def _count_lines_after(self, entry: _IndexEntry) -> int:
+        """Counts the lines after an index entry.
+
+        There is always an index entry at the start of a segment, so all these lines are in the entry's segment.
+
+        :param entry: the index entry to count the lines after
+        :return: the amount of complete lines after the index entry
+        """
+        with self._open_segment(entry.segment) as file:
+            file.seek(entry.offset)
+
+            lines = 0
+            while True:
+                data = file.read(1024 * 1024)
+                if len(data) == 0:
+                    return lines
+
+                lines += data.count(b"\n")
+
+    def _read_from(self, segment: int, offset: int, follow: bool) -> Iterator[bytes]:
+        """Reads lines starting at a position in a segment.
+
+        :param segment: the segment to start in
+        :param offset: the offset in the uncompressed segment to start at
+        :param follow: True to keep waiting for new lines until the log is complete, False to stop at the current end
+        :return: an iterator yielding the lines, including their trailing newlines
+        """
+        while True:
+            file = self._open_segment(segment)
+            file.seek(offset)
+
+            with file:
+                partial_line = b""
+                while True:
+                    line = file.readline()
+
+                    if line.endswith(b"\n"):
+                        yield partial_line + line
+                        partial_line = b""
+                        continue
+
+                    partial_line += line
+
+                    # The writer only starts a new segment or completes the log after finishing the current segment,
+                    # so reading once more after seeing either makes sure nothing is missed
+                    if self._segment_exists(segment + 1) or self.is_complete():
+                        remaining = file.read()
+                        for remaining_line in (partial_line + remaining).splitlines(keepends=True):
+                            yield remaining_line
+                        break
+
+                    if not follow:
+                        return
+
+                    sleep(0.25)
+
+            if not self._segment_exists(segment + 1):
+                return
+
+            segment += 1
+            offset = 0
+
+    def _segment_exists(self, segment: int) -> bool:
+        """Returns whether a segment exists.
+
+        :param segment: the number of the segment to check
+        :return: True if the segment exists in plain or compressed form, False if not
+        """
+        return _get_segment_file(self._directory, segment, False).is_file() \
+               or _get_segment_file(self._directory, segment, True).is_file()
+
+    def _open_segment(self, segment: int) -> BinaryIO:
+        """Opens a segment for reading, preferring the plain file while it still exists.
+
+        :param segment: the number of the segment to open
+        :return: a binary file object which returns the uncompressed contents of the segment
+        """
+        try:
+            return _get_segment_file(self._directory, segment, False).open("rb")
+        except FileNotFoundError:
+            return gzip.open(_get_segment_file(self._directory, segment, True), "rb")
@@ -0,0 +1,168 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from pathlib import Path
+from time import time
+from typing import Optional
+
+from lean.components.util.log_store import LogStoreWriter
+from lean.components.util.logger import Logger
+from lean.constants import CONSOLE_LOG_MAX_LINES_PER_SECOND
+
+
+class LineSplitter:
+    """The LineSplitter class splits a stream of bytes into blocks of complete lines.
+
+    Chunks are appended to a single bytearray, which keeps buffering linear when lines are longer than a chunk.
+    Every call to feed() returns all complete lines at once, so the caller handles a block instead of single lines.
+    """
+
+    def __init__(self) -> None:
+        """Creates a new LineSplitter instance."""
+        self._buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> Optional[bytes]:
+        """Adds a chunk to the buffer and takes out all complete lines.
+
+        :param chunk: the chunk of bytes that was received
+        :return: the complete lines, including their trailing newlines, or None if there are no complete lines yet
+        """
+        self._buffer += chunk
+
+        # The buffer never contains a newline before the chunk is added, so only the new data has to be searched
+        end = self._buffer.rfind(b"\n", len(self._buffer) - len(chunk))
+        if end == -1:
+            return None
+
+        with memoryview(self._buffer) as view:
+            block = bytes(view[:end + 1])
+
+        del self._buffer[:end + 1]
+        return block
+
+    def flush(self) -> Optional[bytes]:
+        """Takes out the last line, which is not terminated by a newline.
+
+        :return: the remaining bytes, or None if the buffer is empty
+        """
+        if len(self._buffer) == 0:
+            return None
+
+        block = bytes(self._buffer)
+        self._buffer.clear()
+        return block
+
+
+class LogStreamPrinter:
+    """The LogStreamPrinter class prints the output of a container while keeping up with high-throughput logs.
+
+    If a log directory is given, the full output is captured in a log store in it regardless of what is printed.
+    When stdout is a terminal and the full output is captured, lines are printed through the logger at a limited rate
+    and lines above that rate are counted and summarized, which prevents the terminal from slowing down the container.
+    Otherwise skipped lines would be lost, so blocks of lines are written as-is and flushed periodically.
+    """
+
+    def __init__(self,
+                 logger: Logger,
+                 is_tty: bool,
+                 log_directory: Optional[Path] = None,
+                 prefix: Optional[str] = None) -> None:
+        """Creates a new LogStreamPrinter instance.
+
+        :param logger: the logger to print the output with
+        :param is_tty: whether stdout is a terminal
+        :param log_directory: the directory to capture the full output in, or None if it should not be stored
+        :param prefix: the text to print before every line, or None to print lines as-is
+        """
+        self._logger = logger
+        self._log_directory = log_directory
+        self._prefix = prefix
+        self._lock = threading.Lock()
+
+        self._log_store: Optional[LogStoreWriter] = None
+        if log_directory is not None:
+            self._log_store = LogStoreWriter(log_directory)
+
+        # Lines can only be skipped if the full output is captured in the log store
+        self._rate_limit = is_tty and self._log_store is not None
+
+        self._window_start = time()
+        self._window_lines = 0
+        self._skipped_lines = 0
+
+    def write(self, block: bytes) -> None:
+        """Prints a block of complete lines.
+
+        :param block: the lines to print, including their trailing newlines
+        """
+        with self._lock:
+            if self._log_store is not None:
+                self._log_store.write(block)
+
+            if not self._rate_limit:
+                if self._prefix is not None:
+                    prefix = self._prefix.encode("utf-8")
+                    block = prefix + block[:-1].replace(b"\n", b"\n" + prefix) + b"\n"
+
+                self._logger.write_raw(block)
+                return
+
+            now = time()
+            if now - self._window_start >= 1:
+                self._report_skipped_lines()
+                self._window_start = now
+                self._window_lines = 0
+
+            lines = block.decode("utf-8", errors="replace").splitlines()
+
+            printed_lines = lines[:max(0, CONSOLE_LOG_MAX_LINES_PER_SECOND - self._window_lines)]
+            self._window_lines += len(printed_lines)
+            self._skipped_lines += len(lines) - len(printed_lines)
+
+            if self._prefix is not None:
+                printed_lines = [self._prefix + line for line in printed_lines]
+
+            if len(printed_lines) > 0:
+                self._logger.info("\n".join(printed_lines))
+
+    def flush(self) -> None:
+        """Flushes all output that has been written so far."""
+        with self._lock:
+            if self._log_store is not None:
+                self._log_store.flush()
+
+            if not self._rate_limit:
+                self._logger.flush_raw()
+
+    def close(self) -> None:
+        """Flushes all output and completes the log store."""
+        self.flush()
+
+        with self._lock:
+            self._report_skipped_lines()
+
+            if self._log_store is not None:
+                self._log_store.close()
+                self._log_store = None
+
+    def _report_skipped_lines(self) -> None:
+        """Prints how many lines were not printed since the last report."""
+        if self._skipped_lines == 0:
+            return
+
+        message = f"{self._prefix or ''}{self._skipped_lines:,} lines were not printed to keep up with the output"
+        message += f", the full output is stored in '{self._log_directory}'"
+
+        self._logger.warn(message)
+        self._skipped_lines = 0
@@ -67,6 +67,23 @@ class Logger:
         """
         self._console.print(message, style="red")
 
+    def write_raw(self, data: bytes) -> None:
+        """Writes output as-is, which is much faster than logging it line by line.
+
+        The output is buffered until flush_raw() is called.
+
+        :param data: the bytes to write to stdout
+        """
+        stdout = self._console.file
+        if hasattr(stdout, "buffer"):
+            stdout.buffer.write(data)
+        else:
+            stdout.write(data.decode("utf-8", errors="replace"))
+
+    def flush_raw(self) -> None:
+        """Flushes the output written by write_raw()."""
+        self._console.file.flush()
+
     def progress(self, prefix: str = "", suffix: str = "{task.percentage:0.0f}%") -> Progress:
         """Creates a Progress instance.
 
@@ -0,0 +1,254 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# This module is imported before any other module of the CLI so it can time their imports
+# It must therefore only depend on the standard library at import time
+
+import json
+import sys
+import threading
+from importlib.abc import Loader, MetaPathFinder
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _TimedLoader(Loader):
+    """A Loader which records how long executing a module takes."""
+
+    def __init__(self, profiler: 'StartupProfiler', loader: Loader) -> None:
+        self._profiler = profiler
+        self._loader = loader
+
+    def create_module(self, spec: Any) -> Any:
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: Any) -> None:
+        # Restore the original loader so code inspecting module.__loader__ (like pkg_resources) keeps working
+        module.__loader__ = self._loader
+        if getattr(module, "__spec__", None) is not None:
+            module.__spec__.loader = self._loader
+
+        with self._profiler.measure(module.__name__, "import"):
+            self._loader.exec_module(module)
+
+    def __getattr__(self, name: str) -> Any:
+        # Loaders provide additional optional methods like get_resource_reader(), which we pass through as-is
+        return getattr(self._loader, name)
+
+
+class _TimedFinder(MetaPathFinder):
+    """A MetaPathFinder which wraps the loaders found by the other finders in a _TimedLoader."""
+
+    def __init__(self, profiler: 'StartupProfiler') -> None:
+        self._profiler = profiler
+
+    def find_spec(self, fullname: str, path: Any, target: Any = None) -> Any:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(self._profiler, spec.loader)
+
+            return spec
+
+        return None
+
+
+class StartupProfiler:
+    """The StartupProfiler class measures how long importing modules and creating container components takes."""
+
+    def __init__(self) -> None:
+        """Creates a new StartupProfiler instance."""
+        self.enabled = False
+        self.output_file: Optional[Path] = None
+
+        self._thread_id = threading.get_ident()
+        self._start = perf_counter()
+        self._stack: List[Dict[str, Any]] = []
+        self._measurements: List[Dict[str, Any]] = []
+        self._events: List[Dict[str, Any]] = []
+        self._frames: Dict[str, int] = {}
+
+    def enable(self) -> None:
+        """Starts timing all subsequent imports."""
+        if self.enabled:
+            return
+
+        self.enabled = True
+        self._start = perf_counter()
+        sys.meta_path.insert(0, _TimedFinder(self))
+
+    def profile_container(self, container: Any) -> None:
+        """Starts timing the creation of the components provided by a container.
+
+        Every Factory and Singleton provider is overridden by a provider of the same type which times its creation.
+        The dependencies of the overriding providers are the original providers, so nested creations are timed too.
+
+        :param container: the container to time the providers of
+        """
+        from dependency_injector.providers import Factory, Singleton
+
+        for name, provider in container.providers.items():
+            if type(provider) not in [Factory, Singleton]:
+                continue
+
+            timed_provides = self._create_timed_callable(name, provider.provides)
+            provider.override(type(provider)(timed_provides, *provider.args, **provider.kwargs))
+
+    def measure(self, name: str, category: str) -> '_Measurement':
+        """Returns a context manager which records how long the code inside it takes.
+
+        Only code running on the thread that created the profiler is recorded.
+
+        :param name: the name of the thing being measured
+        :param category: the category of the measurement, like "import" or "provider"
+        :return: a context manager which records the duration of its body
+        """
+        return _Measurement(self, name, category)
+
+    def report(self, logger: Any) -> None:
+        """Logs a table containing the slowest measurements and saves all measurements if an output file is set.
+
+        :param logger: the logger to log the table with
+        """
+        from rich import box
+        from rich.table import Table
+
+        table = Table(box=box.SQUARE)
+        for column in ["Category", "Name", "Total (ms)", "Self (ms)"]:
+            table.add_column(column, overflow="fold")
+
+        measurements = sorted(self._measurements, key=lambda m: m["duration"], reverse=True)
+        for measurement in measurements[:50]:
+            table.add_row(measurement["category"],
+                          measurement["name"],
+                          f"{measurement['duration'] * 1000:,.1f}",
+                          f"{measurement['self'] * 1000:,.1f}")
+
+        logger.info(table)
+
+        imports = sum(m["self"] for m in self._measurements if m["category"] == "import")
+        providers = sum(m["self"] for m in self._measurements if m["category"] == "provider")
+        logger.info(f"Imports: {imports * 1000:,.1f} ms, components: {providers * 1000:,.1f} ms, "
+                    f"total: {(perf_counter() - self._start) * 1000:,.1f} ms")
+
+        if self.output_file is not None:
+            self.save(self.output_file)
+            logger.info(f"Saved the startup profile to '{self.output_file}'")
+
+    def save(self, file: Path) -> None:
+        """Saves all measurements to a file.
+
+        Files ending with .speedscope.json are stored in the speedscope format, see https://www.speedscope.app/.
+        All other files are stored as a JSON list containing all measurements.
+
+        :param file: the path to the file to save the measurements to
+        """
+        if file.name.endswith(".speedscope.json"):
+            content = {
+                "$schema": "https://www.speedscope.app/file-format-schema.json",
+                "shared": {
+                    "frames": [{"name": name} for name in self._frames.keys()]
+                },
+                "profiles": [{
+                    "type": "evented",
+                    "name": " ".join(["lean"] + sys.argv[1:]),
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": self._events[-1]["at"] if len(self._events) > 0 else 0,
+                    "events": self._events
+                }]
+            }
+        else:
+            content = [{
+                "category": m["category"],
+                "name": m["name"],
+                "start_ms": m["start"] * 1000,
+                "total_ms": m["duration"] * 1000,
+                "self_ms": m["self"] * 1000
+            } for m in self._measurements]
+
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with file.open("w+", encoding="utf-8") as f:
+            f.write(json.dumps(content, indent=4) + "\n")
+
+    def _create_timed_callable(self, name: str, provides: Callable[..., Any]) -> Callable[..., Any]:
+        """Wraps a callable so that calling it is timed.
+
+        :param name: the name to record the calls under
+        :param provides: the callable to wrap
+        :return: a callable which times calls to the given callable
+        """
+
+        def timed_provides(*args, **kwargs) -> Any:
+            with self.measure(name, "provider"):
+                return provides(*args, **kwargs)
+
+        return timed_provides
+
+    def _enter(self, name: str, category: str) -> None:
+        frame_name = f"{category}: {name}"
+        if frame_name not in self._frames:
+            self._frames[frame_name] = len(self._frames)
+
+        now = perf_counter() - self._start
+        self._stack.append({"name": name, "category": category, "start": now, "children": 0.0})
+        self._events.append({"type": "O", "frame": self._frames[frame_name], "at": now * 1000})
+
+    def _exit(self) -> None:
+        now = perf_counter() - self._start
+        entry = self._stack.pop()
+
+        duration = now - entry["start"]
+        if len(self._stack) > 0:
+            self._stack[-1]["children"] += duration
+
+        self._measurements.append({
+            "name": entry["name"],
+            "category": entry["category"],
+            "start": entry["start"],
+            "duration": duration,
+            "self": duration - entry["children"]
+        })
+
+        frame_name = f"{entry['category']}: {entry['name']}"
+        self._events.append({"type": "C", "frame": self._frames[frame_name], "at": now * 1000})
+
+
+class _Measurement:
+    """A context manager which records the duration of its body in a StartupProfiler."""
+
+    def __init__(self, profiler: StartupProfiler, name: str, category: str) -> None:
+        self._profiler = profiler
+        self._name = name
+        self._category = category
+        self._recording = False
+
+    def __enter__(self) -> None:
+        self._recording = threading.get_ident() == self._profiler._thread_id
+        if self._recording:
+            self._profiler._enter(self._name, self._category)
+
+    def __exit__(self, *args) -> None:
+        if self._recording:
+            self._profiler._exit()
+
+
+# The profiler is created before the container because it needs to be enabled before anything else is imported
+startup_profiler = StartupProfiler()
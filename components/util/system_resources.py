@@ -0,0 +1,147 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import re
+from pathlib import Path
+from typing import List, Optional
+
+# cgroup v2 exposes all controllers in a single hierarchy, cgroup v1 has a directory per controller
+_cgroup_root = Path("/sys/fs/cgroup")
+
+
+def get_available_cpus() -> float:
+    """Returns the amount of CPUs the current process may use.
+
+    Inside a container os.cpu_count() returns the amount of CPUs of the host.
+    This function also takes the CPU affinity of the process and the CPU quota of its cgroup into account.
+
+    :return: the amount of CPUs available to the current process, which is a fraction if the cgroup has a quota
+    """
+    try:
+        cpus = float(len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        cpus = float(os.cpu_count() or 1)
+
+    quota = _get_cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, quota)
+
+    return max(cpus, 1.0)
+
+
+def get_available_memory() -> Optional[int]:
+    """Returns the memory limit of the cgroup of the current process.
+
+    :return: the maximum amount of bytes the current process may use, or None if there is no limit
+    """
+    for file in [_cgroup_root / "memory.max", _cgroup_root / "memory" / "memory.limit_in_bytes"]:
+        value = _read_system_file(file)
+        if value is None or value == "max":
+            continue
+
+        try:
+            limit = int(value)
+        except ValueError:
+            continue
+
+        # cgroup v1 reports an unlimited limit as a huge number rounded down to the page size
+        if limit < 2 ** 60:
+            return limit
+
+    return None
+
+
+def get_numa_node_cpus(node: int) -> Optional[str]:
+    """Returns the CPUs which belong to a NUMA node of the current machine.
+
+    :param node: the number of the NUMA node
+    :return: the CPUs of the node in cpuset format (like 0-15,32-47), or None if the node is unknown
+    """
+    return _read_system_file(Path(f"/sys/devices/system/node/node{node}/cpulist"))
+
+
+def parse_cpu_list(cpu_list: str) -> List[int]:
+    """Parses a list of CPUs in cpuset format.
+
+    Raises an error if the list is not valid.
+
+    :param cpu_list: the list of CPUs, containing comma-separated CPU numbers and ranges (like 0-3,8)
+    :return: the CPU numbers in the list
+    """
+    cpus = []
+    for part in cpu_list.split(","):
+        bounds = part.strip().split("-")
+        if len(bounds) > 2 or not all(bound.isdigit() for bound in bounds):
+            raise ValueError(f"'{cpu_list}' is not a valid list of CPUs, use a format like 0-3,8")
+
+        cpus.extend(range(int(bounds[0]), int(bounds[-1]) + 1))
+
+    return sorted(set(cpus))
+
+
+def parse_memory_size(size: str) -> int:
+    """Parses a memory size in the format Docker accepts.
+
+    Raises an error if the size is not valid.
+
+    :param size: the size, like 512m or 4g
+    :return: the size in bytes
+    """
+    match = re.match(r"^(\d+(?:\.\d+)?)\s*([bkmg]?)b?$", size.strip().lower())
+    if match is None:
+        raise ValueError(f"'{size}' is not a valid memory size, use a format like 512m or 4g")
+
+    return int(float(match.group(1)) * 1024 ** "bkmg".index(match.group(2) or "b"))
+
+
+def _get_cgroup_cpu_quota() -> Optional[float]:
+    """Returns the CPU quota of the cgroup of the current process.
+
+    :return: the amount of CPUs the cgroup may use per period, or None if there is no quota
+    """
+    cpu_max = _read_system_file(_cgroup_root / "cpu.max")
+    if cpu_max is not None:
+        parts = cpu_max.split()
+        if len(parts) == 2 and parts[0] != "max":
+            try:
+                return int(parts[0]) / int(parts[1])
+            except (ValueError, ZeroDivisionError):
+                return None
+        return None
+
+    quota = _read_system_file(_cgroup_root / "cpu" / "cpu.cfs_quota_us")
+    period = _read_system_file(_cgroup_root / "cpu" / "cpu.cfs_period_us")
+    if quota is None or period is None:
+        return None
+
+    try:
+        if int(quota) > 0 and int(period) > 0:
+            return int(quota) / int(period)
+    except ValueError:
+        pass
+
+    return None
+
+
+def _read_system_file(file: Path) -> Optional[str]:
+    """Reads the content of a file exposed by the kernel, like a cgroup interface file or a sysfs file.
+
+    :param file: the path to the file
+    :return: the stripped content of the file, or None if it doesn't exist or can't be read
+    """
+    try:
+        return file.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
@@ -12,25 +12,59 @@
 # limitations under the License.
 
 import hashlib
+import json
 import os
+import threading
 from datetime import datetime, timedelta, timezone
 from distutils.version import StrictVersion
+from time import time
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
 
 import requests
-from docker.errors import APIError
 from rich import box
 from rich.panel import Panel
 from rich.table import Table
 
 import lean
 from lean.components.config.storage import Storage
-from lean.components.docker.docker_manager import DockerManager
 from lean.components.util.http_client import HTTPClient
 from lean.components.util.logger import Logger
 from lean.constants import (UPDATE_CHECK_INTERVAL_ANNOUNCEMENTS, UPDATE_CHECK_INTERVAL_CLI,
-                            UPDATE_CHECK_INTERVAL_DOCKER_IMAGE)
+                            UPDATE_CHECK_INTERVAL_DOCKER_IMAGE, UPDATE_CHECK_TIMEOUT)
 from lean.models.docker import DockerImage
 
+# The Docker package is slow to import and only needed by commands which use Docker images
+if TYPE_CHECKING:
+    from lean.components.docker.docker_manager import DockerManager
+
+
+class _BackgroundCheck:
+    """A network request of an update check which runs on a background thread."""
+
+    def __init__(self, name: str, fetch: Callable[[], Any], handle: Callable[[Any], None]) -> None:
+        """Creates a new _BackgroundCheck instance and starts fetching.
+
+        :param name: the name of the check, used in debug messages
+        :param fetch: the function performing the network request, must not touch any shared state
+        :param handle: the function handling the fetched result, called on the main thread
+        """
+        self.name = name
+        self.handle = handle
+        self.result = None
+        self.error: Optional[Exception] = None
+        self.deadline = time() + UPDATE_CHECK_TIMEOUT
+
+        self._fetch = fetch
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self) -> None:
+        try:
+            self.result = self._fetch()
+        except Exception as exception:
+            self.error = exception
+
 
 class UpdateManager:
     """The UpdateManager class contains methods to check for and warn the user about available updates."""
@@ -39,108 +73,214 @@ class UpdateManager:
                  logger: Logger,
                  http_client: HTTPClient,
                  cache_storage: Storage,
-                 docker_manager: DockerManager) -> None:
+                 docker_manager: Callable[[], 'DockerManager']) -> None:
         """Creates a new UpdateManager instance.
 
         :param logger: the logger to use when warning the user when something is outdated
         :param http_client: the HTTPClient instance to use for HTTP requests
         :param cache_storage: the Storage instance to use for getting/setting the last time a certain update check was performed
-        :param docker_manager: the DockerManager instance to use to check for Docker updates
+        :param docker_manager: the function returning the DockerManager instance to use to check for Docker updates
         """
         self._logger = logger
         self._http_client = http_client
         self._cache_storage = cache_storage
         self._docker_manager = docker_manager
+        self._background_checks: List[_BackgroundCheck] = []
+
+        # When offline, no update checks and announcement checks are performed at all
+        self.offline = False
+
+    def start_background_checks(self) -> None:
+        """Starts checking for announcements and CLI updates in the background.
+
+        The results are shown by show_background_check_results(), which should be called when the command finishes.
+        """
+        if self.offline:
+            return
+
+        if self._should_check_for_updates("announcements", UPDATE_CHECK_INTERVAL_ANNOUNCEMENTS):
+            self._start_background_check("announcements", self._fetch_announcements, self._show_announcements)
+
+        if lean.__version__ != "dev" and self._should_check_for_updates("cli", UPDATE_CHECK_INTERVAL_CLI):
+            self._start_background_check("cli", self._fetch_latest_cli_version, self._warn_if_version_outdated)
+
+    def show_background_check_results(self) -> None:
+        """Waits for the background checks to finish and shows their results.
+
+        Checks are abandoned if they haven't finished UPDATE_CHECK_TIMEOUT seconds after they were started.
+        """
+        checks = self._background_checks
+        self._background_checks = []
+
+        for check in checks:
+            check.thread.join(max(0.0, check.deadline - time()))
+
+            if check.thread.is_alive():
+                self._logger.debug(f"The {check.name} update check timed out")
+            elif check.error is not None:
+                self._logger.debug(f"The {check.name} update check failed: {check.error}")
+            else:
+                check.handle(check.result)
 
     def warn_if_cli_outdated(self, force: bool = False) -> None:
         """Warns the user if the CLI is outdated.
 
         An update check is performed once every UPDATE_CHECK_INTERVAL_CLI hours, unless force is set to True.
+        The check blocks for at most UPDATE_CHECK_TIMEOUT seconds, use start_background_checks() to run it in the background.
 
         :param force: whether the update check interval should be bypassed (defaults to False)
         """
-        current_version = lean.__version__
-
         # A development version is never considered outdated
-        if current_version == "dev":
+        if self.offline or lean.__version__ == "dev":
             return
 
         if not force and not self._should_check_for_updates("cli", UPDATE_CHECK_INTERVAL_CLI):
             return
 
-        try:
-            response = self._http_client.get("https://pypi.org/pypi/lean/json", raise_for_status=False)
-        except requests.exceptions.ConnectionError:
-            # The user may be offline, do nothing
-            return
-
-        if not response.ok:
-            return
-
-        latest_version = response.json()["info"]["version"]
-
-        if StrictVersion(latest_version) > StrictVersion(current_version):
-            self._logger.warn(f"A new release of the Lean CLI is available ({current_version} -> {latest_version})")
-            self._logger.warn("Run `pip install --upgrade lean` to update to the latest version")
+        self._warn_if_version_outdated(self._fetch_latest_cli_version())
 
     def pull_docker_image_if_necessary(self, image: DockerImage, force: bool) -> None:
         """Pulls a Docker image if necessary.
 
-        Docker images are pulled when they are not installed yet,
-        and once every UPDATE_CHECK_INTERVAL_DOCKER_IMAGE hours (the interval is per image).
+        Docker images are pulled when they are not installed yet, or when a previous update check found an update.
+        Once every UPDATE_CHECK_INTERVAL_DOCKER_IMAGE hours (the interval is per image) the registry is checked for
+        updates in the background, so the check never delays the command that uses the image.
 
         :param image: the image to pull
         :param force: skip the interval check to force a pull
         """
-        if not force and self._docker_manager.image_installed(image):
-            if not self._should_check_for_updates(str(image), UPDATE_CHECK_INTERVAL_DOCKER_IMAGE):
+        pending_update_key = f"pending-update-{image}"
+        docker_manager = self._docker_manager()
+
+        if not force and docker_manager.image_installed(image):
+            # Don't update existing image when running from local GUI
+            if os.environ.get("QC_LOCAL_GUI", "false") == "true":
                 return
 
-            local_digest = self._docker_manager.get_local_digest(image)
+            if not self._cache_storage.has(pending_update_key):
+                if self.offline or not self._should_check_for_updates(str(image), UPDATE_CHECK_INTERVAL_DOCKER_IMAGE):
+                    return
 
-            # If the local digest does not exist the image was built locally so there is nothing to pull
-            if local_digest is None:
-                return
+                local_digest = docker_manager.get_local_digest(image)
 
-            try:
-                remote_digest = self._docker_manager.get_remote_digest(image)
-            except APIError:
-                # The user may be offline, do nothing
-                return
+                # If the local digest does not exist the image was built locally so there is nothing to pull
+                if local_digest is None:
+                    return
 
-            # Do nothing if we're already using the latest image
-            if remote_digest == local_digest:
+                self._start_background_check(str(image),
+                                             lambda: self._fetch_remote_digest(image),
+                                             lambda remote_digest: self._record_docker_image_update(image,
+                                                                                                    local_digest,
+                                                                                                    remote_digest))
                 return
 
-            # Don't update existing image when running from local GUI
-            if os.environ.get("QC_LOCAL_GUI", "false") == "true":
-                return
+        docker_manager.pull_image(image)
 
-        self._docker_manager.pull_image(image)
+        if self._cache_storage.has(pending_update_key):
+            self._cache_storage.delete(pending_update_key)
 
-    def show_announcements(self) -> None:
-        """Shows the announcements if they have been updated.
+    def _start_background_check(self, name: str, fetch: Callable[[], Any], handle: Callable[[Any], None]) -> None:
+        """Starts an update check in the background.
+
+        :param name: the name of the check, used in debug messages
+        :param fetch: the function performing the network request, must not touch any shared state
+        :param handle: the function handling the fetched result, called by show_background_check_results()
+        """
+        self._background_checks.append(_BackgroundCheck(name, fetch, handle))
+
+    def _fetch_latest_cli_version(self) -> Optional[str]:
+        """Retrieves the latest version of the CLI from PyPI.
+
+        :return: the latest version of the CLI, or None if it could not be retrieved
+        """
+        try:
+            response = self._http_client.get("https://pypi.org/pypi/lean/json",
+                                             raise_for_status=False,
+                                             timeout=UPDATE_CHECK_TIMEOUT)
+        except requests.exceptions.RequestException:
+            # The user may be offline, do nothing
+            return None
+
+        if not response.ok:
+            return None
+
+        return response.json()["info"]["version"]
+
+    def _warn_if_version_outdated(self, latest_version: Optional[str]) -> None:
+        """Warns the user if the current version of the CLI is older than the latest version.
+
+        :param latest_version: the latest version of the CLI, or None if it is unknown
+        """
+        if latest_version is None:
+            return
+
+        current_version = lean.__version__
+        if StrictVersion(latest_version) > StrictVersion(current_version):
+            self._logger.warn(f"A new release of the Lean CLI is available ({current_version} -> {latest_version})")
+            self._logger.warn("Run `pip install --upgrade lean` to update to the latest version")
+
+    def _fetch_remote_digest(self, image: DockerImage) -> Optional[str]:
+        """Retrieves the digest of an image in the registry.
+
+        :param image: the image to get the remote digest of
+        :return: the digest of the image in the registry, or None if it could not be retrieved
+        """
+        from docker.errors import APIError
+
+        try:
+            return self._docker_manager().get_remote_digest(image)
+        except APIError:
+            # The user may be offline, do nothing
+            return None
+
+    def _record_docker_image_update(self,
+                                    image: DockerImage,
+                                    local_digest: str,
+                                    remote_digest: Optional[str]) -> None:
+        """Records that an image needs to be pulled the next time it is used if the registry has a newer version.
 
-        We check for new announcements once every UPDATE_CHECK_INTERVAL_ANNOUNCEMENTS hours.
+        :param image: the image that was checked
+        :param local_digest: the digest of the installed image
+        :param remote_digest: the digest of the image in the registry, or None if it is unknown
         """
-        if not self._should_check_for_updates("announcements", UPDATE_CHECK_INTERVAL_ANNOUNCEMENTS):
+        # Do nothing if we're already using the latest image
+        if remote_digest is None or remote_digest == local_digest:
             return
 
+        self._cache_storage.set(f"pending-update-{image}", remote_digest)
+        self._logger.info(f"A new version of {image} is available, it will be pulled the next time it is used")
+
+    def _fetch_announcements(self) -> Optional[bytes]:
+        """Retrieves the announcements from GitHub.
+
+        :return: the raw content of the announcements file, or None if it could not be retrieved
+        """
         try:
             response = self._http_client.get(
                 "https://raw.githubusercontent.com/QuantConnect/lean-cli/master/announcements.json",
-                raise_for_status=False
+                raise_for_status=False,
+                timeout=UPDATE_CHECK_TIMEOUT
             )
-        except requests.exceptions.ConnectionError:
+        except requests.exceptions.RequestException:
             # The user may be offline, do nothing
-            return
+            return None
 
         if not response.ok:
+            return None
+
+        return response.content
+
+    def _show_announcements(self, content: Optional[bytes]) -> None:
+        """Shows the announcements if they have been updated.
+
+        :param content: the raw content of the announcements file, or None if it is unknown
+        """
+        if content is None:
             return
 
         hash_cache_key = "last-announcements-hash"
 
-        remote_hash = hashlib.md5(response.content).hexdigest()
+        remote_hash = hashlib.md5(content).hexdigest()
         local_hash = self._cache_storage.get(hash_cache_key, None)
 
         if local_hash == remote_hash:
@@ -148,7 +288,7 @@ class UpdateManager:
 
         self._cache_storage.set(hash_cache_key, remote_hash)
 
-        announcements = response.json()["announcements"]
+        announcements = json.loads(content)["announcements"]
         if len(announcements) == 0:
             return
 
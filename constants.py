@@ -26,6 +26,21 @@ CREDENTIALS_CONFIG_PATH = str(Path("~/.lean/credentials").expanduser())
 # The file in which we store when we last checked for updates
 CACHE_PATH = str(Path("~/.lean/cache").expanduser())
 
+# The directory in which we cache the responses of read-only API endpoints
+API_RESPONSE_CACHE_PATH = str(Path("~/.lean/api-responses").expanduser())
+
+# The directory in which we cache the listings of remote data files
+LISTING_CACHE_PATH = str(Path("~/.lean/listing-cache").expanduser())
+
+# The maximum amount of cached remote data file paths kept in memory, which are a few bytes each
+LISTING_CACHE_MAX_PATHS = 2_000_000
+
+# The directory in which the start scripts, run scripts and configuration of warm engine containers are stored
+WARM_POOL_DIRECTORY = str(Path("~/.lean/warm-pool").expanduser())
+
+# The file in which we store when the symbol properties and market hours databases were last updated
+DATABASE_FILES_CACHE_PATH = str(Path("~/.lean/database-files").expanduser())
+
 # The directory in which modules are stored
 MODULES_DIRECTORY = str(Path("~/.lean/modules").expanduser())
 
@@ -60,6 +75,81 @@ elif _qc_api == "beta":
 else:
     API_BASE_URL = "https://www.quantconnect.com/api/v2/"
 
+# QC_API=record sends requests to the production API and records all HTTP interactions in a cassette file
+# QC_API=replay replays the interactions in the cassette file without sending any requests
+# The cassette file defaults to ~/.lean/http-cassette.json and can be changed with QC_HTTP_CASSETTE
+# QC_HTTP_REPLAY_LATENCY (seconds) and QC_HTTP_REPLAY_BANDWIDTH (bytes per second) simulate a network when replaying
+HTTP_CASSETTE_MODE = _qc_api if _qc_api in ["record", "replay"] else None
+HTTP_CASSETTE_PATH = str(Path(os.environ.get("QC_HTTP_CASSETTE", "~/.lean/http-cassette.json")).expanduser())
+HTTP_REPLAY_LATENCY = float(os.environ["QC_HTTP_REPLAY_LATENCY"]) if "QC_HTTP_REPLAY_LATENCY" in os.environ else None
+HTTP_REPLAY_BANDWIDTH = float(os.environ["QC_HTTP_REPLAY_BANDWIDTH"]) if "QC_HTTP_REPLAY_BANDWIDTH" in os.environ else None
+
+# The maximum amount of HTTP requests kept in memory when tracing requests with --trace-http
+HTTP_TRACE_RING_SIZE = 10000
+
+# The maximum amount of times an API request is sent before giving up
+API_MAX_ATTEMPTS = 5
+
+# The maximum amount of seconds to wait before the first retry of an API request, this doubles every retry
+API_RETRY_BACKOFF_BASE = 0.5
+
+# The maximum amount of seconds to wait before retrying an API request
+API_RETRY_BACKOFF_MAX = 30
+
+# The amount of API requests per second the CLI sends on average, and the amount it may send at once
+API_RATE_LIMIT = 20
+API_RATE_LIMIT_BURST = 40
+
+# The maximum amount of times the transfer of a data file is attempted, each attempt resumes where the last one stopped
+DOWNLOAD_MAX_ATTEMPTS = 5
+
+# The suffix of the sibling file a data file is written to while it is being downloaded
+PARTIAL_DOWNLOAD_SUFFIX = ".partial"
+
+# The amount of concurrent transfers a data download starts with, shared by all files and the ranges of large files
+# The amount adapts to the observed throughput and errors while the download runs
+DEFAULT_DOWNLOAD_CONCURRENCY = 4
+
+# The upper bound of the amount of concurrent transfers, which is lowered further by the CPU and memory limits
+# Transfers are I/O-bound, so every available CPU may run multiple of them
+DOWNLOAD_MAX_CONCURRENCY = 32
+DOWNLOAD_CONCURRENCY_PER_CPU = 8
+
+# The upper bound of the amount of concurrent listing requests when selecting the files of a dataset
+# Listing requests are I/O-bound and don't hold file content in memory, so only the CPU limits lower it further
+LISTING_MAX_CONCURRENCY = 16
+LISTING_CONCURRENCY_PER_CPU = 4
+
+# The amount of threads resolving the presigned links of data files ahead of the transfers
+DATA_LINK_RESOLVERS = 8
+
+# The maximum amount of resolved links waiting for a transfer per transfer thread
+# This bounds how far ahead links are resolved, so they are used long before they expire
+# Links are never resolved again, because resolving a link purchases the file again
+DATA_LINK_LOOKAHEAD_PER_TRANSFER = 2
+
+# The amount of memory reserved per concurrent transfer when limiting the concurrency to the available memory
+DOWNLOAD_MEMORY_PER_TRANSFER = 16 * 1024 * 1024
+
+# Data files of at least this many bytes are fetched as multiple concurrent byte ranges
+MULTI_RANGE_DOWNLOAD_THRESHOLD = 64 * 1024 * 1024
+
+# The maximum amount of concurrent byte ranges a single data file is fetched in, and the minimum size of each range
+MULTI_RANGE_DOWNLOAD_PARTS = 8
+MULTI_RANGE_DOWNLOAD_MIN_PART_SIZE = 8 * 1024 * 1024
+
+# The name of the file in the data directory which records the in-flight and completed files of a download
+DOWNLOAD_JOURNAL_FILE_NAME = ".lean-download-journal"
+
+# The name of the SQLite database in the data directory which records the size and hash of every downloaded file
+DATA_MANIFEST_FILE_NAME = ".lean-data-manifest.db"
+
+# The default maximum amount of keep-alive connections the HTTPClient keeps open per host
+DEFAULT_HTTP_POOL_SIZE = 32
+
+# The default amount of seconds the HTTPClient keeps idle connections open
+DEFAULT_HTTP_KEEP_ALIVE = 60
+
 # The interval in hours at which the CLI checks for updates to itself
 UPDATE_CHECK_INTERVAL_CLI = 24
 
@@ -69,6 +159,16 @@ UPDATE_CHECK_INTERVAL_DOCKER_IMAGE = 24 * 7
 # The interval in hours at which the CLI checks for new announcements
 UPDATE_CHECK_INTERVAL_ANNOUNCEMENTS = 24
 
+# The maximum amount of seconds an update check or announcements check may take
+# Checks run in the background and are abandoned if they haven't finished this long after they were started
+UPDATE_CHECK_TIMEOUT = 3
+
+# The interval in hours at which the CLI checks for updates to the symbol properties and market hours databases
+UPDATE_CHECK_INTERVAL_DATABASE_FILES = 24
+
+# The maximum amount of seconds the CLI spends on updating the symbol properties and market hours databases
+DATABASE_FILES_UPDATE_TIMEOUT = 10
+
 # The product id of the Equity Security Master subscription
 EQUITY_SECURITY_MASTER_PRODUCT_ID = 37
 
@@ -108,8 +208,55 @@ GUI_PRODUCT_SUBSCRIPTION_IDS = [119, 120]
 # The product id of the product the files are retrieved from when installing the GUI module
 GUI_PRODUCT_INSTALL_ID = 119
 
+# The amount of seconds the CLI trusts its cached knowledge of which Docker images, networks and volumes exist
+DOCKER_INVENTORY_CACHE_TTL = 60
+
+# The maximum amount of lines of container output printed per second when stdout is a terminal
+# Printing to a terminal is slow, so the remaining lines are summarized to keep up with the container
+# This only applies when the full output is captured in a log store, otherwise every line is printed
+CONSOLE_LOG_MAX_LINES_PER_SECOND = 1000
+
+# The name of the directory in an output directory which the full output of the container is stored in
+CONTAINER_LOG_DIRECTORY_NAME = "console"
+
+# The size in bytes at which the segment of a captured container log is compressed and a new segment is started
+LOG_SEGMENT_SIZE = 64 * 1024 * 1024
+
+# The maximum amount of lines between two entries in the index of a captured container log
+LOG_INDEX_INTERVAL = 1024
+
+# The amount of times removing the plain file of a compressed log segment is tried, a second apart
+# On Windows the file can't be removed while a reader has it open
+LOG_SEGMENT_REMOVE_ATTEMPTS = 10
+
+# The share of a container's memory limit the .NET garbage collector may use for its heaps
+# This matches the default the runtime applies when it detects a limit itself
+DOTNET_GC_HEAP_LIMIT_RATIO = 0.75
+
+# The amount of memory a backtest without a memory limit is expected to use when scheduling concurrent backtests
+BACKTEST_MEMORY_ESTIMATE = 2 * 1024 * 1024 * 1024
+
+# The share of the memory of the Docker host concurrent backtests may reserve together
+BACKTEST_SCHEDULER_MEMORY_RATIO = 0.9
+
 # The name of the Docker network which all Lean CLI containers are ran on
 DOCKER_NETWORK = "lean_cli"
 
 # The name of the Docker container running the local GUI
 LOCAL_GUI_CONTAINER_NAME = "lean_cli_gui"
+
+# The label identifying warm engine containers, its value is the fingerprint of the configuration they were started with
+WARM_CONTAINER_LABEL = "lean_cli_warm"
+
+# The amount of idle warm engine containers kept per configuration if the warm-pool-size option is not set
+DEFAULT_WARM_POOL_SIZE = 1
+
+# The maximum amount of idle warm engine containers kept across all configurations
+# Containers started for configurations which are no longer used are removed, oldest first, above this amount
+WARM_POOL_MAX_IDLE_CONTAINERS = 4
+
+# The amount of backtests a warm engine container runs before it is replaced by a fresh one
+WARM_CONTAINER_MAX_USES = 20
+
+# The amount of seconds after which a warm engine container which hasn't run a backtest stops itself
+WARM_CONTAINER_IDLE_TTL = 30 * 60
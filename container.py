@@ -11,109 +11,199 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from dependency_injector.containers import DeclarativeContainer
-from dependency_injector.providers import Factory, Singleton
-
-from lean.components.api.api_client import APIClient
-from lean.components.cloud.cloud_project_manager import CloudProjectManager
-from lean.components.cloud.cloud_runner import CloudRunner
-from lean.components.cloud.data_downloader import DataDownloader
-from lean.components.cloud.module_manager import ModuleManager
-from lean.components.cloud.pull_manager import PullManager
-from lean.components.cloud.push_manager import PushManager
-from lean.components.config.cli_config_manager import CLIConfigManager
-from lean.components.config.lean_config_manager import LeanConfigManager
-from lean.components.config.optimizer_config_manager import OptimizerConfigManager
-from lean.components.config.output_config_manager import OutputConfigManager
-from lean.components.config.project_config_manager import ProjectConfigManager
-from lean.components.config.storage import Storage
-from lean.components.docker.docker_manager import DockerManager
-from lean.components.docker.lean_runner import LeanRunner
-from lean.components.util.http_client import HTTPClient
-from lean.components.util.logger import Logger
-from lean.components.util.market_hours_database import MarketHoursDatabase
-from lean.components.util.name_generator import NameGenerator
-from lean.components.util.path_manager import PathManager
-from lean.components.util.platform_manager import PlatformManager
-from lean.components.util.project_manager import ProjectManager
-from lean.components.util.shortcut_manager import ShortcutManager
-from lean.components.util.task_manager import TaskManager
-from lean.components.util.temp_manager import TempManager
-from lean.components.util.update_manager import UpdateManager
-from lean.components.util.xml_manager import XMLManager
-from lean.constants import CACHE_PATH, CREDENTIALS_CONFIG_PATH, GENERAL_CONFIG_PATH
-
-
-class Container(DeclarativeContainer):
-    """The Container class wires all reusable components together."""
-    logger = Singleton(Logger)
-
-    platform_manager = Singleton(PlatformManager)
-    task_manager = Singleton(TaskManager, logger)
-    name_generator = Singleton(NameGenerator)
-    path_manager = Singleton(PathManager, platform_manager)
-    temp_manager = Singleton(TempManager)
-    xml_manager = Singleton(XMLManager)
-    http_client = Singleton(HTTPClient, logger)
-
-    general_storage = Singleton(Storage, file=GENERAL_CONFIG_PATH)
-    credentials_storage = Singleton(Storage, file=CREDENTIALS_CONFIG_PATH)
-    cache_storage = Singleton(Storage, file=CACHE_PATH)
-
-    cli_config_manager = Singleton(CLIConfigManager, general_storage, credentials_storage)
-
-    api_client = Factory(APIClient,
-                         logger,
-                         http_client,
-                         user_id=cli_config_manager.provided.user_id.get_value()(),
-                         api_token=cli_config_manager.provided.api_token.get_value()())
-
-    module_manager = Singleton(ModuleManager, logger, api_client, http_client)
-
-    project_config_manager = Singleton(ProjectConfigManager, xml_manager)
-    lean_config_manager = Singleton(LeanConfigManager,
+import importlib
+from pathlib import Path
+from typing import Any, Callable
+
+from lean.constants import (API_RESPONSE_CACHE_PATH, CACHE_PATH, CREDENTIALS_CONFIG_PATH, DATABASE_FILES_CACHE_PATH,
+                            DEFAULT_DOWNLOAD_CONCURRENCY, GENERAL_CONFIG_PATH, LISTING_CACHE_PATH)
+
+
+def _lazy(module_name: str, class_name: str) -> Callable[..., Any]:
+    """Returns a callable which creates instances of a component class, importing its module on first use.
+
+    Component modules import Docker, pydantic, rich and more, which are not needed by every command.
+    Providers are built from these callables, so a module is only imported when one of its components is created.
+
+    :param module_name: the name of the module containing the component class
+    :param class_name: the name of the component class
+    :return: a callable which passes its arguments on to the constructor of the component class
+    """
+
+    def create(*args, **kwargs) -> Any:
+        return getattr(importlib.import_module(module_name), class_name)(*args, **kwargs)
+
+    create.__name__ = class_name
+    create.__qualname__ = class_name
+    return create
+
+
+APIClient = _lazy("lean.components.api.api_client", "APIClient")
+ListingCache = _lazy("lean.components.api.listing_cache", "ListingCache")
+ResponseCache = _lazy("lean.components.api.response_cache", "ResponseCache")
+RetryPolicy = _lazy("lean.components.api.retry_policy", "RetryPolicy")
+CloudProjectManager = _lazy("lean.components.cloud.cloud_project_manager", "CloudProjectManager")
+CloudRunner = _lazy("lean.components.cloud.cloud_runner", "CloudRunner")
+DataDownloader = _lazy("lean.components.cloud.data_downloader", "DataDownloader")
+ModuleManager = _lazy("lean.components.cloud.module_manager", "ModuleManager")
+PullManager = _lazy("lean.components.cloud.pull_manager", "PullManager")
+PushManager = _lazy("lean.components.cloud.push_manager", "PushManager")
+CLIConfigManager = _lazy("lean.components.config.cli_config_manager", "CLIConfigManager")
+LeanConfigManager = _lazy("lean.components.config.lean_config_manager", "LeanConfigManager")
+OptimizerConfigManager = _lazy("lean.components.config.optimizer_config_manager", "OptimizerConfigManager")
+OutputConfigManager = _lazy("lean.components.config.output_config_manager", "OutputConfigManager")
+ProjectConfigManager = _lazy("lean.components.config.project_config_manager", "ProjectConfigManager")
+Storage = _lazy("lean.components.config.storage", "Storage")
+DockerManager = _lazy("lean.components.docker.docker_manager", "DockerManager")
+LeanRunner = _lazy("lean.components.docker.lean_runner", "LeanRunner")
+WarmContainerPool = _lazy("lean.components.docker.warm_container_pool", "WarmContainerPool")
+ConcurrencyBudget = _lazy("lean.components.util.concurrency_budget", "ConcurrencyBudget")
+HTTPClient = _lazy("lean.components.util.http_client", "HTTPClient")
+HTTPTracer = _lazy("lean.components.util.http_tracer", "HTTPTracer")
+Logger = _lazy("lean.components.util.logger", "Logger")
+MarketHoursDatabase = _lazy("lean.components.util.market_hours_database", "MarketHoursDatabase")
+NameGenerator = _lazy("lean.components.util.name_generator", "NameGenerator")
+PathManager = _lazy("lean.components.util.path_manager", "PathManager")
+PlatformManager = _lazy("lean.components.util.platform_manager", "PlatformManager")
+ProjectManager = _lazy("lean.components.util.project_manager", "ProjectManager")
+ShortcutManager = _lazy("lean.components.util.shortcut_manager", "ShortcutManager")
+TaskManager = _lazy("lean.components.util.task_manager", "TaskManager")
+TempManager = _lazy("lean.components.util.temp_manager", "TempManager")
+UpdateManager = _lazy("lean.components.util.update_manager", "UpdateManager")
+XMLManager = _lazy("lean.components.util.xml_manager", "XMLManager")
+
+
+def _create_container() -> Any:
+    """Creates the container wiring all reusable components together.
+
+    dependency_injector imports pydantic when it is imported, so it is only imported once a component is needed.
+
+    :return: the container instance
+    """
+    from dependency_injector.containers import DeclarativeContainer
+    from dependency_injector.providers import Factory, Singleton
+
+    class Container(DeclarativeContainer):
+        """The Container class wires all reusable components together."""
+        logger = Singleton(Logger)
+
+        platform_manager = Singleton(PlatformManager)
+        task_manager = Singleton(TaskManager, logger)
+        name_generator = Singleton(NameGenerator)
+        path_manager = Singleton(PathManager, platform_manager)
+        temp_manager = Singleton(TempManager)
+        xml_manager = Singleton(XMLManager)
+
+        general_storage = Singleton(Storage, file=GENERAL_CONFIG_PATH)
+        credentials_storage = Singleton(Storage, file=CREDENTIALS_CONFIG_PATH)
+        cache_storage = Singleton(Storage, file=CACHE_PATH)
+        database_files_storage = Singleton(Storage, file=DATABASE_FILES_CACHE_PATH)
+
+        cli_config_manager = Singleton(CLIConfigManager, general_storage, credentials_storage)
+
+        http_tracer = Singleton(HTTPTracer)
+        http_client = Singleton(HTTPClient, logger, cli_config_manager, http_tracer)
+        retry_policy = Singleton(RetryPolicy, logger)
+        response_cache = Singleton(ResponseCache, Path(API_RESPONSE_CACHE_PATH))
+        listing_cache = Singleton(ListingCache, Path(LISTING_CACHE_PATH))
+
+        api_client = Factory(APIClient,
+                             logger,
+                             http_client,
+                             retry_policy,
+                             response_cache,
+                             listing_cache,
+                             user_id=cli_config_manager.provided.user_id.get_value()(),
+                             api_token=cli_config_manager.provided.api_token.get_value()())
+
+        module_manager = Singleton(ModuleManager, logger, api_client, http_client)
+
+        project_config_manager = Singleton(ProjectConfigManager, xml_manager)
+        lean_config_manager = Singleton(LeanConfigManager,
+                                        logger,
+                                        cli_config_manager,
+                                        project_config_manager,
+                                        module_manager,
+                                        cache_storage)
+        output_config_manager = Singleton(OutputConfigManager, lean_config_manager)
+        optimizer_config_manager = Singleton(OptimizerConfigManager, logger)
+
+        project_manager = Singleton(ProjectManager,
+                                    project_config_manager,
+                                    lean_config_manager,
+                                    xml_manager,
+                                    platform_manager)
+
+        cloud_runner = Singleton(CloudRunner, logger, api_client, task_manager)
+        pull_manager = Singleton(PullManager,
+                                 logger,
+                                 api_client,
+                                 project_manager,
+                                 project_config_manager,
+                                 platform_manager)
+        push_manager = Singleton(PushManager, logger, api_client, project_manager, project_config_manager)
+        download_budget = Singleton(ConcurrencyBudget, DEFAULT_DOWNLOAD_CONCURRENCY)
+        data_downloader = Singleton(DataDownloader,
                                     logger,
+                                    api_client,
+                                    lean_config_manager,
                                     cli_config_manager,
-                                    project_config_manager,
-                                    module_manager,
-                                    cache_storage)
-    output_config_manager = Singleton(OutputConfigManager, lean_config_manager)
-    optimizer_config_manager = Singleton(OptimizerConfigManager, logger)
-
-    project_manager = Singleton(ProjectManager,
+                                    http_client,
+                                    database_files_storage,
+                                    download_budget)
+        cloud_project_manager = Singleton(CloudProjectManager,
+                                          api_client,
+                                          project_config_manager,
+                                          pull_manager,
+                                          push_manager,
+                                          path_manager)
+
+        docker_manager = Singleton(DockerManager, logger, temp_manager, platform_manager)
+        warm_container_pool = Singleton(WarmContainerPool,
+                                        logger,
+                                        docker_manager,
+                                        lean_config_manager,
+                                        cli_config_manager)
+        lean_runner = Singleton(LeanRunner,
+                                logger,
                                 project_config_manager,
                                 lean_config_manager,
+                                output_config_manager,
+                                docker_manager,
+                                module_manager,
+                                project_manager,
+                                temp_manager,
                                 xml_manager,
+                                warm_container_pool,
                                 platform_manager)
 
-    cloud_runner = Singleton(CloudRunner, logger, api_client, task_manager)
-    pull_manager = Singleton(PullManager, logger, api_client, project_manager, project_config_manager, platform_manager)
-    push_manager = Singleton(PushManager, logger, api_client, project_manager, project_config_manager)
-    data_downloader = Singleton(DataDownloader, logger, api_client, lean_config_manager)
-    cloud_project_manager = Singleton(CloudProjectManager,
-                                      api_client,
-                                      project_config_manager,
-                                      pull_manager,
-                                      push_manager,
-                                      path_manager)
-
-    docker_manager = Singleton(DockerManager, logger, temp_manager, platform_manager)
-    lean_runner = Singleton(LeanRunner,
-                            logger,
-                            project_config_manager,
-                            lean_config_manager,
-                            output_config_manager,
-                            docker_manager,
-                            module_manager,
-                            project_manager,
-                            temp_manager,
-                            xml_manager)
-
-    market_hours_database = Singleton(MarketHoursDatabase, lean_config_manager)
-
-    shortcut_manager = Singleton(ShortcutManager, logger, lean_config_manager, platform_manager, cache_storage)
-    update_manager = Singleton(UpdateManager, logger, http_client, cache_storage, docker_manager)
-
-
-container = Container()
-container.data_downloader().update_database_files()
+        market_hours_database = Singleton(MarketHoursDatabase, lean_config_manager)
+
+        shortcut_manager = Singleton(ShortcutManager, logger, lean_config_manager, platform_manager, cache_storage)
+        update_manager = Singleton(UpdateManager, logger, http_client, cache_storage, docker_manager.provider)
+
+    return Container()
+
+
+class _LazyContainer:
+    """The _LazyContainer class creates the container the first time one of its providers is accessed."""
+
+    def __init__(self) -> None:
+        """Creates a new _LazyContainer instance."""
+        self._container = None
+
+    def is_created(self) -> bool:
+        """Returns whether the container has been created.
+
+        :return: True if a component has been requested before, False if not
+        """
+        return self._container is not None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._container is None:
+            self._container = _create_container()
+
+        return getattr(self._container, name)
+
+
+container = _LazyContainer()
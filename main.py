@@ -18,8 +18,6 @@ import site
 import sys
 import time
 from pathlib import Path
-print("debugger import")
-import debugpy; debugpy.listen(('0.0.0.0', 5678)); debugpy.wait_for_client()
 
 # Docker's pywin32 dependency on Windows is a common source of issues
 # In a lot of cases you'd have to manually run pywin32's post-install script as admin after pip installing the library
@@ -86,27 +84,58 @@ def _ensure_win32_available() -> None:
 if platform.system() == "Windows":
     _ensure_win32_available()
 
+# The startup profiler needs to be enabled before the CLI's own modules and dependencies are imported
+# It can't wait for click to parse --profile-startup, so we check the raw arguments instead
+from lean.components.util.startup_profiler import startup_profiler
+
+
+def _is_startup_profiling_requested() -> bool:
+    # --profile-startup is an option of the lean group, so it comes before the command
+    # The values of the group's other options may look like options too, so they are skipped
+    arguments = iter(sys.argv[1:])
+    for argument in arguments:
+        if argument == "--profile-startup":
+            return True
+
+        if argument in ["--profile-startup-output", "--trace-http-output"]:
+            next(arguments, None)
+        elif not argument.startswith("-"):
+            return False
+
+    return False
+
+
+if _is_startup_profiling_requested():
+    startup_profiler.enable()
+
 import traceback
 from io import StringIO
 
 import click
-import requests
-from pydantic import ValidationError
 
 from lean.commands import lean
 from lean.container import container
 from lean.models.errors import MoreInfoError
 
+if startup_profiler.enabled:
+    startup_profiler.profile_container(container)
+
 
 def main() -> None:
     """This function is the entrypoint when running a Lean command in a terminal."""
     try:
         lean.main(standalone_mode=False)
 
-        temp_manager = container.temp_manager()
-        if temp_manager.delete_temporary_directories_when_done:
-            temp_manager.delete_temporary_directories()
+        # Commands which don't need any components, like `lean whoami --help`, never create the container
+        if container.is_created():
+            temp_manager = container.temp_manager()
+            if temp_manager.delete_temporary_directories_when_done:
+                temp_manager.delete_temporary_directories()
     except Exception as exception:
+        # These are imported here because they are slow to import and only needed when something went wrong
+        import requests
+        from pydantic import ValidationError
+
         logger = container.logger()
         logger.debug(traceback.format_exc().strip())
 
@@ -142,3 +171,9 @@ def main() -> None:
             temp_manager.delete_temporary_directories()
 
         sys.exit(1)
+    finally:
+        if startup_profiler.enabled:
+            startup_profiler.report(container.logger())
+
+        if container.is_created() and container.http_tracer().enabled:
+            container.http_tracer().report(container.logger())
@@ -12,50 +12,70 @@
 # limitations under the License.
 
 import os
-from typing import Dict, Type, List
+from pathlib import Path
+from typing import Any, Dict, List
+
 from lean.container import container
-from lean.models.json_module_config import LeanConfigConfigurer
-import json
-from lean.models.brokerages.local.json_brokerage import JsonBrokerage
-from lean.models.brokerages.local.json_data_feed import JsonDataFeed
 from lean.models.brokerages.local.json_module import JsonModule
-from lean.models.data_providers.json_data_provider import JsonDataProvider
-
-all_local_brokerages = []
-all_local_data_feeds = []
-historyProviders = []
-all_data_providers = [] 
-brokeragesAndDataQueueHandlers = {}
-
-dirname = os.path.dirname(__file__)
-filename = os.path.join(dirname, '../../../cli_data.json')
-with open(filename) as f: 
-    data = json.load(f)
-    json_modules = data['modules']   
-    for json_module in json_modules:
-        brokerage = dataQueueHandler = dataProviders = None
-        if "brokerage" in json_module["type"]:
-            brokerage = JsonBrokerage(json_module)
-            all_local_brokerages.append(brokerage)
-        if "data-queue-handler" in json_module["type"]:
-            dataQueueHandler = JsonDataFeed(json_module)
-            all_local_data_feeds.append(dataQueueHandler)
-        if "data-provider" in json_module["type"]:
-            dataProviders = JsonDataProvider(json_module)
-            all_data_providers.append(dataProviders)
-        if "history-provider" in json_module["type"]:
-            pass
-        if brokerage != None and dataQueueHandler != None:
-            brokeragesAndDataQueueHandlers.update({brokerage:[dataQueueHandler]})
-
-local_brokerage_data_feeds: Dict[Type[JsonModule], List[Type[LeanConfigConfigurer]]] = brokeragesAndDataQueueHandlers
-
-if container.platform_manager().is_host_windows() or os.environ.get("__README__", "false") == "true":
-    [iqfeed_data_feed] = [data_feed for data_feed in all_local_data_feeds if data_feed.get_name() == "IQFeed"]
-    for key in local_brokerage_data_feeds.keys():
-        local_brokerage_data_feeds[key].append(iqfeed_data_feed)
-# remove iqfeed from avaiable local data feeds
-else:
-    all_local_data_feeds = [data_feed for data_feed in all_local_data_feeds if data_feed.get_name() != "IQFeed"]
-
-[QuantConnectDataProvider] = [data_provider for data_provider in all_data_providers if data_provider.get_name() == "QuantConnect"]
\ No newline at end of file
+from lean.models.brokerages.local.module_registry import LocalModuleRegistry
+
+# The JsonModule instances are built lazily, so commands only pay for the modules they actually use
+local_module_registry = LocalModuleRegistry(Path(__file__).parent.parent.parent.parent / "cli_data.json",
+                                            container.cache_storage())
+
+
+def _is_iqfeed_available() -> bool:
+    """Returns whether the IQFeed data feed can be used on the current host.
+
+    :return: True if IQFeed can be used, False if not
+    """
+    return container.platform_manager().is_host_windows() or os.environ.get("__README__", "false") == "true"
+
+
+def get_local_data_feeds() -> List[JsonModule]:
+    """Returns all data feeds which can be used for local live trading on the current host.
+
+    :return: the JsonDataFeed instances of all available data feeds
+    """
+    return [local_module_registry.get_module("data-queue-handler", name)
+            for name in local_module_registry.get_names("data-queue-handler")
+            if name != "IQFeed" or _is_iqfeed_available()]
+
+
+def get_local_brokerage_data_feeds() -> Dict[JsonModule, List[JsonModule]]:
+    """Returns the data feeds that can be used with each local brokerage.
+
+    :return: a dict containing the JsonBrokerage instances and the JsonDataFeed instances that can be used with them
+    """
+    brokerage_data_feeds = {}
+
+    for name in local_module_registry.get_names("brokerage"):
+        if not local_module_registry.has_types(name, ["data-queue-handler"]):
+            continue
+
+        brokerage = local_module_registry.get_module("brokerage", name)
+        brokerage_data_feeds[brokerage] = [local_module_registry.get_module("data-queue-handler", name)]
+
+        if _is_iqfeed_available():
+            brokerage_data_feeds[brokerage].append(local_module_registry.get_module("data-queue-handler", "IQFeed"))
+
+    return brokerage_data_feeds
+
+
+_lazy_attributes = {
+    "all_local_brokerages": lambda: local_module_registry.get_modules("brokerage"),
+    "all_local_data_feeds": get_local_data_feeds,
+    "all_data_providers": lambda: local_module_registry.get_modules("data-provider"),
+    "local_brokerage_data_feeds": get_local_brokerage_data_feeds,
+    "QuantConnectDataProvider": lambda: local_module_registry.get_module("data-provider", "QuantConnect")
+}
+
+
+def __getattr__(name: str) -> Any:
+    # The module-level collections are kept for backwards compatibility, but are only built when they are accessed
+    if name in _lazy_attributes:
+        value = _lazy_attributes[name]()
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
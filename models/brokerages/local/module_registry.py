@@ -0,0 +1,128 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from lean.components.config.storage import Storage
+from lean.models.brokerages.local.json_brokerage import JsonBrokerage
+from lean.models.brokerages.local.json_data_feed import JsonDataFeed
+from lean.models.brokerages.local.json_module import JsonModule
+from lean.models.data_providers.json_data_provider import JsonDataProvider
+
+# The module types that can be built, mapped to the JsonModule implementation used for them
+_module_classes: Dict[str, Type[JsonModule]] = {
+    "brokerage": JsonBrokerage,
+    "data-queue-handler": JsonDataFeed,
+    "data-provider": JsonDataProvider
+}
+
+
+class LocalModuleRegistry:
+    """The LocalModuleRegistry class provides lazy access to the modules defined in cli_data.json.
+
+    The registry keeps a compact name -> types index of the module catalog, which is cached on disk by file hash.
+    JsonModule instances are only built when they are requested, and are reused for subsequent requests.
+    """
+
+    def __init__(self, catalog_file: Path, cache_storage: Storage) -> None:
+        """Creates a new LocalModuleRegistry instance.
+
+        :param catalog_file: the path to the cli_data.json file containing the module catalog
+        :param cache_storage: the Storage instance to cache the parsed catalog index in
+        """
+        self._catalog_file = catalog_file
+        self._cache_storage = cache_storage
+        self._index: Optional[List[Dict[str, Any]]] = None
+        self._module_data: Optional[Dict[str, Dict[str, Any]]] = None
+        self._modules: Dict[Tuple[str, str], JsonModule] = {}
+
+    def get_names(self, module_type: str) -> List[str]:
+        """Returns the names of all modules of a given type without building them.
+
+        :param module_type: the type of the modules, like "brokerage", "data-queue-handler" or "data-provider"
+        :return: the names of the modules of the given type, in the order they are defined in the catalog
+        """
+        return [entry["name"] for entry in self._get_index() if module_type in entry["types"]]
+
+    def get_module(self, module_type: str, name: str) -> JsonModule:
+        """Returns the module of a given type with a given name, building it if it hasn't been built yet.
+
+        Raises an error if no module with the given type and name exists.
+
+        :param module_type: the type of the module
+        :param name: the name of the module
+        :return: the JsonModule instance of the module
+        """
+        key = (module_type, name)
+        if key in self._modules:
+            return self._modules[key]
+
+        if name not in self.get_names(module_type):
+            raise RuntimeError(f"There is no {module_type} named '{name}'")
+
+        module = _module_classes[module_type](self._get_module_data()[name])
+        self._modules[key] = module
+
+        return module
+
+    def get_modules(self, module_type: str) -> List[JsonModule]:
+        """Returns all modules of a given type, building the ones that haven't been built yet.
+
+        :param module_type: the type of the modules
+        :return: the JsonModule instances of all modules of the given type
+        """
+        return [self.get_module(module_type, name) for name in self.get_names(module_type)]
+
+    def has_types(self, name: str, module_types: List[str]) -> bool:
+        """Returns whether a module has all given types.
+
+        :param name: the name of the module
+        :param module_types: the types the module should have
+        :return: True if a module with the given name exists and has all given types, False if not
+        """
+        entry = next((entry for entry in self._get_index() if entry["name"] == name), None)
+        return entry is not None and all(module_type in entry["types"] for module_type in module_types)
+
+    def _get_index(self) -> List[Dict[str, Any]]:
+        """Returns the compact index of the catalog, reading it from the disk cache if the catalog hasn't changed.
+
+        :return: a list containing the name and types of every module in the catalog
+        """
+        if self._index is not None:
+            return self._index
+
+        catalog_hash = hashlib.sha256(self._catalog_file.read_bytes()).hexdigest()
+
+        cached_catalog = self._cache_storage.get("local-module-catalog", {})
+        if cached_catalog.get("hash", None) == catalog_hash:
+            self._index = cached_catalog["modules"]
+            return self._index
+
+        self._index = [{"name": data["name"], "types": data["type"]} for data in self._get_module_data().values()]
+        self._cache_storage.set("local-module-catalog", {"hash": catalog_hash, "modules": self._index})
+
+        return self._index
+
+    def _get_module_data(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the raw module definitions in the catalog.
+
+        :return: a dict containing the definition of every module in the catalog, keyed by module name
+        """
+        if self._module_data is None:
+            catalog = json.loads(self._catalog_file.read_text(encoding="utf-8"))
+            self._module_data = {data["name"]: data for data in catalog["modules"]}
+
+        return self._module_data
@@ -12,18 +12,23 @@
 # limitations under the License.
 
 import abc
-import multiprocessing
+import json
+import os
 import re
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
-from typing import List, Any, Optional, Dict, Set, Tuple, Pattern
+from functools import partial
+from pathlib import Path
+from typing import List, Any, Optional, Dict, Set, Tuple, Pattern, Callable, Iterator
 
 import click
-from dateutil.rrule import rrule, DAILY
 from joblib import Parallel, delayed
-from pydantic import validator
+from pydantic import PrivateAttr, validator
 
 from lean.click import DateParameter
+from lean.components.api.listing_cache import FileListing
+from lean.components.util.system_resources import get_available_cpus
+from lean.constants import LISTING_MAX_CONCURRENCY, LISTING_CONCURRENCY_PER_CPU
 from lean.container import container
 from lean.models.api import QCDataVendor
 from lean.models.logger import Option
@@ -337,42 +342,283 @@ class DataFile(WrappedBaseModel):
     vendor: QCDataVendor
 
 
+class DownloadPlanProduct(WrappedBaseModel):
+    dataset: str
+    vendor: str
+    details: List[str]
+    file_count: int
+    price: float
+
+
+class DownloadPlan(WrappedBaseModel):
+    """A DownloadPlan contains everything needed to purchase and download a list of products."""
+    organization_id: str
+    products: List[DownloadPlanProduct]
+    data_files: List[DataFile]
+    total_price: float
+
+    def get_summed_price(self) -> float:
+        """Returns the sum of the prices of the products, which counts files shared by multiple products repeatedly.
+
+        :return: the sum of the prices of all products in QCC
+        """
+        return sum(product.price for product in self.products)
+
+    def save(self, file: Path) -> None:
+        """Saves the plan to a JSON file.
+
+        The data files are grouped by vendor and price, so the price and name of a vendor are only stored once
+        for all files of that vendor with the same price.
+
+        :param file: the path to the file to save the plan to
+        """
+        vendors = {}
+        for data_file in self.data_files:
+            key = (data_file.vendor.vendorName, data_file.vendor.price)
+            if key not in vendors:
+                vendors[key] = {"name": key[0], "price": key[1], "files": []}
+            vendors[key]["files"].append(data_file.file)
+
+        content = {
+            "organization-id": self.organization_id,
+            "products": [product.dict() for product in self.products],
+            "total-price": self.total_price,
+            "vendors": list(vendors.values())
+        }
+
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with file.open("w+", encoding="utf-8") as f:
+            f.write(json.dumps(content, indent=4) + "\n")
+
+    @classmethod
+    def load(cls, file: Path) -> 'DownloadPlan':
+        """Loads a plan that was saved with save().
+
+        :param file: the path to the file to load the plan from
+        :return: the loaded plan
+        """
+        content = json.loads(file.read_text(encoding="utf-8"))
+
+        data_files = []
+        for vendor_content in content["vendors"]:
+            # The regex of the vendor is only needed to map files to vendors, which has been done already
+            vendor = QCDataVendor(vendorName=vendor_content["name"], regex=None, price=vendor_content["price"])
+            data_files.extend(DataFile(file=file, vendor=vendor) for file in vendor_content["files"])
+
+        return DownloadPlan(organization_id=content["organization-id"],
+                            products=[DownloadPlanProduct(**product) for product in content["products"]],
+                            data_files=sorted(data_files, key=lambda data_file: data_file.file),
+                            total_price=content["total-price"])
+
+
 class DataFileGroup(WrappedBaseModel, abc.ABC):
     prefix: str
 
-    def get_valid_files(self, files_with_prefix: Optional[List[str]]) -> Set[str]:
+    def get_valid_files(self, files_with_prefix: Optional[FileListing]) -> Set[str]:
         raise NotImplementedError()
 
 
 class DataFileAllGroup(DataFileGroup):
-    possible_files: Set[str]
+    # Generates the possible files, so they are streamed instead of kept in memory for the lifetime of the group
+    possible_files: Callable[[], Iterator[str]]
 
-    def get_valid_files(self, files_with_prefix: Optional[List[str]]) -> Set[str]:
+    def get_valid_files(self, files_with_prefix: Optional[FileListing]) -> Set[str]:
         if files_with_prefix is not None:
-            return self.possible_files.intersection(files_with_prefix)
+            return files_with_prefix.filter_listed(self.possible_files())
 
-        return self.possible_files
+        return set(self.possible_files())
 
 
 class DataFileLatestGroup(DataFileGroup):
     regex: Pattern
 
-    def get_valid_files(self, files_with_prefix: Optional[List[str]]) -> Set[str]:
+    def get_valid_files(self, files_with_prefix: Optional[FileListing]) -> Set[str]:
         if files_with_prefix is not None:
-            matching_files = [file for file in files_with_prefix if self.regex.match(file) is not None]
-            if len(matching_files) > 0:
-                return {sorted(matching_files)[-1]}
+            latest_file = files_with_prefix.find_last(self.regex)
+            if latest_file is not None:
+                return {latest_file}
 
         return set()
 
 
+class _PathTemplate:
+    """A _PathTemplate is a path template that is parsed once and rendered for every day in a date range.
+
+    Variables can be referenced in the template by putting accolades around them.
+    Example template: "path/to/{date}.zip" (date is a referenced variable here)
+    """
+
+    # The variables which get a different value for every day in a date range
+    _date_variables = ["date", "year", "month", "day"]
+
+    def __init__(self, template: str, variables: Dict[str, Any]) -> None:
+        """Creates a new _PathTemplate instance, rendering all variables except the date variables.
+
+        :param template: the template to render
+        :param variables: the variables that are accessible to the template
+        """
+        self._parts: List[str] = []
+        self._date_parts: List[Tuple[int, str]] = []
+
+        # re.split() with a capturing group alternates between literal text and variable names
+        for index, part in enumerate(re.split(r"\{([^{}]*)\}", template)):
+            if index % 2 == 0:
+                self._append_literal(part)
+            elif part in self._date_variables:
+                self._date_parts.append((len(self._parts), part))
+                self._parts.append("")
+            elif part in variables:
+                self._append_literal(self._format_value(variables[part]))
+            else:
+                self._append_literal("{" + part + "}")
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        """Renders the template with values for the date variables.
+
+        :param variables: the values of the date variables, date variables without a value are not rendered
+        :return: the rendered template
+        """
+        parts = self._parts.copy()
+        for index, name in self._date_parts:
+            parts[index] = self._format_value(variables[name]) if name in variables else "{" + name + "}"
+        return "".join(parts)
+
+    def render_range(self, start: datetime, end: datetime) -> Iterator[str]:
+        """Renders the template for every day in a date range.
+
+        :param start: the first day to render the template for
+        :param end: the last day to render the template for, inclusive
+        :return: an iterator yielding the rendered template of every day in the range in chronological order
+        """
+        parts = self._parts.copy()
+
+        for ordinal in range(start.toordinal(), end.toordinal() + 1):
+            values = self._get_date_values(date.fromordinal(ordinal))
+
+            for index, name in self._date_parts:
+                parts[index] = values[name]
+
+            yield "".join(parts)
+
+    def get_range_prefix(self, start: datetime, end: datetime) -> str:
+        """Returns the common prefix of the rendered templates of all days in a date range.
+
+        The rendered templates are not generated, the prefix follows from the template and the first and last day.
+
+        :param start: the first day in the range
+        :param end: the last day in the range, inclusive
+        :return: the longest prefix all rendered templates in the range share
+        """
+        date_names = dict(self._date_parts)
+        start_values = self._get_date_values(start)
+        end_values = self._get_date_values(end)
+
+        prefix = ""
+        for index, part in enumerate(self._parts):
+            if index not in date_names:
+                prefix += part
+                continue
+
+            name = date_names[index]
+
+            # A date variable has the same value for every day in the range if the range is within a single period
+            if self._is_constant_in_range(name, start, end):
+                prefix += start_values[name]
+                continue
+
+            # Otherwise every day's value sorts between the first and last one if the range is within a larger period
+            # {date} and {year} always do, {month} only within a year and {day} only within a month
+            if self._is_bounded_in_range(name, start, end):
+                prefix += os.path.commonprefix([start_values[name], end_values[name]])
+
+            break
+
+        return prefix
+
+    def _is_constant_in_range(self, name: str, start: datetime, end: datetime) -> bool:
+        """Returns whether a date variable has the same value for every day in a date range.
+
+        :param name: the name of the date variable
+        :param start: the first day in the range
+        :param end: the last day in the range, inclusive
+        :return: True if the value of the variable is the same for the first and last day and every day in between
+        """
+        if name == "year":
+            return start.year == end.year
+        elif name == "month":
+            return (start.year, start.month) == (end.year, end.month)
+        return start.date() == end.date()
+
+    def _is_bounded_in_range(self, name: str, start: datetime, end: datetime) -> bool:
+        """Returns whether the value of a date variable of every day in a date range sorts between the outer days.
+
+        :param name: the name of the date variable
+        :param start: the first day in the range
+        :param end: the last day in the range, inclusive
+        :return: True if every day's value sorts between the values of the first and last day, False if not
+        """
+        if name == "month":
+            return start.year == end.year
+        elif name == "day":
+            return (start.year, start.month) == (end.year, end.month)
+        return True
+
+    def _get_date_values(self, day: date) -> Dict[str, str]:
+        """Returns the values of the date variables for a day.
+
+        Formatting the date components directly is a lot faster than calling strftime() for every variable.
+
+        :param day: the day to get the values of the date variables for
+        :return: the values of the date variables
+        """
+        year = f"{day.year:04d}"
+        month = f"{day.month:02d}"
+        day_of_month = f"{day.day:02d}"
+        return {"date": year + month + day_of_month, "year": year, "month": month, "day": day_of_month}
+
+    def _append_literal(self, text: str) -> None:
+        """Appends literal text to the parts of the template, merging it with a preceding literal part.
+
+        :param text: the text to append
+        """
+        if len(self._parts) > 0 and (len(self._date_parts) == 0 or self._date_parts[-1][0] != len(self._parts) - 1):
+            self._parts[-1] += text
+        else:
+            self._parts.append(text)
+
+    def _format_value(self, value: Any) -> str:
+        """Formats the value of a variable.
+
+        :param value: the value to format
+        :return: the value as it appears in a rendered template
+        """
+        if isinstance(value, datetime):
+            return value.strftime("%Y%m%d")
+        return str(value)
+
+
 class Product(WrappedBaseModel):
     dataset: Dataset
     option_results: Dict[str, OptionResult]
 
+    # The data files of the product, which are expanded the first time they are requested
+    _data_files: Optional[List[str]] = PrivateAttr(default=None)
+
     def get_data_files(self) -> List[str]:
         """Returns all data files for the given product configuration.
 
+        The files are expanded the first time they are requested, later calls return the same files.
+
+        :return: the list of files that need to be downloaded for this product
+        """
+        if self._data_files is None:
+            self._data_files = self._expand_data_files()
+
+        return self._data_files
+
+    def _expand_data_files(self) -> List[str]:
+        """Expands the product configuration into the data files that exist remotely.
+
         :return: the list of files that need to be downloaded for this product
         """
         groups = []
@@ -394,7 +640,9 @@ class Product(WrappedBaseModel):
         prefixes = set(group.prefix for group in groups)
         prefixes_to_files = {}
 
-        parallel = Parallel(n_jobs=max(1, multiprocessing.cpu_count() - 1), backend="threading")
+        # Listing files is I/O-bound, so it uses multiple threads per available CPU
+        listing_concurrency = min(LISTING_MAX_CONCURRENCY, int(get_available_cpus() * LISTING_CONCURRENCY_PER_CPU))
+        parallel = Parallel(n_jobs=max(1, min(listing_concurrency, len(prefixes))), backend="threading")
         for prefix, files_with_prefix in parallel(delayed(self._list_files)(prefix) for prefix in prefixes):
             prefixes_to_files[prefix] = files_with_prefix
 
@@ -419,25 +667,21 @@ class Product(WrappedBaseModel):
             start = variables.get("start", None)
             end = variables.get("end", None)
 
-            possible_files = set()
+            # The template is parsed once, after which rendering it for a day only joins a few strings
+            path_template = _PathTemplate(template, variables)
 
             if has_start_end and start is not None and end is not None:
-                variables_to_use = {**variables}
-                for date in rrule(DAILY, dtstart=start, until=end):
-                    variables_to_use["date"] = date
-                    variables_to_use["year"] = date.strftime("%Y")
-                    variables_to_use["month"] = date.strftime("%m")
-                    variables_to_use["day"] = date.strftime("%d")
-                    possible_files.add(self._render_template(template, variables_to_use))
+                prefix = path_template.get_range_prefix(start, end)
+                possible_files = partial(path_template.render_range, start, end)
             else:
-                possible_files.add(self._render_template(template, variables))
-
-            prefix = self._get_common_prefix(list(possible_files))
+                rendered_template = path_template.render(variables)
+                prefix = rendered_template
+                possible_files = partial(iter, [rendered_template])
 
             groups.append(DataFileAllGroup(prefix=prefix, possible_files=possible_files))
 
         for regex_template in path_to_use.templates.latest:
-            rendered_regex = self._render_template(regex_template, variables)
+            rendered_regex = _PathTemplate(regex_template, variables).render(variables)
 
             prefix = re.split(r"[\\[\]()]", rendered_regex)[0]
             compiled_regex = re.compile(rendered_regex)
@@ -446,42 +690,9 @@ class Product(WrappedBaseModel):
 
         return groups
 
-    def _list_files(self, prefix: str) -> Tuple[str, Optional[List[str]]]:
+    def _list_files(self, prefix: str) -> Tuple[str, Optional[FileListing]]:
         if len(prefix.split("/")) < 3:
             # Cannot get cloud directory listing less than 3 levels deep
             return prefix, None
         else:
             return prefix, container.api_client().data.list_files(prefix)
-
-    def _get_common_prefix(self, values: List[str]) -> str:
-        """Finds the common prefix in a list of strings.
-
-        :param values: the strings to find the common prefix of
-        :return: the common prefix of the given strings
-        """
-        shortest_value = min(values, key=len)
-
-        for index, character in enumerate(shortest_value):
-            for value in values:
-                if value[index] != character:
-                    return shortest_value[:index]
-
-        return shortest_value
-
-    def _render_template(self, template: str, variables: Dict[str, str]) -> str:
-        """Renders a template string with variables.
-
-        Variables can be referenced in the template by putting accolades around them.
-        Example template: "path/to/{date}.zip" (date is a referenced variable here)
-
-        :param template: the template to render
-        :param variables: the variables that are accessible to the template
-        :return: the rendered template
-        """
-        for key, value in variables.items():
-            if isinstance(value, datetime):
-                value = value.strftime("%Y%m%d")
-
-            template = template.replace("{" + key + "}", str(value))
-
-        return template
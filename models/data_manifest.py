@@ -0,0 +1,27 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from datetime import datetime
+from typing import Optional
+
+from lean.models.pydantic import WrappedBaseModel
+
+
+class DataManifestEntry(WrappedBaseModel):
+    """The DataManifestEntry class represents a file in the data directory that was downloaded by the CLI."""
+    path: str
+    size: int
+    sha256: Optional[str]
+    vendor: Optional[str]
+    downloaded_at: datetime
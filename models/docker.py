@@ -11,6 +11,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from typing import Optional
+
 from lean.models.pydantic import WrappedBaseModel
 
 
@@ -39,3 +41,20 @@ class DockerImage(WrappedBaseModel):
         :return: the full name of the image in name:tag format
         """
         return f"{self.name}:{self.tag}"
+
+
+class DockerResources(WrappedBaseModel):
+    """The resources a LEAN engine container may use, None values leave the resource unlimited."""
+    cpus: Optional[float] = None
+    memory: Optional[str] = None
+    cpuset_cpus: Optional[str] = None
+    numa_node: Optional[int] = None
+    shm_size: Optional[str] = None
+
+    def override(self, other: 'DockerResources') -> 'DockerResources':
+        """Returns a copy of these resources with all values that are set in other replaced.
+
+        :param other: the resources that take precedence
+        :return: the combined resources
+        """
+        return self.copy(update={key: value for key, value in other.dict().items() if value is not None})
@@ -0,0 +1,162 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+
+"""Benchmarks planning the data files of a multi-decade, multi-symbol product against rendering every day's path.
+
+Run with `python tests/benchmarks/bench_data_file_planning.py [symbols] [years]` from an environment in which lean is
+installed. Both planners select the same files from listings containing a file for every weekday in the range,
+the listings are created up front so only the planning itself is measured.
+"""
+
+import sys
+from datetime import datetime
+from functools import partial
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Set
+
+from dateutil.rrule import DAILY, rrule
+
+from lean.components.api.listing_cache import FileListing
+from lean.models.data import DataFileAllGroup, _PathTemplate
+
+_templates = [
+    "equity/usa/minute/{ticker}/{date}_trade.zip",
+    "equity/usa/minute/{ticker}/{date}_quote.zip",
+    "alternative/vendor/{ticker}/{year}/{month}/{day}.csv"
+]
+
+
+def _render_template(template: str, variables: Dict[str, Any]) -> str:
+    """Renders a template by replacing every variable, like the planner did before templates were parsed once.
+
+    :param template: the template to render
+    :param variables: the variables that are accessible to the template
+    :return: the rendered template
+    """
+    for key, value in variables.items():
+        if isinstance(value, datetime):
+            value = value.strftime("%Y%m%d")
+
+        template = template.replace("{" + key + "}", str(value))
+
+    return template
+
+
+def _get_common_prefix(values: List[str]) -> str:
+    """Finds the common prefix of strings character by character, like the planner did before.
+
+    :param values: the strings to find the common prefix of
+    :return: the common prefix of the given strings
+    """
+    shortest_value = min(values, key=len)
+
+    for index, character in enumerate(shortest_value):
+        for value in values:
+            if value[index] != character:
+                return shortest_value[:index]
+
+    return shortest_value
+
+
+def _plan_by_rendering(template: str, variables: Dict[str, Any], listings: Dict[str, FileListing]) -> Set[str]:
+    """Selects the data files of a template by rendering it for every day in the range.
+
+    :param template: the template to select the files of
+    :param variables: the variables that are accessible to the template, including the start and end of the range
+    :param listings: the listings of the remote files by prefix
+    :return: the files that exist remotely
+    """
+    possible_files = set()
+    variables_to_use = {**variables}
+    for day in rrule(DAILY, dtstart=variables["start"], until=variables["end"]):
+        variables_to_use["date"] = day
+        variables_to_use["year"] = day.strftime("%Y")
+        variables_to_use["month"] = day.strftime("%m")
+        variables_to_use["day"] = day.strftime("%d")
+        possible_files.add(_render_template(template, variables_to_use))
+
+    prefix = _get_common_prefix(list(possible_files))
+    return possible_files.intersection(listings[prefix])
+
+
+def _plan_by_template(template: str, variables: Dict[str, Any], listings: Dict[str, FileListing]) -> Set[str]:
+    """Selects the data files of a template with a template that is parsed once.
+
+    :param template: the template to select the files of
+    :param variables: the variables that are accessible to the template, including the start and end of the range
+    :param listings: the listings of the remote files by prefix
+    :return: the files that exist remotely
+    """
+    path_template = _PathTemplate(template, variables)
+    prefix = path_template.get_range_prefix(variables["start"], variables["end"])
+
+    group = DataFileAllGroup(prefix=prefix,
+                             possible_files=partial(path_template.render_range, variables["start"], variables["end"]))
+    return group.get_valid_files(listings[prefix])
+
+
+def _measure(name: str, plan: Callable[[], List[Set[str]]]) -> List[Set[str]]:
+    """Plans the data files of all symbols and templates and prints the duration.
+
+    :param name: the name of the measured planner
+    :param plan: the function planning the files of all symbols and templates
+    :return: the planned files of every symbol and template
+    """
+    start_time = perf_counter()
+    files = plan()
+    print(f"{name:<40} {perf_counter() - start_time:>10,.2f} s")
+    return files
+
+
+def main() -> None:
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 22
+
+    start = datetime(2000, 1, 1)
+    end = datetime(2000 + years - 1, 12, 31)
+    weekdays = [day for day in rrule(DAILY, dtstart=start, until=end) if day.weekday() < 5]
+
+    jobs = []
+    listings = {}
+    for symbol in range(symbols):
+        for template in _templates:
+            variables = {"ticker": f"symbol{symbol}", "start": start, "end": end}
+            jobs.append((template, variables))
+
+            # Both planners list the same prefix, of which the listing contains the files of every weekday
+            path_template = _PathTemplate(template, variables)
+            prefix = path_template.get_range_prefix(start, end)
+            files = [path_template.render({"date": day.strftime("%Y%m%d"),
+                                           "year": day.strftime("%Y"),
+                                           "month": day.strftime("%m"),
+                                           "day": day.strftime("%d")}) for day in weekdays]
+            listings[prefix] = FileListing(prefix, files, float("inf"))
+
+    print(f"Planning {symbols} symbols x {len(_templates)} templates x {years} years")
+    before_start = perf_counter()
+    before = _measure("Rendering every day", lambda: [_plan_by_rendering(*job, listings) for job in jobs])
+    before_duration = perf_counter() - before_start
+    after_start = perf_counter()
+    after = _measure("Parsed templates", lambda: [_plan_by_template(*job, listings) for job in jobs])
+    after_duration = perf_counter() - after_start
+
+    if before != after:
+        raise RuntimeError("The planners selected different files")
+
+    print(f"Speedup: {before_duration / after_duration:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Benchmarks sending requests through the pooled sessions of HTTPClient against one connection per request.
+
+Run with `python tests/benchmarks/bench_http_pooling.py [requests] [threads]` from an environment in which lean is
+installed. The stand-in server runs on localhost without TLS, so the handshake savings of real API calls and data
+downloads, which add a TLS handshake and a network round trip per connection, are larger than measured here.
+"""
+
+import http.server
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Callable
+
+import requests
+
+from lean.container import container
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """A request handler which returns a small JSON body over keep-alive connections, like most API endpoints."""
+
+    protocol_version = "HTTP/1.1"
+
+    # The headers and the body are written separately, which Nagle's algorithm delays on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        body = b'{"success": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _measure(name: str, send: Callable[[], None], total_requests: int, threads: int) -> float:
+    """Sends requests on multiple threads and prints the throughput.
+
+    :param name: the name of the measured approach
+    :param send: the function sending a single request
+    :param total_requests: the amount of requests to send
+    :param threads: the amount of threads to send requests on
+    :return: the amount of requests per second
+    """
+    start_time = perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(send) for _ in range(total_requests)]:
+            future.result()
+
+    requests_per_second = total_requests / (perf_counter() - start_time)
+    print(f"{name:<40} {requests_per_second:>10,.0f} requests/s")
+    return requests_per_second
+
+
+def main() -> None:
+    total_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://127.0.0.1:{server.server_port}/api/v2/data/read"
+    http_client = container.http_client()
+
+    print(f"Sending {total_requests:,} requests on {threads} threads")
+    before = _measure("requests.post (connection per request)",
+                      lambda: requests.post(url, json={"format": "link"}).raise_for_status(),
+                      total_requests,
+                      threads)
+    after = _measure("HTTPClient.post (pooled sessions)",
+                     lambda: http_client.post(url, json={"format": "link"}),
+                     total_requests,
+                     threads)
+    print(f"Speedup: {after / before:.2f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+
+"""Benchmarks printing container output with LineSplitter and LogStreamPrinter against printing it line by line.
+
+Run with `python tests/benchmarks/bench_log_stream.py [lines]` from an environment in which lean is installed.
+A synthetic log generator produces LEAN-like log lines in 4 KiB chunks, like Docker streams container output.
+Output goes to the null device, so the numbers measure the CLI and not the speed of the terminal.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, List
+
+from rich.console import Console
+
+from lean.components.util.log_stream import LineSplitter, LogStreamPrinter
+from lean.components.util.logger import Logger
+
+
+def _generate_chunks(lines: int, chunk_size: int = 4096) -> List[bytes]:
+    """Generates container output consisting of LEAN-like log lines, split into fixed-size chunks.
+
+    :param lines: the amount of lines to generate
+    :param chunk_size: the size of the chunks the output is split into
+    :return: the chunks of the output, of which most end in the middle of a line
+    """
+    output = b"".join(f"2021-01-04 14:31:00 TRACE:: Algorithm.OnData(): order {index} filled at 373.21 "
+                      f"quantity 10 symbol SPY R735QTJ8XC9X\n".encode("utf-8") for index in range(lines))
+    return [output[start:start + chunk_size] for start in range(0, len(output), chunk_size)]
+
+
+def _create_logger(is_tty: bool) -> Logger:
+    """Creates a logger which writes to the null device.
+
+    :param is_tty: whether the console should behave like it writes to a terminal
+    :return: the logger
+    """
+    logger = Logger()
+    logger._console = Console(file=open(os.devnull, "w", encoding="utf-8"),
+                              force_terminal=is_tty,
+                              markup=False,
+                              highlight=False,
+                              emoji=False)
+    return logger
+
+
+def _print_by_line(chunks: List[bytes], logger: Logger) -> None:
+    """Prints output like run_image() did before, by growing a bytes buffer and printing every line separately.
+
+    :param chunks: the chunks of the output
+    :param logger: the logger to print the lines with
+    """
+    chunk_buffer = bytes()
+    for chunk in chunks:
+        chunk_buffer += chunk
+        if not chunk_buffer.endswith(b"\n"):
+            continue
+
+        for line in chunk_buffer.decode("utf-8").splitlines():
+            logger.info(line)
+        chunk_buffer = bytes()
+
+
+def _print_in_blocks(chunks: List[bytes], printer: LogStreamPrinter) -> None:
+    """Prints output like run_image() does, by splitting it into blocks of complete lines.
+
+    :param chunks: the chunks of the output
+    :param printer: the printer to print the blocks with
+    """
+    line_splitter = LineSplitter()
+    for chunk in chunks:
+        block = line_splitter.feed(chunk)
+        if block is not None:
+            printer.write(block)
+
+    block = line_splitter.flush()
+    if block is not None:
+        printer.write(block)
+
+    printer.close()
+
+
+def _measure(name: str, print_output: Callable[[], None], lines: int) -> float:
+    """Prints the generated output and prints the throughput.
+
+    :param name: the name of the measured approach
+    :param print_output: the function printing all generated output
+    :param lines: the amount of generated lines
+    :return: the amount of lines per second
+    """
+    start_time = perf_counter()
+    print_output()
+    lines_per_second = lines / (perf_counter() - start_time)
+    print(f"{name:<50} {lines_per_second:>12,.0f} lines/s")
+    return lines_per_second
+
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    chunks = _generate_chunks(lines)
+    log_directory = Path(tempfile.mkdtemp())
+
+    print(f"Printing {lines:,} lines in {len(chunks):,} chunks of 4 KiB")
+
+    for is_tty in [False, True]:
+        kind = "terminal" if is_tty else "pipe"
+        _measure(f"Line by line ({kind})", lambda: _print_by_line(chunks, _create_logger(is_tty)), lines)
+        _measure(f"Blocks ({kind})",
+                 lambda: _print_in_blocks(chunks, LogStreamPrinter(_create_logger(is_tty), is_tty)),
+                 lines)
+        _measure(f"Blocks with log store ({kind})",
+                 lambda: _print_in_blocks(chunks, LogStreamPrinter(_create_logger(is_tty), is_tty, log_directory)),
+                 lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+
+"""Benchmarks downloading a large file in one stream against downloading it in multiple concurrent byte ranges.
+
+Run with `python tests/benchmarks/bench_multi_range_download.py [size in MB] [MB/s per connection]` from an environment
+in which lean is installed. The stand-in server supports range requests and limits the bandwidth of every connection,
+like the storage behind presigned data links does, so the speedup is bounded by the amount of ranges.
+"""
+
+import http.server
+import os
+import re
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from time import perf_counter, sleep
+from typing import Optional
+
+from lean.components.api.api_client import DataClient
+from lean.components.util.concurrency_budget import ConcurrencyBudget
+from lean.constants import MULTI_RANGE_DOWNLOAD_PARTS
+from lean.container import container
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """A request handler which serves a file from memory with support for range requests."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    content = b""
+    bytes_per_second = 0.0
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        start, end = 0, len(self.content) - 1
+
+        range_match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if range_match is not None:
+            start = int(range_match.group(1))
+            end = int(range_match.group(2)) if range_match.group(2) != "" else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(self.content)}")
+        else:
+            self.send_response(200)
+
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        # The client closes the initial response once it has read the first range
+        try:
+            start_time = perf_counter()
+            for position in range(start, end + 1, 256 * 1024):
+                self.wfile.write(self.content[position:min(position + 256 * 1024, end + 1)])
+
+                ahead = (position - start) / self.bytes_per_second - (perf_counter() - start_time)
+                if ahead > 0:
+                    sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def _measure(name: str, data_client: DataClient, url: str, budget: Optional[ConcurrencyBudget]) -> float:
+    """Downloads the served file and prints the throughput.
+
+    :param name: the name of the measured approach
+    :param data_client: the DataClient to download the file with
+    :param url: the url of the served file
+    :param budget: the concurrency budget of which free slots may be used to fetch ranges, None to use one stream
+    :return: the amount of megabytes per second
+    """
+    local_path = Path(tempfile.mkdtemp()) / "file.zip"
+
+    if budget is not None:
+        budget.acquire()
+
+    start_time = perf_counter()
+    try:
+        data_client.download_file("file.zip", "", str(local_path), lambda advance: None, budget=budget, link=url)
+    finally:
+        if budget is not None:
+            budget.release()
+
+    megabytes_per_second = len(_Handler.content) / (1024 * 1024) / (perf_counter() - start_time)
+
+    if local_path.read_bytes() != _Handler.content:
+        raise RuntimeError(f"{name} downloaded different content than served")
+    local_path.unlink()
+
+    print(f"{name:<40} {megabytes_per_second:>10,.1f} MB/s")
+    return megabytes_per_second
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+    bandwidth = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    _Handler.content = os.urandom(size * 1024 * 1024)
+    _Handler.bytes_per_second = bandwidth * 1024 * 1024
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://127.0.0.1:{server.server_port}/file.zip"
+    data_client = container.api_client().data
+
+    budget = ConcurrencyBudget(MULTI_RANGE_DOWNLOAD_PARTS)
+    budget.configure(MULTI_RANGE_DOWNLOAD_PARTS, MULTI_RANGE_DOWNLOAD_PARTS)
+
+    print(f"Downloading {size:,} MB at {bandwidth:,.0f} MB/s per connection")
+    before = _measure("Single stream", data_client, url, None)
+    after = _measure(f"Up to {MULTI_RANGE_DOWNLOAD_PARTS} concurrent ranges", data_client, url, budget)
+    print(f"Speedup: {after / before:.2f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
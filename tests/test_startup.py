@@ -0,0 +1,115 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean CLI v1.0. Copyright 2021 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+# Modules which are slow to import and not needed to show the help of trivial commands
+HEAVY_MODULES = ["docker", "joblib", "lxml", "json5", "rich", "pydantic", "pkg_resources"]
+
+# Modules which are slow to import and not needed to run trivial commands
+HEAVY_COMMAND_MODULES = ["docker", "lxml", "json5"]
+
+# The maximum amount of seconds between starting to import the CLI and a trivial command finishing
+STARTUP_TIME_BUDGET = 1.0
+
+# Commands which don't use Docker, the API models or the project tooling
+TRIVIAL_COMMANDS = [
+    ["whoami"],
+    ["login"],
+    ["logout"],
+    ["init"],
+    ["config"],
+    ["config", "get"],
+    ["config", "set"],
+    ["config", "unset"],
+    ["config", "list"]
+]
+
+# Invocations of trivial commands which don't prompt for input or need to be logged in
+TRIVIAL_INVOCATIONS = [
+    ["whoami"],
+    ["logout"],
+    ["config", "list"],
+    ["config", "get", "engine-image"],
+    ["config", "set", "engine-image", "quantconnect/lean:latest"],
+    ["config", "unset", "engine-image"]
+]
+
+
+def _run_cli(arguments: List[str], home: Path) -> Tuple[List[str], float]:
+    """Runs the CLI in a new interpreter.
+
+    :param arguments: the arguments to pass to the CLI
+    :param home: the home directory the CLI stores its configuration in
+    :return: the names of the top-level packages and modules in sys.modules when the CLI finished,
+             and the amount of seconds between starting to import the CLI and the CLI finishing
+    """
+    script = f"""
+import json
+import sys
+from time import perf_counter
+
+sys.argv = ["lean"] + {arguments!r}
+
+start = perf_counter()
+
+from lean.main import main
+
+try:
+    main()
+except SystemExit:
+    pass
+
+duration = perf_counter() - start
+
+print(json.dumps([sorted(set(name.split(".")[0] for name in sys.modules)), duration]))
+"""
+
+    env = {**os.environ, "HOME": str(home), "USERPROFILE": str(home)}
+    process = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=60, env=env)
+    assert process.returncode == 0, process.stderr
+
+    modules, duration = json.loads(process.stdout.strip().splitlines()[-1])
+    return modules, duration
+
+
+@pytest.mark.parametrize("command", TRIVIAL_COMMANDS, ids=[" ".join(command) for command in TRIVIAL_COMMANDS])
+def test_help_of_trivial_command_does_not_import_heavy_modules(command: List[str], tmp_path: Path) -> None:
+    imported_modules, _ = _run_cli(command + ["--help"], tmp_path)
+
+    assert [module for module in HEAVY_MODULES if module in imported_modules] == []
+
+
+@pytest.mark.parametrize("command", TRIVIAL_INVOCATIONS, ids=[" ".join(command) for command in TRIVIAL_INVOCATIONS])
+def test_trivial_command_does_not_import_heavy_modules(command: List[str], tmp_path: Path) -> None:
+    imported_modules, _ = _run_cli(command, tmp_path)
+
+    assert [module for module in HEAVY_COMMAND_MODULES if module in imported_modules] == []
+
+
+@pytest.mark.parametrize("command", TRIVIAL_INVOCATIONS, ids=[" ".join(command) for command in TRIVIAL_INVOCATIONS])
+def test_trivial_command_starts_within_budget(command: List[str], tmp_path: Path) -> None:
+    # The command is run once before it is measured, so Python's bytecode cache has been written
+    # --offline skips the background update checks, so the duration does not depend on the network
+    _run_cli(command + ["--offline"], tmp_path)
+    _, duration = _run_cli(command + ["--offline"], tmp_path)
+
+    assert duration < STARTUP_TIME_BUDGET